@@ -0,0 +1,198 @@
+"""
+黑塔之眼 - 告警规则引擎
+==========================================
+- 声明式阈值规则, 例如 "gpu_temp > 83 for 10s", 支持迟滞 (hysteresis)
+- 规则只编译一次, 每个新快照增量求值 (O(规则数), 不触碰硬件)
+- 触发 / 解除时产生告警事件, 附带结合当前数值的黑塔吐槽
+- /roast 直接返回引擎当前的吐槽, 无额外硬件开销
+"""
+
+import json
+import operator
+import random
+import re
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from backend.hardware import SystemStats
+from backend.sampler import Snapshot
+
+logger = logging.getLogger("HertaBackend")
+
+
+# --- 数据模型 ---
+class AlertEvent(BaseModel):
+    rule: str
+    field: str
+    state: str              # firing / resolved
+    value: Optional[float]
+    threshold: float
+    severity: int
+    message: str
+    timestamp: float
+    seq: int
+
+
+class AlertsResponse(BaseModel):
+    active: List[AlertEvent]
+    recent: List[AlertEvent]
+
+
+# --- 规则 ---
+_OPS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+}
+_RULE_RE = re.compile(r"^\s*(\w+)\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*(?:for\s+(\d+(?:\.\d+)?)\s*(ms|s|m)?)?\s*$")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, None: 1.0}
+
+NUMERIC_FIELDS = [name for name, f in SystemStats.model_fields.items() if f.annotation == Optional[float]]
+
+
+class Rule:
+    """
+    编译后的规则。
+    expr: "<字段> <比较符> <阈值> [for <时长>]", 时长单位 ms / s / m
+    hysteresis: 解除阈值与触发阈值的间隔 (例如 > 83 且 hysteresis=5 时, 低于 78 才解除)
+    """
+
+    def __init__(self, expr: str, message: str, hysteresis: float = 0.0, severity: int = 1,
+                 name: Optional[str] = None):
+        m = _RULE_RE.match(expr)
+        if not m:
+            raise ValueError(f"无法解析规则: {expr!r}")
+        field, op, threshold, duration, unit = m.groups()
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"规则字段必须是数值字段: {field} (可选: {', '.join(NUMERIC_FIELDS)})")
+
+        self.name = name or expr.strip()
+        self.field = field
+        self.op = op
+        self.threshold = float(threshold)
+        self.duration = float(duration) * _UNITS[unit] if duration else 0.0
+        self.message = message
+        self.severity = severity
+
+        # 解除条件: 向安全方向偏移 hysteresis
+        upward = op in (">", ">=")
+        self.clear_threshold = self.threshold - hysteresis if upward else self.threshold + hysteresis
+        self._fire = _OPS[op]
+        self._clear = operator.lt if upward else operator.gt
+        self._get = operator.attrgetter(field)
+
+        # 运行时状态
+        self.pending_since: Optional[float] = None
+        self.active: Optional[AlertEvent] = None
+
+    def evaluate(self, snap: Snapshot) -> Optional[AlertEvent]:
+        """增量求值, 状态变化时返回事件"""
+        value = self._get(snap.stats)
+        if value is None:
+            return None     # 数据缺失: 保持当前状态
+
+        now = snap.timestamp
+        if self.active is None:
+            if not self._fire(value, self.threshold):
+                self.pending_since = None
+                return None
+            if self.pending_since is None:
+                self.pending_since = now
+            if now - self.pending_since < self.duration:
+                return None
+            self.active = self._event(snap, "firing", value)
+            return self.active
+
+        if self._clear(value, self.clear_threshold):
+            self.active = None
+            self.pending_since = None
+            return self._event(snap, "resolved", value)
+        return None
+
+    def _event(self, snap: Snapshot, state: str, value: float) -> AlertEvent:
+        message = self.message.format(value=value, threshold=self.threshold) if state == "firing" \
+            else f"{self.field} 已恢复 ({value:g})。哼, 算你运气好。"
+        return AlertEvent(rule=self.name, field=self.field, state=state, value=value,
+                          threshold=self.threshold, severity=self.severity, message=message,
+                          timestamp=snap.timestamp, seq=snap.seq)
+
+
+# --- 默认规则 ---
+DEFAULT_RULES = [
+    dict(expr="gpu_temp > 83 for 10s", hysteresis=5, severity=3,
+         message="GPU 已经 {value:.0f}°C 了。在我的空间站里，这种低效是犯罪。"),
+    dict(expr="cpu_temp > 90 for 10s", hysteresis=5, severity=3,
+         message="警告：CPU 核心 {value:.0f}°C。你是把咖啡倒进机箱里煮了吗？"),
+    dict(expr="cpu > 90 for 15s", hysteresis=10, severity=2,
+         message="CPU 占用率 {value:.0f}%。你想把这里变成焚烧炉吗？"),
+    dict(expr="ram > 90 for 30s", hysteresis=5, severity=2,
+         message="内存占用 {value:.0f}%。再多开一个浏览器标签页试试？"),
+    dict(expr="gpu_power > 300 for 30s", hysteresis=30, severity=1,
+         message="GPU 功耗 {value:.0f}W。风扇在尖叫。可惜我不是维修工，我是天才。"),
+]
+
+# 无告警时轮换的语录
+IDLE_ROASTS = [
+    "一切正常。太无聊了，我去测算模拟宇宙。",
+    "还没有崩溃吗？真是奇迹。",
+    "效率...勉强及格。但离我的标准还差得远。",
+    "数据采集完毕。你的电脑就像你一样——勉强能用。",
+]
+IDLE_ROTATE = 10.0      # 语录轮换间隔 (秒)
+EVAL_PERIOD = 1.0       # 规则求值所需的采样周期 (秒, 按需采样时作为告警的需求周期)
+RECENT_EVENTS = 100     # 保留的最近事件数
+
+
+def load_rules(path: Optional[str] = None) -> List[Rule]:
+    """加载规则: 指定 JSON 文件 (列表, 字段同 DEFAULT_RULES) 则使用之, 否则使用默认规则"""
+    specs = DEFAULT_RULES
+    if path:
+        with open(path, encoding="utf-8") as f:
+            specs = json.load(f)
+    return [Rule(**spec) for spec in specs]
+
+
+class AlertEngine:
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=RECENT_EVENTS)
+        self._idle_roast = random.choice(IDLE_ROASTS)
+        self._idle_until = 0.0
+
+    @property
+    def fields(self) -> List[str]:
+        """规则引用的字段 (按需采样时只需更新提供这些字段的硬件)"""
+        return sorted({rule.field for rule in self.rules})
+
+    def evaluate(self, snap: Snapshot):
+        """采样线程回调: 对每条规则增量求值"""
+        for rule in self.rules:
+            event = rule.evaluate(snap)
+            if event is not None:
+                with self._lock:
+                    self._recent.append(event)
+                log = logger.warning if event.state == "firing" else logger.info
+                log(f"告警 [{event.state}] {event.rule}: {event.value}")
+
+    def active(self) -> List[AlertEvent]:
+        events = [r.active for r in self.rules if r.active is not None]
+        return sorted(events, key=lambda e: -e.severity)
+
+    def recent(self) -> List[AlertEvent]:
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def roast(self) -> str:
+        """当前吐槽: 优先最严重的活动告警, 否则轮换日常语录"""
+        active = self.active()
+        if active:
+            return active[0].message
+        now = time.monotonic()
+        if now >= self._idle_until:
+            self._idle_roast = random.choice(IDLE_ROASTS)
+            self._idle_until = now + IDLE_ROTATE
+        return self._idle_roast
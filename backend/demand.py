@@ -0,0 +1,144 @@
+"""
+黑塔之眼 - 按需采样
+==========================================
+- 消费者声明需要的 SystemStats 字段 (或完整传感器树) 与期望周期:
+  推送流订阅者、历史记录、告警规则、轨迹录制 (常驻); 最近的 /stats、/metrics 调用者 (按 TTL 过期)
+- 由字段推导需要 Update() 的硬件类别, 无人读取的类别完全不更新
+- 没有任何消费者 (或只有心跳周期即可满足的消费者) 时降为低频心跳, 新消费者出现时立即唤醒采样线程
+- 后台消费者 (历史记录、告警规则) 不阻止空闲心跳: 有其他消费者时按自身周期采样, 否则随心跳周期
+- 需求只在变化 (新增 / 过期 / 索引重建) 时重新计算, 采样线程每次只做一次比较
+"""
+
+import math
+import threading
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("HertaBackend")
+
+HEARTBEAT_PERIOD = 5.0  # 无消费者时的采样周期 (秒)
+STATS_TTL = 10.0        # /stats 等调用者在最后一次请求后仍视为活跃的时长 (秒)
+TREE_TTL = 60.0         # /metrics、/sensors 调用者的活跃时长 (覆盖常见的 Prometheus 抓取间隔)
+
+
+class Consumer:
+    __slots__ = ("name", "fields", "tree", "period", "expires", "background")
+
+    def __init__(self, name: str, fields: Optional[List[str]], tree: bool, period: float,
+                 expires: Optional[float], background: bool = False):
+        self.name = name
+        self.fields = fields        # 需要的 SystemStats 字段, None 为全部
+        self.tree = tree            # 是否需要完整传感器树
+        self.period = period        # 期望周期 (秒)
+        self.expires = expires      # time.monotonic(), None 为常驻
+        self.background = background    # 无其他消费者时接受心跳周期
+
+
+class DemandTracker:
+    def __init__(self, monitor, sampler, base_period: float, heartbeat: float = HEARTBEAT_PERIOD):
+        self.monitor = monitor
+        self.sampler = sampler
+        self.base_period = base_period
+        self.heartbeat = heartbeat
+        self._consumers: Dict[str, Consumer] = {}
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._next_expiry = math.inf
+        self._builds = -1
+        self.plan: dict = {}
+        monitor.demand = self
+
+    # --- 消费者 ---
+    def hold(self, name: str, fields: Optional[Iterable[str]] = None, tree: bool = False,
+             period: Optional[float] = None, background: bool = False):
+        """注册常驻消费者 (直到 release); background 为真时不阻止空闲心跳"""
+        self._add(Consumer(name, list(fields) if fields is not None else None, tree,
+                           period or self.base_period, None, background))
+
+    def release(self, name: str):
+        with self._lock:
+            if self._consumers.pop(name, None) is not None:
+                self._dirty = True
+
+    def touch(self, name: str, fields: Optional[Iterable[str]] = None, tree: bool = False,
+              period: Optional[float] = None, ttl: float = STATS_TTL):
+        """记录一次请求; 已存在时只延长有效期 (事件循环内调用, 须廉价)"""
+        expires = time.monotonic() + ttl
+        consumer = self._consumers.get(name)
+        if consumer is not None:
+            consumer.expires = expires
+            return
+        self._add(Consumer(name, list(fields) if fields is not None else None, tree,
+                           period or self.base_period, expires))
+
+    def _add(self, consumer: Consumer):
+        with self._lock:
+            self._consumers[consumer.name] = consumer
+            self._dirty = True
+        # 可能正处于空闲心跳, 立即采样
+        self.sampler.wake()
+
+    # --- 计划 ---
+    def _classes_for(self, fields: Optional[List[str]]) -> Set[str]:
+        field_classes = self.monitor.index.field_classes
+        classes: Set[str] = set()
+        for field in (fields if fields is not None else field_classes):
+            classes |= field_classes.get(field, set())
+        return classes
+
+    def apply(self):
+        """采样线程内调用 (每次更新前): 需求无变化时立即返回"""
+        now = time.monotonic()
+        builds = self.monitor.index.builds
+        if not self._dirty and now < self._next_expiry and builds == self._builds:
+            return
+
+        with self._lock:
+            self._dirty = False
+            alive = {n: c for n, c in self._consumers.items() if c.expires is None or c.expires > now}
+            self._consumers = alive
+        self._next_expiry = min((c.expires for c in alive.values() if c.expires is not None), default=math.inf)
+        self._builds = builds
+
+        classes: Dict[str, float] = {}
+        tree = False
+        for consumer in alive.values():
+            tree |= consumer.tree
+            needed = set(self.monitor.scheduler.classes) if consumer.tree else self._classes_for(consumer.fields)
+            for name in needed:
+                classes[name] = min(classes.get(name, math.inf), consumer.period)
+
+        # 只需心跳周期 SystemStats 字段的消费者 (如会话识别的负载检测) 与后台消费者不妨碍空闲心跳
+        idle = all(c.background or (c.period >= self.heartbeat and not c.tree) for c in alive.values())
+        if not idle:
+            period = max(self.base_period, min(c.period for c in alive.values()))
+        else:
+            # 空闲心跳: 只更新 SystemStats 所需类别, 保证最新快照不至于太旧
+            period = self.heartbeat
+            classes = {name: self.heartbeat for name in self._classes_for(None)}
+
+        self.monitor.scheduler.set_demand(classes)
+        self.monitor.tree_enabled = tree
+        self.sampler.period = period
+
+        plan = {"idle": idle, "sample_period": period, "tree": tree, "classes": classes}
+        if plan != self.plan:
+            logger.info(f"采样需求变化: {'空闲心跳' if idle else f'{len(alive)} 个消费者'}, "
+                        f"周期 {period}s, 类别 {sorted(classes) or '无'}")
+        self.plan = plan
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        consumers = [
+            {
+                "name": c.name,
+                "fields": c.fields,
+                "tree": c.tree,
+                "period": c.period,
+                "background": c.background,
+                "expires_in": None if c.expires is None else round(c.expires - now, 1),
+            }
+            for c in list(self._consumers.values()) if c.expires is None or c.expires > now
+        ]
+        return {**self.plan, "consumers": consumers}
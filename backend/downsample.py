@@ -0,0 +1,65 @@
+"""
+黑塔之眼 - 降采样 (LTTB)
+==========================================
+- Largest-Triangle-Three-Buckets, 基于 NumPy
+- 多指标共享时间轴: 每个桶内选出使各指标 (按量程归一化) 三角形面积之和最大的点
+- 每个桶内的计算全部向量化, Python 循环次数只与输出点数有关
+"""
+
+import warnings
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, ys: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    x: 形状 (n,) 的时间轴 (升序)
+    ys: 形状 (n, m) 的 m 个指标, 允许 NaN
+    返回保留点的下标 (升序, 包含首尾)
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    ys = np.asarray(ys, dtype=np.float64)
+    if ys.ndim == 1:
+        ys = ys[:, None]
+
+    # 各指标按量程归一化, 避免大数值指标 (如频率) 主导选点
+    with warnings.catch_warnings():
+        # 全为 NaN 的指标 (硬件不支持) 量程按 1 处理
+        warnings.simplefilter("ignore", RuntimeWarning)
+        span = np.nanmax(ys, axis=0) - np.nanmin(ys, axis=0)
+    span[~np.isfinite(span) | (span == 0)] = 1.0
+    ys = np.nan_to_num(ys / span, nan=0.0)
+
+    # 首尾点固定, 中间 n-2 个点均分为 n_out-2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if hi <= lo:
+            hi = lo + 1
+        # 下一个桶的平均点 (最后一个桶用末尾点)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            cx = x[nlo:nhi].mean()
+            cy = ys[nlo:nhi].mean(axis=0)
+        else:
+            cx = x[-1]
+            cy = ys[-1]
+
+        bx = x[lo:hi]
+        by = ys[lo:hi]
+        # 三角形面积 (省略 1/2), 对各指标求和
+        area = np.abs((x[a] - cx) * (by - ys[a]) - (x[a] - bx)[:, None] * (cy - ys[a])).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+
+    return out
@@ -0,0 +1,128 @@
+"""
+黑塔之眼 - 预编码快照响应
+==========================================
+- 采样线程在每个新快照到达时编码一次 (JSON, gzip, msgpack), HTTP 处理函数只返回缓存的字节
+- ETag 由进程启动标识 + 采样序号构成, 各表示形式 (编码) 后缀不同; If-None-Match 命中返回 304
+- 同一快照的重复轮询只需比较一次请求头, 不再构建 / 序列化响应模型
+- 正文只含快照本身的量 (采集时刻 sampled_at, 不含年龄); 每次请求的样本年龄见响应头 X-Sample-Age
+- 内容协商按 q 值进行 (q=0 为不可接受)
+- msgpack 为可选依赖 (pip install msgpack), 未安装时只提供 JSON / gzip
+"""
+
+import gzip
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from backend.sampler import Snapshot
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+GZIP_LEVEL = 6
+# 内容协商相关的请求头: 缓存 / 代理按这些请求头区分表示形式
+VARY = "Accept, Accept-Encoding"
+
+# 进程启动标识: 后端重启后序号从 1 重新计数, 旧 ETag 不会误命中
+_BOOT = format(int(time.time() * 1000), "x")
+
+# (正文, Content-Type, Content-Encoding, ETag)
+Variant = Tuple[bytes, str, Optional[str], str]
+
+
+class EncodedSnapshot:
+    """一个快照的全部预编码表示形式 (不可变)"""
+
+    __slots__ = ("seq", "monotonic", "variants")
+
+    def __init__(self, snap: Snapshot, model: BaseModel):
+        self.seq = snap.seq
+        self.monotonic = snap.monotonic
+        tag = f"{_BOOT}-{snap.seq}"
+        body = model.model_dump_json().encode("utf-8")
+        self.variants: Dict[str, Variant] = {
+            "json": (body, JSON, None, f'"{tag}"'),
+            "gzip": (gzip.compress(body, GZIP_LEVEL, mtime=0), JSON, "gzip", f'"{tag}.gz"'),
+        }
+        if msgpack is not None:
+            packed = msgpack.packb(model.model_dump(), use_bin_type=True)
+            self.variants["msgpack"] = (packed, MSGPACK, None, f'"{tag}.mp"')
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.monotonic
+
+
+def parse_qlist(header: str) -> Dict[str, float]:
+    """'gzip;q=0.5, identity' -> {"gzip": 0.5, "identity": 1.0} (键为小写, 忽略 q 以外的参数)"""
+    result: Dict[str, float] = {}
+    for item in header.split(","):
+        token, *params = item.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        result[token] = q
+    return result
+
+
+@lru_cache(maxsize=256)
+def select_variant(accept: Optional[str], accept_encoding: Optional[str]) -> str:
+    """
+    按 Accept / Accept-Encoding (含 q 值) 选择表示形式, q=0 表示不可接受:
+    msgpack 的 q 值不低于 JSON 时返回 msgpack (优先于 gzip); gzip 的 q 值 (或 * 的 q 值) 大于 0 时返回 gzip。
+    轮询客户端的请求头基本不变, 按请求头缓存结果。
+    """
+    if msgpack is not None and accept:
+        types = parse_qlist(accept)
+        q_msgpack = max(types.get(t, 0.0) for t in MSGPACK_TYPES)
+        q_json = types.get(JSON, types.get("application/*", types.get("*/*", 0.0)))
+        if q_msgpack > 0 and q_msgpack >= q_json:
+            return "msgpack"
+    if accept_encoding:
+        codings = parse_qlist(accept_encoding)
+        if codings.get("gzip", codings.get("*", 0.0)) > 0:
+            return "gzip"
+    return "json"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 弱比较 (RFC 9110): 支持 * 与逗号分隔的多个 ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match == etag:
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class SnapshotEncoder:
+    """采样线程回调: 每个新快照构建一次响应模型并编码全部表示形式"""
+
+    def __init__(self, build: Callable[[Snapshot], BaseModel]):
+        self._build = build
+        self._latest: Optional[EncodedSnapshot] = None
+
+    def offer(self, snap: Snapshot):
+        # 引用赋值是原子的, 处理函数总能拿到完整的编码结果
+        self._latest = EncodedSnapshot(snap, self._build(snap))
+
+    def latest(self) -> Optional[EncodedSnapshot]:
+        return self._latest
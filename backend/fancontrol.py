@@ -0,0 +1,405 @@
+"""
+黑塔之眼 - 风扇闭环控制 (危险功能, 默认关闭)
+==========================================
+- 独立线程按固定周期运行 (绝对截止时刻调度), 与 HTTP / 前端轮询完全解耦, 只读取最新快照
+- 每条控制回路: 温度来源 (SystemStats 字段) -> 风扇曲线 (分段线性插值) -> 迟滞 -> 升降速限制 -> 风扇
+- 多条回路控制同一风扇时取最大占空比
+- 快照过旧 / 温度缺失时立即切到安全占空比 (默认 100%)
+- 统计截止时刻错过次数、调度抖动, 以及温度越过曲线节点到发出风扇指令的反应延迟
+- 通过 LibreHardwareMonitor 的 ISensor.Control (SetSoftware / SetDefault) 写入; 停止时恢复默认控制
+
+仿真 (Linux, 无需真实硬件, 基于 backend.synthetic.ThermalPlant 热模型):
+    python -m backend.fancontrol --simulate --duration 60
+"""
+
+import argparse
+import fnmatch
+import json
+import math
+import threading
+import time
+import logging
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from backend.hardware import SystemStats
+from backend.sampler import Snapshot
+from backend.timings import Histogram
+
+logger = logging.getLogger("HertaBackend")
+
+CONTROL_PERIOD = 0.5        # 控制周期 (秒)
+STALE_AFTER = 3.0           # 快照超过该年龄 (秒) 视为失效, 切到安全占空比
+FALLBACK_DUTY = 100.0       # 安全占空比 (%)
+MISS_TOLERANCE = 0.2        # 晚于截止时刻超过 周期 × 该比例 计为一次错过
+DEADBAND = 0.5              # 占空比变化小于该值 (%) 时不重复写入
+
+NUMERIC_FIELDS = [name for name, f in SystemStats.model_fields.items() if f.annotation == Optional[float]]
+
+
+# --- 数据模型 ---
+class FanLoopStatus(BaseModel):
+    name: str
+    source: str
+    mode: str                       # waiting / curve / fallback
+    value: Optional[float]          # 温度来源的最新值
+    effective: Optional[float]      # 迟滞后的有效温度
+    target: Optional[float]         # 曲线目标占空比 (%)
+    duty: Optional[float]           # 当前指令占空比 (%, 已限速)
+    fans: List[str]                 # 控制的 Control 传感器 identifier
+
+
+class FanControlStatus(BaseModel):
+    period: float
+    ticks: int
+    deadline_misses: int
+    skipped_periods: int
+    write_errors: int
+    jitter: dict                    # 实际开始时刻相对截止时刻的延后 (Histogram 摘要, ms)
+    reaction: dict                  # 温度越过曲线节点 (采样时刻) -> 风扇指令 (ms)
+    loops: List[FanLoopStatus]
+
+
+# --- 风扇曲线 ---
+class FanCurve:
+    """分段线性插值; 低于第一个节点取首值, 高于最后一个节点取末值"""
+
+    def __init__(self, points: Sequence[Sequence[float]]):
+        points = sorted((float(t), float(d)) for t, d in points)
+        if not points:
+            raise ValueError("风扇曲线至少需要一个节点")
+        for t, d in points:
+            if not 0.0 <= d <= 100.0:
+                raise ValueError(f"占空比必须在 0~100 之间: {d}")
+        if any(a[0] == b[0] for a, b in zip(points, points[1:])):
+            raise ValueError("风扇曲线节点温度不能重复")
+        if any(a[1] > b[1] for a, b in zip(points, points[1:])):
+            raise ValueError("风扇曲线必须单调不减")
+        self.temps = [t for t, _ in points]
+        self.duties = [d for _, d in points]
+
+    def __call__(self, temp: float) -> float:
+        i = bisect_right(self.temps, temp)
+        if i == 0:
+            return self.duties[0]
+        if i == len(self.temps):
+            return self.duties[-1]
+        t0, t1 = self.temps[i - 1], self.temps[i]
+        d0, d1 = self.duties[i - 1], self.duties[i]
+        return d0 + (d1 - d0) * (temp - t0) / (t1 - t0)
+
+
+# --- 控制回路 ---
+class FanLoop:
+    """
+    单条控制回路 (只在控制线程内调用 step)。
+    hysteresis: 升温立即跟随; 降温时有效温度只在低于其 hysteresis 度后才下降
+    ramp_up / ramp_down: 占空比每秒最大升高 / 降低量 (%/s)
+    """
+
+    def __init__(self, name: str, source: str, fans: List[str], curve: Sequence[Sequence[float]],
+                 hysteresis: float = 3.0, ramp_up: float = 50.0, ramp_down: float = 10.0,
+                 min_duty: float = 20.0, fallback: float = FALLBACK_DUTY):
+        if source not in NUMERIC_FIELDS:
+            raise ValueError(f"温度来源必须是数值字段: {source} (可选: {', '.join(NUMERIC_FIELDS)})")
+        self.name = name
+        self.source = source
+        self.patterns = fans            # Control 传感器 identifier 通配符
+        self.curve = FanCurve(curve)
+        self.hysteresis = hysteresis
+        self.ramp_up = ramp_up
+        self.ramp_down = ramp_down
+        self.min_duty = min_duty
+        self.fallback = fallback
+
+        # 运行时状态
+        self.fans: List[str] = []
+        self.mode = "waiting"
+        self.value: Optional[float] = None
+        self.effective: Optional[float] = None
+        self.target: Optional[float] = None
+        self.duty: Optional[float] = None
+        self.crossed: Optional[float] = None    # 越过曲线节点的样本时刻 (time.monotonic), 待记录反应延迟
+        self._seq = 0
+
+    def step(self, snap: Optional[Snapshot], now: float, dt: float, stale_after: float) -> Optional[float]:
+        """返回本周期的占空比; 尚未收到任何样本时返回 None (不接管风扇)"""
+        if snap is None and self.mode == "waiting":
+            return None
+        value = getattr(snap.stats, self.source) if snap is not None else None
+        if value is None or now - snap.monotonic > stale_after:
+            # 数据失效: 立即切到安全占空比 (不限速)
+            if self.mode != "fallback":
+                logger.warning(f"风扇回路 {self.name}: {self.source} 数据失效, 切换到 {self.fallback:g}%")
+            self.mode = "fallback"
+            self.target = self.fallback
+            self.duty = self.fallback
+            self.effective = None
+            return self.duty
+
+        if snap.seq != self._seq:
+            # 新样本: 检测向上越过曲线节点 (反应延迟的起点为采样时刻)
+            if self.value is not None and self.crossed is None:
+                if any(self.value <= t < value for t in self.curve.temps):
+                    self.crossed = snap.monotonic
+            self.value = value
+            self._seq = snap.seq
+
+        if self.effective is None or value > self.effective:
+            self.effective = value
+        elif value < self.effective - self.hysteresis:
+            self.effective = value + self.hysteresis
+        self.target = max(self.min_duty, self.curve(self.effective))
+
+        if self.mode == "fallback":
+            logger.info(f"风扇回路 {self.name}: 数据恢复, 按曲线控制")
+        if self.duty is None:
+            self.duty = self.target     # 首个有效样本: 直接采用曲线值
+        elif self.target > self.duty:
+            self.duty = min(self.target, self.duty + self.ramp_up * dt)
+        else:
+            self.duty = max(self.target, self.duty - self.ramp_down * dt)
+        self.mode = "curve"
+        return self.duty
+
+    def status(self) -> FanLoopStatus:
+        def r(x):
+            return None if x is None else round(x, 1)
+        return FanLoopStatus(name=self.name, source=self.source, mode=self.mode, value=self.value,
+                             effective=r(self.effective), target=r(self.target), duty=r(self.duty),
+                             fans=list(self.fans))
+
+
+# --- 默认配置 ---
+# PLAN.md 第四阶段: "当 GPU > 80°C 时, 风扇 100%"
+# 只有显卡风扇: 主板控制接口 (/lpc/...) 上可能接着 AIO 水泵 / 系统风扇, 低占空比会让水泵几乎停转,
+# 必须在 HERTA_FAN_CONFIG 中逐个列出, 不提供默认回路
+DEFAULT_LOOPS = [
+    dict(name="gpu", source="gpu_temp", fans=["/gpu*/control/*"],
+         curve=[[40, 30], [60, 45], [70, 65], [80, 100]], hysteresis=3, ramp_up=50, ramp_down=10),
+]
+
+
+def load_fan_config(path: Optional[str] = None) -> Tuple[List[FanLoop], dict]:
+    """
+    加载配置: JSON 对象 {"period": 0.5, "stale_after": 3, "loops": [...]},
+    loops 中每项字段同 DEFAULT_LOOPS / FanLoop; 未指定文件时使用默认配置。
+    返回 (回路列表, FanController 的其余参数)
+    """
+    spec: dict = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+    loops = [FanLoop(**loop) for loop in spec.pop("loops", DEFAULT_LOOPS)]
+    return loops, spec
+
+
+# --- 控制器 ---
+class FanController:
+    def __init__(self, loops: List[FanLoop], latest: Callable[[], Optional[Snapshot]], index,
+                 period: float = CONTROL_PERIOD, stale_after: float = STALE_AFTER):
+        self.loops = loops
+        self.latest = latest            # 最新快照 (如 Sampler.latest)
+        self.index = index              # SensorIndex: 解析 Control 传感器句柄
+        self.period = period
+        self.stale_after = stale_after
+        self.jitter = Histogram()
+        self.reaction = Histogram()
+        self.ticks = 0
+        self.deadline_misses = 0
+        self.skipped_periods = 0
+        self.write_errors = 0
+        self._controls: Dict[str, object] = {}      # identifier -> IControl
+        self._written: Dict[str, float] = {}        # identifier -> 最近写入的占空比
+        self._builds = -1
+        self._last_tick: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def fields(self) -> List[str]:
+        """回路引用的字段 (按需采样)"""
+        return sorted({loop.source for loop in self.loops})
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="HertaFanControl", daemon=True)
+        self._thread.start()
+        logger.info(f"⚠️ 风扇控制已启用: {len(self.loops)} 条回路, 周期 {self.period}s")
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._release()
+
+    # --- 固定周期循环 ---
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            late = now - deadline
+            self.jitter.record(max(late, 0.0))
+            if late > self.period * MISS_TOLERANCE:
+                self.deadline_misses += 1
+            try:
+                self.tick(now)
+            except Exception as e:
+                logger.error(f"风扇控制异常: {e}")
+
+            deadline += self.period
+            now = time.monotonic()
+            if now > deadline:
+                # 本周期超时 (或线程被挂起): 跳过已错过的周期, 不补跑
+                missed = math.ceil((now - deadline) / self.period)
+                self.skipped_periods += missed
+                deadline += missed * self.period
+            self._stop_event.wait(deadline - now)
+
+    def tick(self, now: float):
+        if self.index.builds != self._builds:
+            self._resolve()
+        snap = self.latest()
+        dt = now - self._last_tick if self._last_tick is not None else self.period
+        self._last_tick = now
+
+        duties: Dict[str, float] = {}
+        for loop in self.loops:
+            duty = loop.step(snap, now, dt, self.stale_after)
+            if duty is None:
+                continue
+            for ident in loop.fans:
+                duties[ident] = max(duty, duties.get(ident, 0.0))
+
+        for ident, duty in duties.items():
+            written = self._written.get(ident)
+            if written is not None and abs(duty - written) < DEADBAND:
+                continue
+            try:
+                self._controls[ident].SetSoftware(float(round(duty, 1)))
+                self._written[ident] = duty
+            except Exception as e:
+                self.write_errors += 1
+                if self.write_errors <= 3:
+                    logger.error(f"风扇写入失败 ({ident}): {e}")
+
+        done = time.monotonic()
+        for loop in self.loops:
+            if loop.crossed is not None:
+                self.reaction.record(done - loop.crossed)
+                loop.crossed = None
+        self.ticks += 1
+
+    def _resolve(self):
+        """按通配符解析各回路控制的风扇 (索引重建后重新解析)"""
+        self._builds = self.index.builds
+        sensors = self.index.controls
+        self._controls = {}
+        for loop in self.loops:
+            loop.fans = sorted(i for i in sensors if any(fnmatch.fnmatch(i, p) for p in loop.patterns))
+            for ident in loop.fans:
+                control = sensors[ident].Control
+                if control is None:
+                    continue
+                self._controls[ident] = control
+            loop.fans = [i for i in loop.fans if i in self._controls]
+            if not loop.fans:
+                logger.warning(f"风扇回路 {loop.name}: 没有匹配 {loop.patterns} 的可控风扇")
+        self._written = {i: d for i, d in self._written.items() if i in self._controls}
+
+    def _release(self):
+        """恢复驱动 / BIOS 默认风扇控制"""
+        for ident, control in self._controls.items():
+            try:
+                control.SetDefault()
+            except Exception as e:
+                logger.warning(f"恢复默认风扇控制失败 ({ident}): {e}")
+        if self._controls:
+            logger.info(f"已恢复 {len(self._controls)} 个风扇的默认控制")
+        self._written = {}
+
+    def status(self) -> FanControlStatus:
+        return FanControlStatus(
+            period=self.period,
+            ticks=self.ticks,
+            deadline_misses=self.deadline_misses,
+            skipped_periods=self.skipped_periods,
+            write_errors=self.write_errors,
+            jitter=self.jitter.summary(),
+            reaction=self.reaction.summary(),
+            loops=[loop.status() for loop in self.loops],
+        )
+
+
+# --- 仿真 ---
+def simulate(duration: float, config: Optional[str] = None):
+    """基于 ThermalPlant 的闭环仿真: 空闲 -> 满载 -> 采样线程卡死 -> 空闲"""
+    from backend.hardware import HardwareMonitor
+    from backend.sampler import Sampler
+    from backend.synthetic import ThermalPlant, build_plant_computer
+
+    loops, options = load_fan_config(config)
+    gpu_loop = next((loop for loop in loops if loop.source == "gpu_temp"), None)
+    load_at, idle_at = duration * 0.15, duration * 0.65
+    hang_at, hang_for = duration * 0.45, 5.0
+
+    def load(t: float) -> float:
+        return 100.0 if load_at <= t < idle_at else 5.0
+
+    plant = ThermalPlant(load, thresholds=gpu_loop.curve.temps if gpu_loop else ())
+    monitor = HardwareMonitor(build_plant_computer(plant))
+    sampler = Sampler(monitor.sample, period=0.25)
+    controller = FanController(loops, sampler.latest, monitor.index, **options)
+
+    sampler.start()
+    controller.start()
+    print(f"{'t(s)':>6}{'负载%':>8}{'温度°C':>9}{'转速':>7}{'占空比%':>9}  模式")
+    hung = False
+    max_temp = above_80 = 0.0
+    try:
+        for second in range(int(duration)):
+            time.sleep(1.0)
+            t = time.monotonic() - plant.start
+            if not hung and t >= hang_at:
+                plant.hang(hang_for)
+                hung = True
+            max_temp = max(max_temp, plant.temp)
+            above_80 += 1.0 if plant.temp > 80 else 0.0
+            mode = gpu_loop.mode if gpu_loop else "-"
+            print(f"{t:>6.0f}{load(t):>8.0f}{plant.temp:>9.1f}{plant.rpm:>7.0f}{plant.duty:>9.1f}  {mode}")
+    finally:
+        controller.stop()
+        sampler.stop()
+        monitor.close()
+
+    status = controller.status()
+    responses = [(c[2] - c[1]) * 1000 for c in plant.crossings if c[2] is not None]
+    print(f"\n最高温度 {max_temp:.1f}°C, 高于 80°C {above_80:.0f}s")
+    print(f"控制周期 {status.period}s: {status.ticks} 次, 错过截止时刻 {status.deadline_misses} 次, "
+          f"跳过 {status.skipped_periods} 个周期, 抖动 p99 {status.jitter['p99_ms']:.2f} ms")
+    print(f"反应延迟 (采样 -> 指令): p50 {status.reaction['p50_ms']:.1f} ms, "
+          f"p99 {status.reaction['p99_ms']:.1f} ms (n={status.reaction['count']})")
+    if responses:
+        print(f"端到端 (真实越过节点 -> 占空比提高): 平均 {sum(responses) / len(responses):.0f} ms, "
+              f"最大 {max(responses):.0f} ms (n={len(responses)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="黑塔之眼风扇控制")
+    parser.add_argument("--simulate", action="store_true", help="基于热模型仿真闭环控制 (不访问硬件)")
+    parser.add_argument("--duration", type=float, default=60.0, help="仿真时长 (秒)")
+    parser.add_argument("--config", help="风扇配置 JSON (HERTA_FAN_CONFIG)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+    if not args.simulate:
+        parser.error("风扇控制随后端运行 (HERTA_FAN_CONTROL=1); 独立运行只支持 --simulate")
+    simulate(args.duration, args.config)
+
+
+if __name__ == "__main__":
+    main()
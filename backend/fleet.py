@@ -0,0 +1,202 @@
+"""
+黑塔之眼 - 多机汇总采集
+==========================================
+- 每台机器 (rig) 一个独立的 asyncio 轮询任务, 共用一个连接池 (httpx.AsyncClient, keep-alive)
+- 每个请求单独超时: 慢机器 / 离线机器只影响自己, 不会拖住其它机器
+- 连续失败时指数退避, 避免对离线机器空转
+- 保存每台机器的最新快照与健康状态, 汇总查询只读内存 (O(机器数))
+"""
+
+import asyncio
+import time
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+from pydantic import BaseModel
+
+from backend.hardware import SystemStats
+
+logger = logging.getLogger("HertaBackend")
+
+STALE_AFTER = 3.0       # 超过该时长 (秒) 未成功拉取, 视为 stale
+OFFLINE_AFTER = 10.0    # 超过该时长 (秒) 未成功拉取 (或从未成功), 视为 offline
+MAX_BACKOFF = 30.0      # 连续失败时的最大轮询间隔 (秒)
+
+
+# --- 数据模型 ---
+class RigStatus(BaseModel):
+    name: str
+    url: str
+    state: str                      # online / stale / offline
+    stats: Optional[SystemStats]    # 最近一次成功拉取的数据
+    sample_seq: Optional[int]
+    age: Optional[float]            # 距最近一次成功拉取的时长 (秒)
+    latency_ms: Optional[float]     # 最近一次成功请求的耗时
+    errors: int                     # 连续失败次数
+    last_error: Optional[str]
+
+
+class Extreme(BaseModel):
+    rig: str
+    value: float
+
+
+class FleetAggregate(BaseModel):
+    rigs: int
+    online: int
+    hottest_gpu: Optional[Extreme]
+    hottest_cpu: Optional[Extreme]
+    avg_cpu: Optional[float]
+    avg_gpu_usage: Optional[float]
+    avg_ram: Optional[float]
+    total_gpu_power: Optional[float]
+
+
+class FleetResponse(BaseModel):
+    timestamp: float
+    aggregate: FleetAggregate
+    rigs: List[RigStatus]
+
+
+def parse_rigs(spec: str) -> Dict[str, str]:
+    """
+    解析机器列表: 逗号分隔, 每项为 "[名称=]host[:port]" 或完整 URL。
+    未指定名称时以 host:port 为名, 未指定端口时为 8000。
+    """
+    rigs: Dict[str, str] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, target = item.rpartition("=")
+        if "://" not in target:
+            target = f"http://{target}" if ":" in target else f"http://{target}:8000"
+        target = target.rstrip("/")
+        rigs[name or target.split("://", 1)[1]] = target
+    return rigs
+
+
+class Rig:
+    """单台机器的采集状态 (只在事件循环线程内读写)"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.stats: Optional[SystemStats] = None
+        self.sample_seq: Optional[int] = None
+        self.updated: Optional[float] = None    # 最近一次成功拉取 (time.monotonic)
+        self.latency: Optional[float] = None
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def state(self, now: float) -> str:
+        if self.updated is None or now - self.updated > OFFLINE_AFTER:
+            return "offline"
+        return "stale" if now - self.updated > STALE_AFTER else "online"
+
+    def status(self, now: float) -> RigStatus:
+        return RigStatus(
+            name=self.name, url=self.url, state=self.state(now), stats=self.stats,
+            sample_seq=self.sample_seq,
+            age=round(now - self.updated, 3) if self.updated is not None else None,
+            latency_ms=round(self.latency * 1000, 1) if self.latency is not None else None,
+            errors=self.errors, last_error=self.last_error,
+        )
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 1) if values else None
+
+
+def _hottest(rigs: List[Rig], field: str) -> Optional[Extreme]:
+    best = None
+    for rig in rigs:
+        value = getattr(rig.stats, field)
+        if value is not None and (best is None or value > best.value):
+            best = Extreme(rig=rig.name, value=value)
+    return best
+
+
+class FleetCollector:
+    def __init__(self, rigs: Dict[str, str], period: float = 1.0, timeout: float = 0.8,
+                 max_connections: int = 64):
+        self.rigs = {name: Rig(name, url) for name, url in rigs.items()}
+        self.period = period
+        self.timeout = timeout
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._client = httpx.AsyncClient(limits=self._limits, timeout=self.timeout)
+        self._tasks = [asyncio.create_task(self._poll(rig), name=f"HertaRig-{rig.name}")
+                       for rig in self.rigs.values()]
+        logger.info(f"汇总采集已启动: {len(self.rigs)} 台机器 (周期 {self.period}s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch(self, rig: Rig):
+        t0 = time.monotonic()
+        try:
+            r = await self._client.get(f"{rig.url}/stats")
+            r.raise_for_status()
+            data = r.json()
+            stats = SystemStats.model_validate(data)
+        except (httpx.HTTPError, ValueError) as e:
+            if rig.errors == 0:
+                logger.warning(f"机器 {rig.name} 拉取失败: {e!r}")
+            rig.errors += 1
+            rig.last_error = repr(e)
+            return
+        if rig.errors:
+            logger.info(f"机器 {rig.name} 已恢复 (此前连续失败 {rig.errors} 次)")
+        rig.stats = stats
+        rig.sample_seq = data.get("sample_seq")
+        rig.updated = time.monotonic()
+        rig.latency = rig.updated - t0
+        rig.errors = 0
+        rig.last_error = None
+
+    async def _poll(self, rig: Rig):
+        while True:
+            t0 = time.monotonic()
+            await self._fetch(rig)
+            # 连续失败时指数退避
+            period = min(self.period * 2 ** min(rig.errors, 8), MAX_BACKOFF) if rig.errors else self.period
+            await asyncio.sleep(max(0.0, period - (time.monotonic() - t0)))
+
+    def aggregate(self, now: Optional[float] = None) -> FleetAggregate:
+        """汇总: 只统计 online 机器"""
+        now = now if now is not None else time.monotonic()
+        live = [rig for rig in self.rigs.values() if rig.stats is not None and rig.state(now) == "online"]
+
+        def values(field: str) -> List[float]:
+            return [v for v in (getattr(rig.stats, field) for rig in live) if v is not None]
+
+        power = values("gpu_power")
+        return FleetAggregate(
+            rigs=len(self.rigs), online=len(live),
+            hottest_gpu=_hottest(live, "gpu_temp"),
+            hottest_cpu=_hottest(live, "cpu_temp"),
+            avg_cpu=_mean(values("cpu")),
+            avg_gpu_usage=_mean(values("gpu_usage")),
+            avg_ram=_mean(values("ram")),
+            total_gpu_power=round(sum(power), 1) if power else None,
+        )
+
+    def snapshot(self) -> FleetResponse:
+        now = time.monotonic()
+        return FleetResponse(
+            timestamp=time.time(),
+            aggregate=self.aggregate(now),
+            rigs=[rig.status(now) for rig in self.rigs.values()],
+        )
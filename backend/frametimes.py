@@ -0,0 +1,223 @@
+"""
+黑塔之眼 - 帧时间日志采集
+==========================================
+- 跟踪 (tail) 不断增长的帧时间 CSV: PresentMon (MsBetweenPresents / FrameTime 列) 与 MangoHud (frametime 列)
+- 独立线程按块增量读取新内容, 只解析帧时间一列, 从不重读文件
+- 指定目录时自动跟随其中最新的 .csv (每次抓帧通常生成新文件)
+- 帧时间存入定长 NumPy 环形缓冲区, 按时间滑动窗口计算 FPS / 平均帧时间 / 1% 与 0.1% low (向量化)
+- 结果合并进每个 SystemStats 快照 (fps / frametime_ms / fps_1pct_low / fps_01pct_low)
+"""
+
+import glob
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("HertaBackend")
+
+# 帧时间列 (毫秒), 按优先级匹配
+FRAMETIME_COLUMNS = ["MsBetweenPresents", "FrameTime", "frametime"]
+POLL_INTERVAL = 0.25        # 检查文件增长的间隔 (秒)
+CHUNK_SIZE = 1 << 20        # 单次最多读取的字节数
+HEADER_SCAN = 64 * 1024     # 查找表头时最多扫描的字节数 (MangoHud 表头前有系统信息行)
+WINDOW = 10.0               # 滑动窗口 (秒, 按帧时间累计)
+CAPACITY = 1 << 15          # 环形缓冲区帧数 (1000 FPS 下约 32 秒)
+STALE_AFTER = 2.0           # 超过该时长 (秒) 没有新帧, 视为游戏已退出, 不再输出 FPS
+
+FRAME_FIELDS = ("fps", "frametime_ms", "fps_1pct_low", "fps_01pct_low")
+
+
+class FrameWindow:
+    """帧时间环形缓冲区 (float32, 毫秒); 写入与统计均为向量化操作"""
+
+    def __init__(self, capacity: int = CAPACITY):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.float32)
+        self._head = 0
+        self._size = 0
+        self.total = 0          # 累计帧数
+
+    def extend(self, frametimes: np.ndarray):
+        n = len(frametimes)
+        if n >= self.capacity:
+            frametimes = frametimes[-self.capacity:]
+            n = self.capacity
+        end = self._head + n
+        if end <= self.capacity:
+            self._buf[self._head:end] = frametimes
+        else:
+            split = self.capacity - self._head
+            self._buf[self._head:] = frametimes[:split]
+            self._buf[:end - self.capacity] = frametimes[split:]
+        self._head = end % self.capacity
+        self._size = min(self._size + n, self.capacity)
+        self.total += n
+
+    def recent(self, window_ms: float) -> np.ndarray:
+        """最近 window_ms 毫秒内的帧时间 (新的在前)"""
+        if not self._size:
+            return self._buf[:0]
+        idx = (self._head - 1 - np.arange(self._size)) % self.capacity
+        frames = self._buf[idx]
+        k = int(np.searchsorted(np.cumsum(frames, dtype=np.float64), window_ms, side="right"))
+        return frames[:max(k, 1)]
+
+    @staticmethod
+    def summarize(frames: np.ndarray) -> Dict[str, float]:
+        n = len(frames)
+        mean = float(frames.mean(dtype=np.float64))
+
+        def low(fraction: float) -> float:
+            # x% low: 最慢的 x% 帧的平均 FPS
+            k = max(1, int(n * fraction))
+            worst = np.partition(frames, n - k)[n - k:]
+            return round(1000.0 / float(worst.mean(dtype=np.float64)), 1)
+
+        return {
+            "fps": round(1000.0 / mean, 1),
+            "frametime_ms": round(mean, 2),
+            "fps_1pct_low": low(0.01),
+            "fps_01pct_low": low(0.001),
+        }
+
+
+class FrametimeTail:
+    def __init__(self, path: str, window: float = WINDOW):
+        self.path = path                        # 文件, 或包含 CSV 的目录
+        self.window = window
+        self.frames = FrameWindow()
+        self.file: Optional[str] = None         # 当前跟踪的文件
+        self.format: Optional[str] = None       # 匹配到的帧时间列名
+        self.bad_lines = 0
+        self._offset = 0
+        self._column = -1
+        self._partial = b""
+        self._lock = threading.Lock()
+        self._last_frame = 0.0                  # 最近一次读到新帧 (time.monotonic)
+        self._cached: Optional[Dict[str, float]] = None
+        self._cached_total = -1
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="HertaFrametimes", daemon=True)
+        self._thread.start()
+        logger.info(f"帧时间采集已启用: {self.path}")
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- 读取线程 ---
+    def _latest_file(self) -> Optional[str]:
+        if not os.path.isdir(self.path):
+            return self.path if os.path.exists(self.path) else None
+        files = glob.glob(os.path.join(self.path, "*.csv"))
+        return max(files, key=os.path.getmtime) if files else None
+
+    def _open(self, path: str, from_start: bool) -> bool:
+        """查找表头; from_start 为 False 时跳过已有内容 (只跟踪新增的帧)"""
+        with open(path, "rb") as f:
+            head = f.read(HEADER_SCAN)
+        offset = 0
+        for line in head.split(b"\n")[:-1]:
+            offset += len(line) + 1
+            cols = [c.strip() for c in line.decode("utf-8", "replace").split(",")]
+            for name in FRAMETIME_COLUMNS:
+                if name in cols:
+                    self.file, self.format, self._column = path, name, cols.index(name)
+                    self._offset = offset if from_start else os.path.getsize(path)
+                    self._partial = b""
+                    logger.info(f"帧时间日志: {path} (列 {name})")
+                    return True
+        return False    # 表头尚未写入, 稍后重试
+
+    def _run(self):
+        first = True
+        while not self._stop_event.is_set():
+            try:
+                latest = self._latest_file()
+                if latest is not None and latest != self.file:
+                    # 启动时已存在的文件只跟踪新增内容; 之后出现的新文件从头读取
+                    if self._open(latest, from_start=not first):
+                        first = False
+                elif latest is None:
+                    first = False
+                if self.file is not None:
+                    while self._read_chunk():
+                        pass
+            except OSError as e:
+                logger.warning(f"帧时间日志读取失败: {e}")
+                self.file = None
+            self._stop_event.wait(POLL_INTERVAL)
+
+    def _read_chunk(self) -> bool:
+        """读取一块新内容, 返回是否可能还有更多"""
+        size = os.path.getsize(self.file)
+        if size < self._offset:
+            # 文件被截断 / 覆盖: 重新查找表头
+            self.file = None
+            return False
+        if size == self._offset:
+            return False
+        with open(self.file, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(CHUNK_SIZE)
+        self._offset += len(data)
+
+        data = self._partial + data
+        cut = data.rfind(b"\n") + 1
+        self._partial = data[cut:]
+        if cut:
+            self._ingest(data[:cut].decode("utf-8", "replace").splitlines())
+        return len(data) - len(self._partial) >= CHUNK_SIZE
+
+    def _ingest(self, lines: List[str]):
+        col = self._column
+        values = []
+        for line in lines:
+            parts = line.split(",")
+            try:
+                values.append(float(parts[col]))
+            except (IndexError, ValueError):
+                self.bad_lines += 1     # 重复的表头 / 摘要行等
+        if not values:
+            return
+        frames = np.asarray(values, dtype=np.float32)
+        frames = frames[frames > 0]
+        if not frames.size:
+            return              # 全是 0 / 负值: 不算读到新帧
+        with self._lock:
+            self.frames.extend(frames)
+        self._last_frame = time.monotonic()
+
+    # --- 采样线程侧 ---
+    def stats(self) -> Dict[str, Optional[float]]:
+        """当前窗口的帧统计; 没有新帧时返回全 None (仅在有新帧时重新计算)"""
+        if time.monotonic() - self._last_frame > STALE_AFTER:
+            return dict.fromkeys(FRAME_FIELDS)
+        with self._lock:
+            if self.frames.total != self._cached_total:
+                recent = self.frames.recent(self.window * 1000)
+                self._cached = FrameWindow.summarize(recent) if recent.size else dict.fromkeys(FRAME_FIELDS)
+                self._cached_total = self.frames.total
+            return self._cached
+
+    def status(self) -> dict:
+        return {
+            "path": self.path,
+            "file": self.file,
+            "column": self.format,
+            "frames": self.frames.total,
+            "bad_lines": self.bad_lines,
+            "last_frame_age": round(time.monotonic() - self._last_frame, 1) if self._last_frame else None,
+        }
@@ -0,0 +1,340 @@
+"""
+黑塔之眼 - 硬件监控
+==========================================
+- 通过 Pythonnet 加载 LibreHardwareMonitorLib.dll (无 Mock 回退)
+- 传感器句柄索引 (SensorIndex): 每个 SystemStats 字段只在建索引时
+  解析一次对应的传感器 (按 sensor.Identifier), 每次采样仅读取 Value
+- 硬件 / 传感器增减时自动重建索引
+- 各类硬件的 Update() 由 UpdateScheduler 按各自周期调度
+- 完整传感器树 (含 SubHardware) 编目一次, 按较低频率整体读取为 NumPy 数组
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
+import numpy as np
+import os
+import sys
+import time
+import logging
+
+from backend.scheduler import Cadence, DEFAULT_CADENCE, UpdateScheduler, hardware_class
+
+logger = logging.getLogger("HertaBackend")
+
+
+# --- 数据模型 ---
+class SystemStats(BaseModel):
+    # 快照内容不可变, 可在多个请求/线程间共享
+    model_config = ConfigDict(frozen=True)
+
+    cpu: Optional[float] = None
+    cpu_temp: Optional[float] = None
+    ram: Optional[float] = None
+    gpu_usage: Optional[float] = None
+    gpu_temp: Optional[float] = None
+    gpu_vram_used: Optional[float] = None
+    gpu_vram_total: Optional[float] = None
+    gpu_power: Optional[float] = None
+    gpu_clock: Optional[float] = None
+    fan_speed: Optional[str] = None
+    # 帧数据 (来自帧时间日志, 见 backend.frametimes; 未启用或游戏未运行时为 None)
+    fps: Optional[float] = None
+    frametime_ms: Optional[float] = None
+    fps_1pct_low: Optional[float] = None
+    fps_01pct_low: Optional[float] = None
+
+
+# --- 字段映射规则 ---
+class FieldRule(NamedTuple):
+    field: str
+    match: Callable[[str, str, str, str], bool]    # (h_type, h_name, s_type, s_name)
+    reduce: str                                     # last / max / max_pos / fans
+    ndigits: int = 1
+
+# 仅在建索引时求值, 采样时不再做任何字符串判断
+FIELD_RULES = [
+    # === CPU ===
+    FieldRule("cpu", lambda h, hn, s, n: h == "Cpu" and s == "Load" and n == "CPU Total", "last"),
+    FieldRule("cpu_temp", lambda h, hn, s, n: h == "Cpu" and s == "Temperature"
+              and ("Core" in n or "Package" in n), "max_pos"),
+    # === RAM ===
+    FieldRule("ram", lambda h, hn, s, n: h == "Memory" and "Total" in hn and s == "Load" and n == "Memory", "last"),
+    # === GPU ===
+    FieldRule("gpu_usage", lambda h, hn, s, n: "Gpu" in h and s == "Load" and n == "GPU Core", "max"),
+    FieldRule("gpu_temp", lambda h, hn, s, n: "Gpu" in h and s == "Temperature"
+              and ("Core" in n or "Hot Spot" in n), "max_pos"),
+    FieldRule("gpu_vram_used", lambda h, hn, s, n: "Gpu" in h and s == "SmallData" and n == "GPU Memory Used", "max_pos", 0),
+    FieldRule("gpu_vram_total", lambda h, hn, s, n: "Gpu" in h and s == "SmallData" and n == "GPU Memory Total", "max_pos", 0),
+    FieldRule("gpu_power", lambda h, hn, s, n: "Gpu" in h and s == "Power" and "Package" in n, "last"),
+    FieldRule("gpu_clock", lambda h, hn, s, n: "Gpu" in h and s == "Clock" and n == "GPU Core", "max_pos", 0),
+    FieldRule("fan_speed", lambda h, hn, s, n: "Gpu" in h and s == "Fan", "fans"),
+]
+
+
+def _reduce(rule: FieldRule, values: List[float]):
+    if not values:
+        return None
+    if rule.reduce == "fans":
+        return ", ".join(f"{int(v)} RPM" for v in values)
+    if rule.reduce == "last":
+        value = values[-1]
+    elif rule.reduce == "max":
+        value = max(0, *values)
+    else:  # max_pos: 仅统计正值
+        positive = [v for v in values if v > 0]
+        if not positive:
+            return None
+        value = max(positive)
+    return round(value, rule.ndigits)
+
+
+class HardwareHandle(NamedTuple):
+    hardware: object
+    h_type: str
+    name: str
+
+
+class SensorInfo(NamedTuple):
+    """传感器元数据 (建索引时读取一次)"""
+    identifier: str
+    hardware_type: str
+    hardware: str
+    sensor_type: str
+    sensor: str
+
+
+class SensorReadings(NamedTuple):
+    """完整传感器树的一次读数 (不可变)"""
+    catalog: Tuple[SensorInfo, ...]
+    version: int            # 编目版本 (索引重建次数), 版本不变则 catalog 不变
+    timestamp: float        # 读取时刻 (time.time)
+    values: np.ndarray      # float64, 与 catalog 一一对应, 无数据为 NaN
+
+
+class SensorIndex:
+    """
+    SystemStats 字段 -> 传感器句柄 的缓存索引。
+    建索引时遍历一次 CLR 对象树; 之后每次采样只访问 sensor.Value。
+    """
+
+    def __init__(self, computer=None, rules: List[FieldRule] = FIELD_RULES):
+        self.computer = None
+        self.rules = rules
+        self.hardware: List[HardwareHandle] = []    # 需要 Update() 的硬件 (含 SubHardware)
+        self.sensors: Dict[str, object] = {}        # identifier -> sensor 句柄
+        self.fields: Dict[str, List[str]] = {}      # field -> [identifier, ...]
+        self.field_classes: Dict[str, set] = {}    # field -> 提供该字段的硬件类别 (按需调度用)
+        self.catalog: Tuple[SensorInfo, ...] = ()   # 完整传感器树 (含未映射到字段的传感器)
+        self.controls: Dict[str, object] = {}      # Control 类传感器 identifier -> 句柄 (风扇控制)
+        self.mapped: Tuple[SensorInfo, ...] = ()    # 映射到字段的传感器 (与 sensors 顺序一致)
+        self.values: Optional[np.ndarray] = None    # 最近一次 read() 的逐传感器读数 (合并前, 与 mapped 对应)
+        self._all: List = []                        # 与 catalog 对应的传感器句柄
+        self.dirty = True
+        self.builds = 0
+        self._watched = set()
+        if computer is not None:
+            self.attach(computer)
+
+    def attach(self, computer):
+        """绑定已打开的 Computer (可延后到硬件打开之后)"""
+        self.computer = computer
+        self.dirty = True
+        self._subscribe(computer, ("HardwareAdded", "HardwareRemoved"))
+
+    def _subscribe(self, target, events):
+        """订阅 .NET 事件 (硬件/传感器增减) 以标记索引失效"""
+        for name in events:
+            try:
+                event = getattr(target, name)
+                event += self._invalidate
+            except Exception:
+                pass
+
+    def _invalidate(self, *args):
+        self.dirty = True
+
+    def _walk(self, hardware_list):
+        for hardware in hardware_list:
+            yield hardware
+            yield from self._walk(hardware.SubHardware)
+
+    def rebuild(self):
+        self.hardware = []
+        self.sensors = {}
+        self.fields = {rule.field: [] for rule in self.rules}
+        self.field_classes = {rule.field: set() for rule in self.rules}
+        catalog = []
+        controls = {}
+        mapped = []
+        self._all = []
+
+        for hardware in self._walk(self.computer.Hardware):
+            if id(hardware) not in self._watched:
+                self._watched.add(id(hardware))
+                self._subscribe(hardware, ("SensorAdded", "SensorRemoved"))
+
+            h_type = str(hardware.HardwareType)
+            h_name = hardware.Name
+            self.hardware.append(HardwareHandle(hardware, h_type, h_name))
+            for sensor in hardware.Sensors:
+                s_type = str(sensor.SensorType)
+                s_name = sensor.Name
+                ident = str(sensor.Identifier)
+                catalog.append(SensorInfo(ident, h_type, h_name, s_type, s_name))
+                self._all.append(sensor)
+                if s_type == "Control":
+                    controls[ident] = sensor
+
+                matched = [r.field for r in self.rules if r.match(h_type, h_name, s_type, s_name)]
+                if not matched:
+                    continue
+                self.sensors[ident] = sensor
+                mapped.append(catalog[-1])
+                for field in matched:
+                    self.fields[field].append(ident)
+                    self.field_classes[field].add(hardware_class(h_type))
+
+        self.catalog = tuple(catalog)
+        self.mapped = tuple(mapped)
+        self.values = None
+        # 整体替换: 风扇控制线程可随时读取
+        self.controls = controls
+        self.dirty = False
+        self.builds += 1
+        logger.info(f"传感器索引已重建: {len(self.hardware)} 个硬件, {len(self.catalog)} 个传感器 "
+                    f"({len(self.sensors)} 个映射到 SystemStats)")
+
+    def read(self) -> SystemStats:
+        """读取已索引传感器的当前值 (每个传感器一次 CLR 调用)"""
+        values = {ident: sensor.Value for ident, sensor in self.sensors.items()}
+        # 合并 (max 等) 之前的逐设备读数, 供滚动窗口统计 (backend.rolling)
+        self.values = np.array(list(values.values()), dtype=np.float64)  # None -> NaN
+        result = {}
+        for rule in self.rules:
+            vals = [values[i] for i in self.fields[rule.field] if values[i] is not None]
+            result[rule.field] = _reduce(rule, vals)
+        return SystemStats(**result)
+
+    def read_all(self) -> np.ndarray:
+        """读取完整传感器树的当前值 (与 catalog 对应, 只读数组)"""
+        values = np.array([s.Value for s in self._all], dtype=np.float64)  # None -> NaN
+        values.flags.writeable = False
+        return values
+
+
+# --- 硬件监控 (无 Mock 回退) ---
+def open_computer():
+    """加载 DLL 并打开 Computer, 失败则直接报错退出"""
+    try:
+        import clr
+    except ImportError:
+        logger.error("pythonnet 未安装，请运行: pip install pythonnet")
+        sys.exit(1)
+
+    dll_path = os.path.join(os.getcwd(), "LibreHardwareMonitorLib.dll")
+
+    if not os.path.exists(dll_path):
+        print(f"❌ 致命错误: DLL 未找到: {dll_path}")
+        sys.exit(1)
+
+    try:
+        clr.AddReference(dll_path)
+        from LibreHardwareMonitor.Hardware import Computer
+
+        computer = Computer()
+        computer.IsCpuEnabled = True
+        computer.IsGpuEnabled = True
+        computer.IsMemoryEnabled = True
+        computer.IsMotherboardEnabled = True
+        computer.IsControllerEnabled = True
+        computer.IsStorageEnabled = False
+        computer.IsNetworkEnabled = False
+
+        computer.Open()
+        print("✅ 硬件监控初始化成功 (v5.2 - Sensor Index)")
+        return computer
+
+    except Exception as e:
+        print(f"❌ 致命错误: DLL 加载失败: {e}")
+        sys.exit(1)
+
+
+class HardwareMonitor:
+    def __init__(self, computer=None, cadences: Dict[str, Cadence] = DEFAULT_CADENCE,
+                 tree_period: float = 1.0, timings=None, lazy: bool = False):
+        # computer 可注入 (如 backend.synthetic 合成树), 默认打开真实硬件;
+        # lazy=True 时推迟到首次采样 (在采样线程内打开, 不阻塞启动)
+        self.computer = computer
+        self.index = SensorIndex(computer)
+        self.open_seconds: Optional[float] = None
+        self.scheduler = UpdateScheduler(cadences, timings)
+        if timings is not None:
+            # 耗时统计 (backend.timings): 仅在启用时包装, 关闭时无任何开销
+            self.index.read = timings.timed("sensors read")(self.index.read)
+            self.index.read_all = timings.timed("sensors read_all")(self.index.read_all)
+            self.index.rebuild = timings.timed("sensors rebuild")(self.index.rebuild)
+        # 完整传感器树的读取周期 (秒); 树中传感器数量远多于 SystemStats 所需
+        self.tree_period = tree_period
+        self._readings: Optional[SensorReadings] = None
+        self._tree_due = 0.0
+        # 按需采样 (backend.demand): 每次更新前应用当前需求; 无人读取完整树时不刷新树读数
+        self.demand = None
+        self.tree_enabled = True
+        if self.computer is None and not lazy:
+            self.open()
+
+    @property
+    def opened(self) -> bool:
+        return self.computer is not None
+
+    def open(self):
+        """加载 DLL 并打开 Computer (耗时数秒; 失败时直接退出)"""
+        if self.computer is None:
+            t0 = time.perf_counter()
+            self.computer = open_computer()
+            self.open_seconds = round(time.perf_counter() - t0, 3)
+            logger.info(f"硬件已打开 ({self.open_seconds:.2f}s)")
+        if self.index.computer is None:
+            self.index.attach(self.computer)
+
+    def _refresh_index(self):
+        if self.index.dirty:
+            self.index.rebuild()
+            self.scheduler.assign(self.index.hardware)
+
+    def get_status(self) -> SystemStats:
+        if self.computer is None:
+            self.open()
+        self._refresh_index()
+        if self.demand is not None:
+            self.demand.apply()
+        self.scheduler.run_due()
+        # Update() 可能新增传感器 (触发 SensorAdded)
+        self._refresh_index()
+        return self.index.read()
+
+    def sample(self) -> Tuple[SystemStats, SensorReadings]:
+        """一次采样: SystemStats + 完整传感器树 (树按 tree_period 节流, 期间复用上次读数)"""
+        stats = self.get_status()
+        now = time.monotonic()
+        readings = self._readings
+        if readings is None or readings.version != self.index.builds or (self.tree_enabled and now >= self._tree_due):
+            readings = SensorReadings(self.index.catalog, self.index.builds, time.time(), self.index.read_all())
+            self._readings = readings
+            self._tree_due = now + self.tree_period
+        return stats, readings
+
+    def device_readings(self) -> Optional[SensorReadings]:
+        """最近一次采样中映射到 SystemStats 的各传感器读数 (按设备分开, 未经合并); 采样线程内调用"""
+        if self.index.values is None:
+            return None
+        return SensorReadings(self.index.mapped, self.index.builds, time.time(), self.index.values)
+
+    def close(self):
+        self.scheduler.stop()
+        if self.computer is None:
+            return
+        try:
+            self.computer.Close()
+        except Exception as e:
+            logger.warning(f"关闭硬件失败: {e}")
@@ -0,0 +1,250 @@
+"""
+黑塔之眼 - 历史数据存储 (SQLite)
+==========================================
+- WAL 模式数据库, 所有写入由独立写线程完成
+- 采样线程只把快照放入有界队列 (满则丢弃并计数), 绝不阻塞采样
+- 写线程批量写入原始样本 (每个事务一批)
+- 原始样本自动汇总为 1 分钟 / 1 小时 min/max/avg 层级, 各层级独立保留期
+- 范围查询自动选择合适的层级, 并用 LTTB 降采样为列式结果
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from backend.downsample import lttb_indices
+from backend.hardware import SystemStats
+from backend.sampler import Snapshot
+
+logger = logging.getLogger("HertaBackend")
+
+# 可汇总的数值指标 (fan_speed 为文本, 不入库)
+METRICS = [name for name, f in SystemStats.model_fields.items() if f.annotation == Optional[float]]
+
+
+class Tier(NamedTuple):
+    table: str
+    bucket_ms: int      # 汇总桶宽 (毫秒), 原始层为 0
+    retention: float    # 保留期 (秒)
+
+
+RAW = Tier("samples", 0, 2 * 86400)
+TIERS = [
+    Tier("rollup_1m", 60_000, 30 * 86400),
+    Tier("rollup_1h", 3_600_000, 365 * 86400),
+]
+
+RAW_INTERVAL = 1.0      # 原始样本最小间隔 (秒), 采样更快时只入库其中一部分
+QUEUE_SIZE = 1024       # 写队列上限
+BATCH_SIZE = 64         # 单个事务最多写入的样本数
+FLUSH_INTERVAL = 5.0    # 最长刷盘间隔 (秒)
+
+# 查询时允许读取的行数上限 = max_points * ROWS_PER_POINT, 超出则改用更粗的层级
+ROWS_PER_POINT = 20
+AGGREGATES = ("avg", "min", "max")
+
+_STOP = object()
+
+
+class HistoryStore:
+    def __init__(self, path: str, raw_interval: float = RAW_INTERVAL):
+        self.path = path
+        self.raw_interval = raw_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._last_offer = 0.0
+        self._watermarks: Dict[str, int] = {}
+        self.written = 0
+        self.dropped = 0
+        self._create_schema()
+
+    # --- 连接与表结构 ---
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_schema(self):
+        conn = self.connect()
+        with conn:
+            cols = ", ".join(f"{m} REAL" for m in METRICS)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {RAW.table} (ts INTEGER PRIMARY KEY, {cols})")
+            for tier in TIERS:
+                cols = ", ".join(f"{m}_min REAL, {m}_max REAL, {m}_avg REAL" for m in METRICS)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {tier.table} (ts INTEGER PRIMARY KEY, n INTEGER, {cols})")
+            # 旧数据库: 补上新增指标的列
+            for table, wanted in ((RAW.table, METRICS),
+                                  *((t.table, [f"{m}_{a}" for m in METRICS for a in ("min", "max", "avg")])
+                                    for t in TIERS)):
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for col in wanted:
+                    if col not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} REAL")
+        for tier in TIERS:
+            # 已完成汇总的水位线: 最后一个汇总桶的结束时刻
+            last = conn.execute(f"SELECT MAX(ts) FROM {tier.table}").fetchone()[0]
+            self._watermarks[tier.table] = 0 if last is None else last + tier.bucket_ms
+        conn.close()
+
+    # --- 采样线程侧 ---
+    def offer(self, snap: Snapshot):
+        """采样线程回调: 按 raw_interval 节流后放入写队列, 队列满则丢弃"""
+        if snap.timestamp - self._last_offer < self.raw_interval:
+            return
+        self._last_offer = snap.timestamp
+        try:
+            self._queue.put_nowait((snap.timestamp, snap.stats))
+        except queue.Full:
+            self.dropped += 1
+
+    # --- 写线程 ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="HertaHistory", daemon=True)
+        self._thread.start()
+        logger.info(f"历史记录已启用: {self.path}")
+
+    def stop(self, timeout: float = 10.0):
+        if not self._thread:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("历史写队列已满, 部分样本未落盘")
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        conn = self.connect()
+        batch = []
+        next_flush = time.monotonic() + FLUSH_INTERVAL
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(conn, batch)
+                break
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= BATCH_SIZE or time.monotonic() >= next_flush:
+                if batch:
+                    self._flush(conn, batch)
+                    self._maintain(conn, batch[-1][0])
+                    batch = []
+                next_flush = time.monotonic() + FLUSH_INTERVAL
+        conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, batch: List):
+        if not batch:
+            return
+        rows = [(int(ts * 1000), *(getattr(stats, m) for m in METRICS)) for ts, stats in batch]
+        placeholders = ", ".join("?" * (len(METRICS) + 1))
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {RAW.table} (ts, {', '.join(METRICS)}) VALUES ({placeholders})", rows
+                )
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            logger.error(f"历史写入失败: {e}")
+
+    def _maintain(self, conn: sqlite3.Connection, now: float):
+        """汇总已完成的时间桶, 并按保留期清理 (仅在有新桶完成时执行)"""
+        now_ms = int(now * 1000)
+        try:
+            with conn:
+                for tier in TIERS:
+                    end = now_ms - now_ms % tier.bucket_ms
+                    start = self._watermarks[tier.table]
+                    if end <= start:
+                        continue
+                    self._rollup(conn, tier, start, end)
+                    self._watermarks[tier.table] = end
+                    for t in (RAW, *TIERS):
+                        conn.execute(f"DELETE FROM {t.table} WHERE ts < ?", (now_ms - int(t.retention * 1000),))
+        except sqlite3.Error as e:
+            logger.error(f"历史汇总失败: {e}")
+
+    def _rollup(self, conn: sqlite3.Connection, tier: Tier, start: int, end: int):
+        aggs = ", ".join(f"MIN({m}), MAX({m}), AVG({m})" for m in METRICS)
+        cols = ", ".join(f"{m}_min, {m}_max, {m}_avg" for m in METRICS)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {tier.table} (ts, n, {cols}) "
+            f"SELECT ts - ts % {tier.bucket_ms} AS bucket, COUNT(*), {aggs} "
+            f"FROM {RAW.table} WHERE ts >= ? AND ts < ? GROUP BY bucket",
+            (start, end)
+        )
+
+    # --- 查询 ---
+    def choose_tier(self, start: float, end: float, max_points: int) -> Tier:
+        """选择能覆盖查询范围且行数不超过 max_points * ROWS_PER_POINT 的最细层级"""
+        now = time.time()
+        budget = max_points * ROWS_PER_POINT
+        span = end - start
+        for tier, step in ((RAW, self.raw_interval or 1.0), *((t, t.bucket_ms / 1000) for t in TIERS)):
+            if start >= now - tier.retention and span / step <= budget:
+                return tier
+        return TIERS[-1]
+
+    def query(self, metrics: List[str], start: float, end: float,
+              max_points: int = 300, agg: str = "avg") -> dict:
+        """
+        范围查询 (列式结果)。
+        返回 {"tier", "timestamps": [...], "metrics": {name: [...]}}, 时间戳单位为秒。
+        """
+        tier = self.choose_tier(start, end, max_points)
+        cols = metrics if tier is RAW else [f"{m}_{agg}" for m in metrics]
+
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                f"SELECT ts, {', '.join(cols)} FROM {tier.table} WHERE ts >= ? AND ts < ? ORDER BY ts",
+                (int(start * 1000), int(end * 1000))
+            ).fetchall()
+        finally:
+            conn.close()
+
+        # None -> NaN
+        data = np.array(rows, dtype=np.float64).reshape(len(rows), len(cols) + 1)
+        ts, values = data[:, 0], data[:, 1:]
+        raw_points = len(ts)
+        if raw_points > max_points:
+            idx = lttb_indices(ts, values, max_points)
+            ts, values = ts[idx], values[idx]
+
+        values = np.round(values, 2)
+        return {
+            "tier": tier.table,
+            "source_points": raw_points,
+            "timestamps": (ts / 1000).tolist(),
+            "metrics": {
+                # NaN -> None (JSON null)
+                m: [None if v != v else v for v in values[:, i].tolist()]
+                for i, m in enumerate(metrics)
+            },
+        }
+
+    def status(self) -> dict:
+        size = 0
+        for suffix in ("", "-wal"):
+            if os.path.exists(self.path + suffix):
+                size += os.path.getsize(self.path + suffix)
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "size_bytes": size,
+        }
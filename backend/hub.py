@@ -0,0 +1,78 @@
+"""
+黑塔之眼 - 多机汇总中心 (Hub)
+==========================================
+- 独立入口: python -m backend.hub
+- 并发轮询多台机器上的 backend.main (/stats), 提供整个机房的汇总视图
+- 不加载 DLL, 可运行在任意机器上
+
+配置:
+- HERTA_RIGS: 机器列表, 如 "pc1=192.168.1.11,pc2=192.168.1.12:8000"
+- HERTA_HUB_PERIOD: 轮询周期 (秒), 默认 1.0
+- HERTA_HUB_TIMEOUT: 单次请求超时 (秒), 默认 0.8
+- HERTA_HUB_PORT: 监听端口, 默认 8100
+"""
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import uvicorn
+import os
+import time
+import logging
+
+from backend.fleet import FleetAggregate, FleetCollector, FleetResponse, RigStatus, parse_rigs
+
+# --- 日志配置 ---
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s] %(levelname)s: %(message)s"
+)
+logger = logging.getLogger("HertaBackend")
+# httpx 默认每个请求一条 INFO 日志
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# --- 配置 ---
+RIGS = parse_rigs(os.environ.get("HERTA_RIGS", "localhost:8000"))
+HUB_PERIOD = float(os.environ.get("HERTA_HUB_PERIOD", "1.0"))
+HUB_TIMEOUT = float(os.environ.get("HERTA_HUB_TIMEOUT", "0.8"))
+HUB_PORT = int(os.environ.get("HERTA_HUB_PORT", "8100"))
+
+collector = FleetCollector(RIGS, period=HUB_PERIOD, timeout=HUB_TIMEOUT)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await collector.start()
+    yield
+    await collector.stop()
+
+app = FastAPI(title="Herta's Eye Hub", description="多机汇总 API", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# --- API ---
+@app.get("/fleet", response_model=FleetResponse)
+async def get_fleet():
+    """所有机器的最新数据与健康状态, 以及汇总指标"""
+    return collector.snapshot()
+
+@app.get("/fleet/aggregate", response_model=FleetAggregate)
+async def get_fleet_aggregate():
+    """汇总指标: 最热 GPU / CPU, 平均负载, 总功耗 (只统计在线机器)"""
+    return collector.aggregate()
+
+@app.get("/fleet/{name}", response_model=RigStatus)
+async def get_rig(name: str):
+    rig = collector.rigs.get(name)
+    if rig is None:
+        raise HTTPException(status_code=404, detail=f"机器不存在: {name}")
+    return rig.status(time.monotonic())
+
+if __name__ == "__main__":
+    print(f"🛰️ 黑塔汇总中心: {len(RIGS)} 台机器 -> http://0.0.0.0:{HUB_PORT}/fleet")
+    uvicorn.run(app, host="0.0.0.0", port=HUB_PORT, log_level="warning")
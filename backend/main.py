@@ -8,15 +8,40 @@
 - 完善的错误处理和日志
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+import argparse
+import asyncio
+import json
 import uvicorn
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import os
-import sys
+import time
 import logging
 
+from backend.alerts import EVAL_PERIOD as ALERT_PERIOD, AlertEngine, AlertsResponse, load_rules
+from backend.demand import HEARTBEAT_PERIOD, TREE_TTL, DemandTracker
+from backend.encoding import VARY, SnapshotEncoder, etag_matches, select_variant
+from backend.hardware import HardwareMonitor, SystemStats
+from backend.fancontrol import FanControlStatus, FanController, load_fan_config
+from backend.frametimes import FrametimeTail
+from backend.history import AGGREGATES, METRICS, HistoryStore
+from backend.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsExporter
+from backend.rolling import RollingResponse, RollingStats, parse_window
+from backend.sampler import Sampler, Snapshot
+from backend.sessions import SessionDetector, SessionReport, SessionSummary
+from backend.startup import StartupTracker
+from backend.shm import DEFAULT_NAME as SHM_DEFAULT_NAME, SnapshotPublisher
+from backend.sensors import SensorQuery, SensorsResponse, SensorValue
+from backend.timings import TimingMiddleware, Timings
+from backend.stream import StreamHub, Subscriber, encode_frame, sse_event
+from backend.throttle import EVAL_PERIOD as THROTTLE_PERIOD, FIELDS as THROTTLE_FIELDS, ThrottleDetector, ThrottleResponse
+from backend.trace import TraceRecorder, open_replay
+
 # --- 日志配置 ---
 logging.basicConfig(
     level=logging.INFO,
@@ -24,14 +49,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger("HertaBackend")
 
-# --- Pythonnet 导入 ---
-try:
-    import clr
-except ImportError:
-    logger.error("pythonnet 未安装，请运行: pip install pythonnet")
-    sys.exit(1)
+# 启动阶段计时 (距托盘启动进程的时刻, 见 backend.startup)
+startup = StartupTracker()
+startup.mark("imported")
+
+# --- 命令行 ---
+# python -m backend.main --replay trace.bin --speed 4
+# 命令行参数覆盖对应的环境变量 (以模块方式被导入时不解析)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="黑塔之眼后端")
+    parser.add_argument("--record", metavar="TRACE", help="录制完整传感器树轨迹 (HERTA_RECORD)")
+    parser.add_argument("--replay", metavar="TRACE", help="回放轨迹, 不加载 DLL (HERTA_REPLAY)")
+    parser.add_argument("--speed", type=float, help="回放倍速 (HERTA_REPLAY_SPEED)")
+    args = parser.parse_args()
+    for env, value in (("HERTA_RECORD", args.record), ("HERTA_REPLAY", args.replay),
+                       ("HERTA_REPLAY_SPEED", args.speed)):
+        if value is not None:
+            os.environ[env] = str(value)
+
+# --- 采样配置 ---
+# 采样周期 (秒), 可通过环境变量 HERTA_SAMPLE_PERIOD 覆盖
+# 各类硬件的 Update() 周期见 backend.scheduler.DEFAULT_CADENCE
+SAMPLE_PERIOD = float(os.environ.get("HERTA_SAMPLE_PERIOD", "0.25"))
+# 完整传感器树 (/metrics 等) 的读取周期 (秒)
+TREE_PERIOD = float(os.environ.get("HERTA_TREE_PERIOD", "1.0"))
+# 按需采样: 只更新有消费者的硬件, 无消费者时降为心跳 (HERTA_ON_DEMAND=0 恢复为始终全量采样)
+ON_DEMAND = os.environ.get("HERTA_ON_DEMAND", "1") != "0"
+HEARTBEAT = float(os.environ.get("HERTA_HEARTBEAT", str(HEARTBEAT_PERIOD)))
+# 轨迹录制 / 回放文件 (见 backend.trace)
+RECORD_FILE = os.environ.get("HERTA_RECORD")
+REPLAY_FILE = os.environ.get("HERTA_REPLAY")
+REPLAY_SPEED = float(os.environ.get("HERTA_REPLAY_SPEED", "1.0"))
+# 热路径耗时统计, HERTA_TIMINGS=0 完全关闭; HERTA_TIMINGS_LOG 为定期日志间隔 (秒, 0 为不输出)
+TIMINGS_ENABLED = os.environ.get("HERTA_TIMINGS", "1") != "0"
+TIMINGS_LOG = float(os.environ.get("HERTA_TIMINGS_LOG", "0"))
+# 历史数据库路径, 设为空字符串则禁用历史记录 (回放时默认禁用, 避免混入真实历史)
+HISTORY_DB = os.environ.get("HERTA_HISTORY_DB", "" if REPLAY_FILE else "herta_history.db")
+# 帧时间日志 (PresentMon / MangoHud CSV) 文件或目录, 未设置时不采集帧数据
+FRAMETIME_LOG = os.environ.get("HERTA_FRAMETIME_LOG")
+# 游戏会话识别 (/sessions), 设为 0 则禁用: GPU 负载 >= ENTER 持续 ENTER_AFTER 秒开始, < EXIT 持续 EXIT_AFTER 秒结束
+SESSIONS = os.environ.get("HERTA_SESSIONS", "1") == "1"
+SESSION_ENTER = float(os.environ.get("HERTA_SESSION_ENTER", "60"))
+SESSION_EXIT = float(os.environ.get("HERTA_SESSION_EXIT", "30"))
+SESSION_ENTER_AFTER = float(os.environ.get("HERTA_SESSION_ENTER_AFTER", "30"))
+SESSION_EXIT_AFTER = float(os.environ.get("HERTA_SESSION_EXIT_AFTER", "60"))
+# 已结束会话的战报文件 (JSON Lines), 设为空字符串则只保存在内存中
+SESSIONS_FILE = os.environ.get("HERTA_SESSIONS_FILE", "" if REPLAY_FILE else "herta_sessions.jsonl")
+# 按设备滚动窗口统计保留的分钟数 (/stats/rolling), 设为 0 则禁用
+ROLLING_MINUTES = float(os.environ.get("HERTA_ROLLING_MINUTES", "10"))
+# GPU 降频检测 (/throttle), 设为 0 则禁用 (温度墙见 HERTA_THROTTLE_TEMP)
+THROTTLE = os.environ.get("HERTA_THROTTLE", "1") == "1"
+# 共享内存快照块名称 (同机悬浮窗读取, 见 backend.shm), 设为空字符串则禁用
+SHM_NAME = os.environ.get("HERTA_SHM", SHM_DEFAULT_NAME)
+# 风扇闭环控制 (危险功能): HERTA_FAN_CONTROL=1 启用, HERTA_FAN_CONFIG 为曲线配置 JSON (未设置时用默认曲线)
+FAN_CONTROL = os.environ.get("HERTA_FAN_CONTROL", "0") == "1"
+FAN_CONFIG = os.environ.get("HERTA_FAN_CONFIG")
+# 告警规则文件 (JSON), 未设置时使用 backend.alerts.DEFAULT_RULES
+RULES_FILE = os.environ.get("HERTA_RULES")
+# 内置仪表盘 (GET /dashboard): 单个静态 HTML, 浏览器订阅推送流自行渲染
+DASHBOARD_FILE = Path(__file__).parent / "static" / "dashboard.html"
 
-app = FastAPI(title="Herta's Eye v5.2", description="游戏硬件监控 API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 不在此处等待硬件: 采样线程在后台打开硬件, uvicorn 随后立即监听端口
+    startup.mark("listening")
+    hub.bind(asyncio.get_running_loop())
+    if timings and TIMINGS_LOG > 0:
+        timings.start_logging(TIMINGS_LOG)
+    if history:
+        history.start()
+    if frames:
+        frames.start()
+    sampler.start()
+    if fans:
+        fans.start()
+    yield
+    if fans:
+        fans.stop()     # 先恢复默认风扇控制, 再停止采样
+    sampler.stop()
+    if frames:
+        frames.stop()
+    if history:
+        history.stop()
+    if recorder:
+        recorder.close()
+    if sessions:
+        sessions.close()
+    if shm:
+        shm.close()
+    if timings:
+        timings.stop()
+    monitor.close()
+
+app = FastAPI(title="Herta's Eye v5.2", description="游戏硬件监控 API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -41,161 +151,440 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 耗时统计: 关闭时为 None, 各处不安装任何计时包装
+timings = Timings() if TIMINGS_ENABLED else None
+if timings:
+    app.add_middleware(TimingMiddleware, timings=timings)
+
 # --- 数据模型 ---
-class SystemStats(BaseModel):
-    cpu: Optional[float] = None
-    cpu_temp: Optional[float] = None
-    ram: Optional[float] = None
-    gpu_usage: Optional[float] = None
-    gpu_temp: Optional[float] = None
-    gpu_vram_used: Optional[float] = None
-    gpu_vram_total: Optional[float] = None
-    gpu_power: Optional[float] = None
-    gpu_clock: Optional[float] = None
-    fan_speed: Optional[str] = None
+class StatsResponse(SystemStats):
+    """/stats 每个快照只编码一次, 正文不含随请求变化的量: 样本年龄 = 当前时间 - sampled_at (亦见响应头 X-Sample-Age)"""
+    sample_seq: int         # 采样序号
+    sampled_at: float = Field(description="样本采集时刻 (Unix 时间戳, 秒); 样本年龄 = 当前时间 - sampled_at, "
+                                          "按需 / 心跳采样时可达数秒, 亦见响应头 X-Sample-Age")
 
 class RoastResponse(BaseModel):
     message: str
+    sample_seq: int
+    sample_age: float
 
-# --- 硬件监控 (无 Mock 回退) ---
-class HardwareMonitor:
-    def __init__(self):
-        dll_path = os.path.join(os.getcwd(), "LibreHardwareMonitorLib.dll")
-        
-        if not os.path.exists(dll_path):
-            print(f"❌ 致命错误: DLL 未找到: {dll_path}")
-            sys.exit(1)
-        
-        try:
-            clr.AddReference(dll_path)
-            from LibreHardwareMonitor.Hardware import Computer
-            
-            self.computer = Computer()
-            self.computer.IsCpuEnabled = True
-            self.computer.IsGpuEnabled = True
-            self.computer.IsMemoryEnabled = True
-            self.computer.IsMotherboardEnabled = True
-            self.computer.IsControllerEnabled = True
-            self.computer.IsStorageEnabled = False
-            self.computer.IsNetworkEnabled = False
-            
-            self.computer.Open()
-            print("✅ 硬件监控初始化成功 (v5.1 - No Mock)")
-            
-        except Exception as e:
-            print(f"❌ 致命错误: DLL 加载失败: {e}")
-            sys.exit(1)
-
-    def get_status(self) -> SystemStats:
-        cpu_usage = None
-        cpu_temp = None
-        ram_usage = None
-        gpu_usage = None
-        gpu_temp = None
-        gpu_vram_used = None
-        gpu_vram_total = None
-        gpu_power = None
-        gpu_clock = None
-        fan_speeds = []
-
-        for hardware in self.computer.Hardware:
-            hardware.Update()
-            h_type = str(hardware.HardwareType)
-
-            for sensor in hardware.Sensors:
-                s_type = str(sensor.SensorType)
-                s_name = sensor.Name
-                s_val = sensor.Value
-                
-                if s_val is None:
-                    continue
-
-                # === CPU ===
-                if h_type == "Cpu":
-                    if s_type == "Load" and s_name == "CPU Total":
-                        cpu_usage = round(s_val, 1)
-                    if s_type == "Temperature":
-                        if "Core" in s_name or "Package" in s_name:
-                            if s_val > 0:
-                                cpu_temp = round(max(cpu_temp or 0, s_val), 1)
-
-                # === RAM ===
-                if h_type == "Memory" and "Total" in hardware.Name:
-                    if s_type == "Load" and s_name == "Memory":
-                        ram_usage = round(s_val, 1)
-
-                # === GPU ===
-                if "Gpu" in h_type:
-                    if s_type == "Load" and s_name == "GPU Core":
-                        gpu_usage = round(max(gpu_usage or 0, s_val), 1)
-                    
-                    if s_type == "Temperature":
-                        if "Core" in s_name or "Hot Spot" in s_name:
-                            if s_val > 0:
-                                gpu_temp = round(max(gpu_temp or 0, s_val), 1)
-                    
-                    if s_type == "SmallData":
-                        if s_name == "GPU Memory Used":
-                            if s_val > (gpu_vram_used or 0):
-                                gpu_vram_used = round(s_val, 0)
-                        if s_name == "GPU Memory Total":
-                            if s_val > (gpu_vram_total or 0):
-                                gpu_vram_total = round(s_val, 0)
-                    
-                    if s_type == "Power" and "Package" in s_name:
-                        gpu_power = round(s_val, 1)
-                    
-                    if s_type == "Clock" and s_name == "GPU Core":
-                        if s_val > (gpu_clock or 0):
-                            gpu_clock = round(s_val, 0)
-                    
-                    if s_type == "Fan":
-                        fan_speeds.append(f"{int(s_val)} RPM")
-
-        fan_str = ", ".join(fan_speeds) if fan_speeds else None
-
-        return SystemStats(
-            cpu=cpu_usage,
-            cpu_temp=cpu_temp,
-            ram=ram_usage,
-            gpu_usage=gpu_usage,
-            gpu_temp=gpu_temp,
-            gpu_vram_used=gpu_vram_used,
-            gpu_vram_total=gpu_vram_total,
-            gpu_power=gpu_power,
-            gpu_clock=gpu_clock,
-            fan_speed=fan_str
-        )
-
-monitor = HardwareMonitor()
-
-# --- 黑塔语录 ---
-import random
-class HertaAgent:
-    ROASTS = [
-        "警告：核心温度过高。你是把咖啡倒进机箱里煮了吗？",
-        "GPU 要熔化了。在我的空间站里，这种低效是犯罪。",
-        "风扇在尖叫。可惜我不是维修工，我是天才。",
-        "CPU 占用率过高。你想把这里变成焚烧炉吗？",
-        "一切正常。太无聊了，我去测算模拟宇宙。",
-        "还没有崩溃吗？真是奇迹。",
-        "效率...勉强及格。但离我的标准还差得远。",
-        "数据采集完毕。你的电脑就像你一样——勉强能用。",
-    ]
-
-    @staticmethod
-    def generate_roast(stats: SystemStats) -> str:
-        return random.choice(HertaAgent.ROASTS)
+# --- 硬件监控 ---
+# 回放模式: 以轨迹构建的对象树代替真实硬件 (不需要 Pythonnet / DLL)
+computer = open_replay(REPLAY_FILE, REPLAY_SPEED) if REPLAY_FILE else None
+# lazy: DLL 加载与 Computer.Open() 推迟到采样线程的首次采样, 不阻塞导入与监听
+monitor = HardwareMonitor(computer, tree_period=TREE_PERIOD, timings=timings, lazy=True)
+# 帧时间: 独立线程跟踪日志, 每次采样把当前窗口的统计合并进 SystemStats
+frames = FrametimeTail(FRAMETIME_LOG) if FRAMETIME_LOG else None
+
+def open_hardware():
+    """采样线程内首次采样前调用; 失败时退出进程 (与此前导入时打开硬件的行为一致)"""
+    try:
+        monitor.open()
+    except SystemExit:
+        startup.fail("硬件初始化失败")
+        logging.shutdown()
+        os._exit(1)
+    startup.mark("hardware_opened")
+
+def sample():
+    if not monitor.opened:
+        open_hardware()
+    stats, readings = monitor.sample()
+    if frames:
+        stats = stats.model_copy(update=frames.stats())
+    return stats, readings
+
+# 采样线程独占 monitor (及其 Computer 对象), HTTP 处理函数只读快照
+sampler = Sampler(timings.timed("sample")(sample) if timings else sample, period=SAMPLE_PERIOD)
+sampler.add_listener(startup.first_data)
+# 按需采样: 消费者决定更新哪些硬件类别及采样周期
+demand = DemandTracker(monitor, sampler, SAMPLE_PERIOD, HEARTBEAT) if ON_DEMAND else None
+# 推送流: 每个快照扇出一次给所有 SSE / WebSocket 订阅者
+hub = StreamHub()
+sampler.add_listener(hub.publish)
+# 历史记录: 采样线程只入队, 写线程批量落盘
+history = HistoryStore(HISTORY_DB) if HISTORY_DB else None
+if history:
+    sampler.add_listener(history.offer)
+    if demand:
+        # 无人查看时随心跳周期落盘 (原始层变稀疏, 汇总层不受影响)
+        demand.hold("history", fields=METRICS, period=history.raw_interval, background=True)
+# 滚动窗口: 合并字段 + 逐设备读数 (多 GPU / 多风扇不合并) 写入环形缓冲区
+rolling = RollingStats(ROLLING_MINUTES, SAMPLE_PERIOD) if ROLLING_MINUTES > 0 else None
+if rolling:
+    def record_rolling(snap: Snapshot):
+        rolling.offer(snap, monitor.device_readings())
+
+    sampler.add_listener(timings.timed("rolling offer")(record_rolling) if timings else record_rolling)
+# 轨迹录制: 每个新的完整传感器树读数追加一行
+recorder = TraceRecorder(RECORD_FILE) if RECORD_FILE else None
+if recorder:
+    sampler.add_listener(recorder.offer)
+    if demand:
+        demand.hold("recorder", tree=True, period=TREE_PERIOD)
+# 共享内存快照: 每个快照写入一次; 读者写回心跳, 视为 /stats 类消费者
+shm = None
+if SHM_NAME:
+    try:
+        shm = SnapshotPublisher(SHM_NAME, METRICS)
+    except (OSError, ValueError) as e:
+        logger.warning(f"共享内存快照不可用: {e}")
+if shm:
+    def publish_shm(snap: Snapshot):
+        shm.offer(snap)
+        if demand and shm.reader_active():
+            demand.touch("shm reader", fields=shm.fields)
+
+    sampler.add_listener(publish_shm)
+# 告警规则引擎: 每个快照增量求值一次, 同时决定黑塔语录
+alerts = AlertEngine(load_rules(RULES_FILE))
+sampler.add_listener(alerts.evaluate)
+if demand and alerts.rules:
+    # 无人查看时按心跳周期求值 (持续时间条件按快照时间戳计算, 不受周期影响)
+    demand.hold("alerts", fields=alerts.fields, period=ALERT_PERIOD, background=True)
+# 游戏会话: 流式统计, 不保存样本
+sessions = SessionDetector(SESSION_ENTER, SESSION_EXIT, SESSION_ENTER_AFTER, SESSION_EXIT_AFTER,
+                           SESSIONS_FILE or None) if SESSIONS else None
+if sessions:
+    def track_sessions(snap: Snapshot):
+        sessions.offer(snap)
+        # 进入阈值待确认或会话进行中才需要全部指标 (1 Hz); 停止续期后按 TTL 过期
+        if demand and sessions.engaged:
+            demand.touch("sessions", fields=METRICS, period=1.0)
+
+    sampler.add_listener(track_sessions)
+    if demand:
+        # 平时只以心跳周期读取 GPU 负载, 不妨碍按需采样降为空闲心跳
+        demand.hold("sessions idle", fields=["gpu_usage"], period=demand.heartbeat)
+# GPU 降频检测: 每个快照对每块 GPU 增量求值一次 (读数未经多 GPU 合并)
+throttle = ThrottleDetector() if THROTTLE else None
+if throttle:
+    def detect_throttle(snap: Snapshot):
+        throttle.offer(snap, monitor.device_readings())
+        # GPU 有负载或事件进行中才需要 1 Hz 的 频率 / 温度 / 功耗; 停止续期后按 TTL 过期
+        if demand and throttle.engaged:
+            demand.touch("throttle", fields=THROTTLE_FIELDS, period=THROTTLE_PERIOD)
+
+    sampler.add_listener(timings.timed("throttle detect")(detect_throttle) if timings else detect_throttle)
+    if demand:
+        demand.hold("throttle idle", fields=["gpu_usage"], period=demand.heartbeat)
+# 风扇控制: 独立固定周期线程, 只读取最新快照, 写入 ISensor.Control
+fans = None
+if FAN_CONTROL:
+    fan_loops, fan_options = load_fan_config(FAN_CONFIG)
+    fans = FanController(fan_loops, sampler.latest, monitor.index, **fan_options)
+    if demand:
+        demand.hold("fancontrol", fields=fans.fields, period=fans.period)
+# Prometheus 导出: 从快照渲染, 抓取不会触发硬件更新
+exporter = MetricsExporter()
+# 传感器查询: 按编目版本缓存内存索引
+sensor_query = SensorQuery()
 
 # --- API ---
-@app.get("/stats", response_model=SystemStats)
-async def get_stats():
-    return monitor.get_status()
+@app.get("/health")
+async def get_health():
+    """存活检查: 进程与事件循环正常即返回 (不要求硬件已打开)"""
+    return {"status": "alive", "ready": startup.ready}
+
+@app.get("/ready")
+async def get_ready():
+    """就绪检查: 硬件已打开且已有首个快照; 之前返回 503 (含已完成的启动阶段)"""
+    if not startup.ready:
+        raise HTTPException(status_code=503, detail=startup.status())
+    return startup.status()
+
+def touch_stats():
+    """记录 /stats 类请求的需求 (按 TTL 过期)"""
+    if demand:
+        demand.touch("http stats")
+
+def touch_tree():
+    """记录完整传感器树的需求 (/metrics, /sensors)"""
+    if demand:
+        demand.touch("http sensors", tree=True, period=TREE_PERIOD, ttl=TREE_TTL)
+
+def latest_snapshot() -> Snapshot:
+    """读取最新快照 (O(1), 不触碰硬件)"""
+    snap = sampler.latest()
+    if snap is None:
+        raise HTTPException(status_code=503, detail="采样尚未就绪")
+    return snap
+
+def build_stats(snap: Snapshot) -> StatsResponse:
+    return StatsResponse(
+        **snap.stats.model_dump(),
+        sample_seq=snap.seq,
+        sampled_at=round(snap.timestamp, 3)
+    )
+
+def build_roast(snap: Snapshot) -> RoastResponse:
+    return RoastResponse(
+        message=alerts.roast(),
+        sample_seq=snap.seq,
+        sample_age=round(snap.age, 3)
+    )
+
+def encode(model: BaseModel) -> Response:
+    """直接序列化已校验的响应模型 (跳过 FastAPI 的二次校验)"""
+    return Response(model.model_dump_json(), media_type="application/json")
+
+if timings:
+    build_stats = timings.timed("build StatsResponse")(build_stats)
+    build_roast = timings.timed("build RoastResponse")(build_roast)
+    encode = timings.timed("serialize")(encode)
+
+# /stats 预编码: 每个快照在采样线程内构建并编码一次, 请求只返回缓存的字节
+stats_cache = SnapshotEncoder(build_stats)
+sampler.add_listener(timings.timed("encode snapshot")(stats_cache.offer) if timings else stats_cache.offer)
+
+@app.get("/stats", response_model=StatsResponse)
+async def get_stats(request: Request):
+    """
+    最新快照 (预编码字节)。ETag 随采样序号变化, If-None-Match 命中返回 304;
+    Accept: application/msgpack 返回 msgpack, Accept-Encoding: gzip 返回 gzip 压缩的 JSON。
+    正文的 sampled_at 为采集时刻, 当前年龄见 X-Sample-Age。
+    """
+    touch_stats()
+    encoded = stats_cache.latest()
+    if encoded is None:
+        raise HTTPException(status_code=503, detail="采样尚未就绪")
+    headers = request.headers
+    body, media_type, content_encoding, etag = encoded.variants[
+        select_variant(headers.get("accept"), headers.get("accept-encoding"))]
+    response_headers = {"ETag": etag, "Vary": VARY, "Cache-Control": "no-cache",
+                        "X-Sample-Age": f"{encoded.age:.3f}"}
+    if etag_matches(headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    if content_encoding:
+        response_headers["Content-Encoding"] = content_encoding
+    return Response(body, media_type=media_type, headers=response_headers)
 
 @app.get("/roast", response_model=RoastResponse)
 async def get_roast():
-    stats = monitor.get_status()
-    return RoastResponse(message=HertaAgent.generate_roast(stats))
+    touch_stats()
+    return encode(build_roast(latest_snapshot()))
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 文本格式: 完整传感器树 (每个传感器一个带标签的 gauge)"""
+    touch_tree()
+    snap = latest_snapshot()
+    return Response(exporter.render(snap), media_type=METRICS_CONTENT_TYPE)
+
+def latest_readings():
+    touch_tree()
+    snap = latest_snapshot()
+    if snap.sensors is None:
+        raise HTTPException(status_code=503, detail="传感器树尚未就绪")
+    return snap, snap.sensors
+
+@app.get("/sensors", response_model=SensorsResponse)
+async def get_sensors(
+    hardware: Optional[str] = Query(None, description="硬件类型或类别, 如 Gpu / GpuNvidia / motherboard, 支持通配符"),
+    type: Optional[str] = Query(None, description="传感器类型, 如 Temperature / Fan, 支持通配符"),
+    name: Optional[str] = Query(None, description="传感器名称, 如 Hot*, 支持通配符")
+):
+    """按硬件 / 传感器类型 / 名称过滤的完整传感器树 (最近一次读数)"""
+    snap, readings = latest_readings()
+    ids = sensor_query.index_for(readings).query(hardware, type, name)
+    return SensorsResponse(timestamp=readings.timestamp, sample_seq=snap.seq,
+                           sensors=sensor_query.values(readings, ids))
+
+@app.get("/sensors/{identifier:path}", response_model=SensorValue)
+async def get_sensor(identifier: str):
+    """按 identifier 查询单个传感器, 如 /sensors/gpu-nvidia/0/temperature/0"""
+    snap, readings = latest_readings()
+    i = sensor_query.index_for(readings).by_identifier.get("/" + identifier.lstrip("/"))
+    if i is None:
+        raise HTTPException(status_code=404, detail=f"传感器不存在: {identifier}")
+    return sensor_query.values(readings, [i])[0]
+
+@app.get("/alerts", response_model=AlertsResponse)
+async def get_alerts():
+    """活动告警 (按严重程度排序) 与最近的告警事件 (新的在前)"""
+    return AlertsResponse(active=alerts.active(), recent=alerts.recent())
+
+@app.get("/throttle", response_model=ThrottleResponse)
+async def get_throttle():
+    """每块 GPU 的降频状态、进行中的降频事件与最近的事件 (新的在前)"""
+    if not throttle:
+        raise HTTPException(status_code=404, detail="降频检测未启用 (HERTA_THROTTLE=0)")
+    return throttle.status()
+
+@app.get("/sessions", response_model=List[SessionSummary])
+async def get_sessions():
+    """游戏会话列表 (新的在前, 含进行中的会话)"""
+    if not sessions:
+        raise HTTPException(status_code=404, detail="游戏会话识别未启用 (HERTA_SESSIONS=0)")
+    return sessions.sessions()
+
+@app.get("/sessions/{session_id}/report", response_model=SessionReport)
+async def get_session_report(session_id: int):
+    """会话战报: 各指标 min/max/mean/p50/p95/p99, 高温时长, GPU 能耗"""
+    if not sessions:
+        raise HTTPException(status_code=404, detail="游戏会话识别未启用 (HERTA_SESSIONS=0)")
+    report = sessions.report(session_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"会话不存在: {session_id}")
+    return report
+
+# --- 推送流 ---
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """解析字段子集 (逗号分隔), 未指定时返回 None (全部字段)"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in SystemStats.model_fields]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    return names
+
+def subscribe(sub: Subscriber):
+    """订阅推送流, 并登记为常驻消费者 (周期不快于 max_rate)"""
+    if demand:
+        demand.hold(f"stream {id(sub)}", fields=sub.fields, period=max(SAMPLE_PERIOD, sub.min_interval))
+    hub.subscribe(sub, sampler.latest())
+
+def unsubscribe(sub: Subscriber):
+    hub.unsubscribe(sub)
+    if demand:
+        demand.release(f"stream {id(sub)}")
+
+@app.get("/stats/stream")
+async def stream_stats_sse(
+    fields: Optional[str] = Query(None, description="字段子集, 逗号分隔"),
+    max_rate: Optional[float] = Query(None, gt=0, description="最大推送频率 (Hz)")
+):
+    """SSE 推送: 首帧完整, 之后只推送变化字段"""
+    try:
+        sub = Subscriber(parse_fields(fields), max_rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        subscribe(sub)
+        try:
+            while True:
+                yield sse_event(await sub.next_frame())
+        finally:
+            unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/stats/stream")
+async def stream_stats_ws(websocket: WebSocket, fields: Optional[str] = None, max_rate: Optional[float] = None):
+    """WebSocket 推送: 帧格式与 SSE 相同"""
+    try:
+        sub = Subscriber(parse_fields(fields), max_rate if max_rate and max_rate > 0 else None)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    subscribe(sub)
+    try:
+        while True:
+            frame = await sub.next_frame()
+            if frame is not None:
+                await websocket.send_text(encode_frame(frame))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        unsubscribe(sub)
+
+@app.get("/stats/rolling", response_model=RollingResponse)
+async def get_rolling(window: str = Query("60s", description="窗口长度, 如 60s / 5m / 1h")):
+    """最近一段时间的 min / max / mean / p95 / std: 合并后的字段, 以及每个设备 (每块 GPU、每个风扇) 的传感器"""
+    if not rolling:
+        raise HTTPException(status_code=404, detail="滚动窗口统计未启用 (HERTA_ROLLING_MINUTES=0)")
+    try:
+        seconds = parse_window(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 0 < seconds <= rolling.max_window:
+        raise HTTPException(status_code=400, detail=f"窗口须在 0 ~ {rolling.max_window:.0f}s 之间")
+    return Response(json.dumps(rolling.query(seconds), ensure_ascii=False), media_type="application/json")
+
+@app.get("/history")
+def get_history(
+    metrics: str = Query("cpu,gpu_usage,ram", description="指标, 逗号分隔"),
+    start: Optional[float] = Query(None, alias="from", description="起始时间 (unix 秒), 默认为 1 小时前"),
+    end: Optional[float] = Query(None, alias="to", description="结束时间 (unix 秒), 默认为现在"),
+    max_points: int = Query(300, ge=3, le=5000, description="每个指标最多返回的点数"),
+    agg: str = Query("avg", description="汇总层级使用的聚合: avg / min / max")
+):
+    """历史范围查询: 自动选择汇总层级 + LTTB 降采样, 列式返回"""
+    if not history:
+        raise HTTPException(status_code=404, detail="历史记录未启用")
+    names = [m.strip() for m in metrics.split(",") if m.strip()]
+    unknown = [m for m in names if m not in METRICS]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"未知指标: {', '.join(unknown)} (可选: {', '.join(METRICS)})")
+    if agg not in AGGREGATES:
+        raise HTTPException(status_code=400, detail=f"agg 可选: {', '.join(AGGREGATES)}")
+
+    if end is None:
+        end = time.time()
+    if start is None:
+        start = end - 3600
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from 必须早于 to")
+    return history.query(names, start, end, max_points, agg)
+
+@app.get("/history/status")
+async def get_history_status():
+    """历史写线程状态 (已写入 / 丢弃 / 数据库大小)"""
+    if not history:
+        raise HTTPException(status_code=404, detail="历史记录未启用")
+    return history.status()
+
+# --- 内置仪表盘 ---
+_dashboard_html: Optional[bytes] = None
+
+@app.get("/dashboard", response_class=HTMLResponse)
+async def get_dashboard():
+    """内置仪表盘 (无需 Streamlit): 首次请求时读取并缓存静态页面"""
+    global _dashboard_html
+    if _dashboard_html is None:
+        _dashboard_html = DASHBOARD_FILE.read_bytes()
+    return HTMLResponse(_dashboard_html)
+
+@app.get("/debug/timings")
+async def get_timings(reset: bool = Query(False, description="读取后清空直方图")):
+    """热路径耗时直方图 (p50 / p95 / p99): 每个硬件的 Update(), 传感器读取, 响应构建 / 序列化, HTTP 请求"""
+    if not timings:
+        raise HTTPException(status_code=404, detail="耗时统计未启用 (HERTA_TIMINGS=0)")
+    report = timings.report()
+    if reset:
+        timings.reset()
+    return report
+
+@app.get("/debug/frametimes")
+async def get_frametimes():
+    """帧时间采集状态: 当前跟踪的文件、帧时间列、累计帧数"""
+    if not frames:
+        raise HTTPException(status_code=404, detail="帧时间采集未启用 (HERTA_FRAMETIME_LOG)")
+    return frames.status()
+
+@app.get("/fans", response_model=FanControlStatus)
+async def get_fans():
+    """风扇控制状态: 各回路温度 / 目标 / 指令占空比, 截止时刻错过次数, 反应延迟"""
+    if not fans:
+        raise HTTPException(status_code=404, detail="风扇控制未启用 (HERTA_FAN_CONTROL=1)")
+    return encode(fans.status())
+
+@app.get("/debug/demand")
+async def get_demand():
+    """按需采样状态: 当前消费者、采样周期、需要更新的硬件类别"""
+    if not demand:
+        raise HTTPException(status_code=404, detail="按需采样未启用 (HERTA_ON_DEMAND=0)")
+    return demand.status()
+
+@app.get("/debug/scheduler")
+async def get_scheduler():
+    """各硬件类别的更新周期、最近更新时刻与耗时"""
+    return monitor.scheduler.status()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
@@ -0,0 +1,116 @@
+"""
+黑塔之眼 - Prometheus / OpenMetrics 导出
+==========================================
+- 导出完整传感器树: 每个传感器一个带标签的 gauge
+  (hardware_type / hardware / sensor_type / sensor / identifier)
+- 标签前缀只在传感器编目变化时生成一次
+- 文本只在有新读数时重新渲染, 其余抓取直接返回缓存, 从不触发硬件更新
+"""
+
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from backend.hardware import SensorInfo, SensorReadings
+from backend.sampler import Snapshot
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# SensorType -> (指标名, 说明)
+METRIC_NAMES: Dict[str, Tuple[str, str]] = {
+    "Temperature": ("herta_temperature_celsius", "Temperature sensors (°C)"),
+    "Load": ("herta_load_percent", "Load sensors (%)"),
+    "Clock": ("herta_clock_megahertz", "Clock sensors (MHz)"),
+    "Power": ("herta_power_watts", "Power sensors (W)"),
+    "Voltage": ("herta_voltage_volts", "Voltage sensors (V)"),
+    "Current": ("herta_current_amperes", "Current sensors (A)"),
+    "Fan": ("herta_fan_rpm", "Fan speed sensors (RPM)"),
+    "Control": ("herta_control_percent", "Fan / pump control duty (%)"),
+    "Level": ("herta_level_percent", "Level sensors (%)"),
+    "Data": ("herta_data_gigabytes", "Data sensors (GB)"),
+    "SmallData": ("herta_smalldata_megabytes", "Small data sensors (MB)"),
+    "Throughput": ("herta_throughput_bytes_per_second", "Throughput sensors (B/s)"),
+    "Frequency": ("herta_frequency_hertz", "Frequency sensors (Hz)"),
+    "Flow": ("herta_flow_liters_per_hour", "Flow sensors (L/h)"),
+    "Energy": ("herta_energy_milliwatt_hours", "Energy sensors (mWh)"),
+    "Noise": ("herta_noise_dba", "Noise sensors (dBA)"),
+    "Humidity": ("herta_humidity_percent", "Humidity sensors (%)"),
+    "Factor": ("herta_factor", "Factor sensors"),
+    "TimeSpan": ("herta_timespan_seconds", "Time span sensors (s)"),
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _metric_name(sensor_type: str) -> Tuple[str, str]:
+    return METRIC_NAMES.get(sensor_type, (f"herta_sensor_{sensor_type.lower()}", f"{sensor_type} sensors"))
+
+
+class _Layout:
+    """某一编目版本的渲染布局: 按指标分组的 (下标, 行前缀)"""
+
+    def __init__(self, catalog: Tuple[SensorInfo, ...]):
+        groups: Dict[str, List[Tuple[int, str]]] = {}
+        self.headers: Dict[str, str] = {}
+        for i, info in enumerate(catalog):
+            name, help_text = _metric_name(info.sensor_type)
+            if name not in self.headers:
+                self.headers[name] = f"# HELP {name} {help_text}\n# TYPE {name} gauge\n"
+            labels = (
+                f'hardware_type="{_escape(info.hardware_type)}",hardware="{_escape(info.hardware)}",'
+                f'sensor_type="{_escape(info.sensor_type)}",sensor="{_escape(info.sensor)}",'
+                f'identifier="{_escape(info.identifier)}"'
+            )
+            groups.setdefault(name, []).append((i, f"{name}{{{labels}}} "))
+        self.groups = groups
+
+
+class MetricsExporter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._layout: Optional[_Layout] = None
+        self._layout_version: Optional[int] = None
+        self._rendered_for: Optional[SensorReadings] = None
+        self._body = ""
+        self.renders = 0
+
+    def _render_sensors(self, readings: SensorReadings) -> str:
+        if self._layout is None or self._layout_version != readings.version:
+            self._layout = _Layout(readings.catalog)
+            self._layout_version = readings.version
+
+        values = readings.values.tolist()
+        parts = []
+        for name, rows in self._layout.groups.items():
+            parts.append(self._layout.headers[name])
+            # repr: 最短的可精确还原表示 (:g 只有 6 位有效数字, 吞吐 / 累计写入量会被截断)
+            parts.extend(f"{prefix}{values[i]!r}\n" for i, prefix in rows if not math.isnan(values[i]))
+        parts.append(
+            "# HELP herta_sensor_readings_timestamp_seconds Unix time of the sensor tree reading\n"
+            "# TYPE herta_sensor_readings_timestamp_seconds gauge\n"
+            f"herta_sensor_readings_timestamp_seconds {readings.timestamp:.3f}\n"
+        )
+        return "".join(parts)
+
+    def render(self, snap: Snapshot) -> str:
+        """返回 /metrics 文本; 传感器部分仅在读数变化时重新渲染"""
+        readings = snap.sensors
+        if readings is not None and readings is not self._rendered_for:
+            with self._lock:
+                if readings is not self._rendered_for:
+                    self._body = self._render_sensors(readings)
+                    self._rendered_for = readings
+                    self.renders += 1
+
+        # 样本元数据很小, 每次抓取时拼接 (样本年龄随时间变化)
+        return self._body + (
+            "# HELP herta_samples_total Samples taken since backend start\n"
+            "# TYPE herta_samples_total counter\n"
+            f"herta_samples_total {snap.seq}\n"
+            "# HELP herta_sample_age_seconds Age of the latest sample\n"
+            "# TYPE herta_sample_age_seconds gauge\n"
+            f"herta_sample_age_seconds {time.monotonic() - snap.monotonic:.3f}\n"
+        )
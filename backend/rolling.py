@@ -0,0 +1,293 @@
+"""
+黑塔之眼 - 按设备的滚动窗口统计
+==========================================
+- SystemStats 把多块 GPU / 多个风扇合并为一个值 (max), 且只有瞬时值; 单次尖峰或一块空闲的 GPU 会掩盖真实情况
+- 这里为每个映射到 SystemStats 字段的传感器 (每块 GPU、每个风扇分开) 以及合并后的字段各保留最近 N 分钟的样本
+  (不含完整传感器树中未映射的传感器)
+- NumPy 环形缓冲区, 按样本存储 (每个样本一行连续内存, 写入与等间隔抽样都是整行拷贝);
+  每个样本写入两次 (i 与 i + capacity), 任意窗口都是一个连续切片
+- 每写满 BLOCK 个样本预聚合一块 min / max / sum / sum²: 查询只需合并窗口内的完整块与首尾不足一块的样本,
+  min / max / mean / std (精确值) 的开销与窗口长度基本无关
+- 缺失值 (NaN) 不参与统计: 块内只累计有效样本 (fmin / fmax, 有效样本数)
+- p95 (最近秩) 在窗口样本超过 P95_SAMPLES 时按等间隔抽样估计 (精确 p95 的 partition 是最大的一项开销)
+- 采样线程写入; 查询只在锁内拷贝所需的块与样本, 统计在锁外计算, 不阻塞采样线程;
+  同一窗口在下一个样本到达前的重复查询直接返回上次的结果
+"""
+
+import math
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from backend.hardware import SensorReadings
+from backend.history import METRICS
+from backend.sampler import Snapshot
+
+STATS = ("min", "max", "mean", "p95", "std")
+PERCENTILE = 0.95
+P95_SAMPLES = 300       # p95 最多使用的样本数 (等间隔抽样, 4 Hz 下 75 秒以内的窗口为精确值)
+BLOCK = 40              # 预聚合块的样本数 (4 Hz 下 10 秒)
+NDIGITS = 2
+
+_WINDOW = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_window(text: str) -> float:
+    """'60s' / '5m' / '1h' / '90' (秒) -> 秒数"""
+    match = _WINDOW.match(text)
+    if not match:
+        raise ValueError(f"无法解析窗口: {text!r} (示例: 60s, 5m, 1h)")
+    return float(match.group(1)) * _UNITS[match.group(2) or "s"]
+
+
+# --- 环形缓冲区 ---
+class WindowExtract(NamedTuple):
+    """锁内从 WindowBuffer 拷贝出的一个窗口 (统计量在锁外由 extract_stats 计算)"""
+    times: np.ndarray           # 窗口内样本时刻 (n)
+    blocks: np.ndarray          # 窗口内完整块的 [min, max, sum, sum², 有效样本数] (k, 5, columns)
+    edges: np.ndarray           # 首尾不足一块的样本 (m, columns)
+    sample: np.ndarray          # p95 抽样 (columns, <= P95_SAMPLES)
+
+
+class WindowBuffer:
+    """固定容量的时间序列: times[capacity], values[capacity, columns] (缺失为 NaN), 附带按块的预聚合"""
+
+    def __init__(self, columns: int, capacity: int, block: int = BLOCK):
+        self.block = block
+        self.blocks = max(math.ceil(capacity / block), 1)
+        self.capacity = self.blocks * block     # 向上取整为整块
+        # 双倍长度: 第 i 个样本同时写在 i 与 i + capacity, 最近 size 个样本恒为连续切片 (块同理)
+        self._times = np.full(2 * self.capacity, -np.inf)
+        self._values = np.full((2 * self.capacity, columns), np.nan)
+        # 每块一行 [min, max, sum, sum², 有效样本数], 缺失值不参与
+        self._blocks = np.zeros((2 * self.blocks, 5, columns))
+        self.count = 0          # 累计样本数
+        self.size = 0
+
+    def append(self, t: float, row: np.ndarray):
+        i = self.count % self.capacity
+        j = i + self.capacity
+        self._times[i] = self._times[j] = t
+        self._values[i] = self._values[j] = row
+        self.count += 1
+        self.size = min(self.size + 1, self.capacity)
+        if self.count % self.block == 0:
+            self._close_block(j + 1)
+
+    def _close_block(self, end: int):
+        """块写满时一次性聚合 (每 BLOCK 个样本一次); 未满的块在查询时按原始样本计算"""
+        rows = self._values[end - self.block:end]
+        valid = rows == rows
+        clean = np.where(valid, rows, 0.0)
+        b = (self.count // self.block - 1) % self.blocks
+        agg = self._blocks[b]
+        agg[0] = np.fmin.reduce(rows, axis=0)
+        agg[1] = np.fmax.reduce(rows, axis=0)
+        agg[2] = clean.sum(axis=0)
+        agg[3] = np.einsum("ij,ij->j", clean, clean)
+        agg[4] = valid.sum(axis=0)
+        self._blocks[b + self.blocks] = agg
+
+    def _span(self, since: float) -> Tuple[int, int]:
+        """时刻 >= since 的样本在双倍缓冲区中的 [start, end)"""
+        end = self.count % self.capacity + self.capacity
+        start = end - self.size
+        return start + int(np.searchsorted(self._times[start:end], since)), end
+
+    def window(self, since: float) -> Tuple[np.ndarray, np.ndarray]:
+        """时刻 >= since 的样本 (视图, 按时间升序): (times[n], values[columns, n])"""
+        start, end = self._span(since)
+        return self._times[start:end], self._values[start:end].T
+
+    def extract(self, since: float) -> WindowExtract:
+        """拷贝时刻 >= since 的窗口所需的数据 (调用方持有写入锁; 开销与窗口长度基本无关)"""
+        start, end = self._span(since)
+        n = end - start
+        first = self.count - n                  # 窗口首个样本的累计序号
+        full_from = -(-first // self.block)     # 窗口内完整块的块号 [full_from, full_to)
+        full_to = self.count // self.block
+        if full_from < full_to:
+            # 块号 q 在双倍块数组中的位置: q - full_to + full_to % blocks + blocks
+            b_end = full_to % self.blocks + self.blocks
+            b_start = b_end - (full_to - full_from)
+            blocks = self._blocks[b_start:b_end].copy()
+            head = start + full_from * self.block - first
+            tail = end - (self.count - full_to * self.block)
+            edges = np.concatenate((self._values[start:head], self._values[tail:end]))
+        else:
+            blocks = self._blocks[:0].copy()
+            edges = self._values[start:end].copy()
+        step = max(-(-n // P95_SAMPLES), 1)
+        return WindowExtract(times=self._times[start:end].copy(), blocks=blocks, edges=edges,
+                             sample=np.ascontiguousarray(self._values[start:end:step].T))
+
+
+def _p95(sample: np.ndarray) -> np.ndarray:
+    """按行的最近秩 p95 (columns, n); 缺失值不参与, 全部缺失为 NaN"""
+    columns, n = sample.shape
+    result = np.full(columns, np.nan)
+    if n == 0:
+        return result
+    nan = np.isnan(sample)
+    counts = n - nan.sum(axis=1)
+    if counts.min() == n:
+        k = max(math.ceil(PERCENTILE * n) - 1, 0)
+        return np.partition(sample, k, axis=1)[:, k]
+    sample = np.where(nan, np.inf, sample)          # 缺失值排在最后
+    # 按有效样本数分组, 每组一次 partition (通常只有 全部有效 / 全部缺失 两组)
+    for c in np.unique(counts):
+        if c == 0:
+            continue
+        k = max(math.ceil(PERCENTILE * c) - 1, 0)
+        rows = counts == c
+        result[rows] = np.partition(sample if rows.all() else sample[rows], k, axis=1)[:, k]
+    return result
+
+
+def extract_stats(w: WindowExtract) -> Dict[str, np.ndarray]:
+    """
+    按行 (传感器) 计算统计量, 全部为长度 columns 的数组 (缺失值不参与, 无有效样本的行为 NaN)。
+    min / max / mean / std 由窗口内的完整块与首尾样本合并得到 (精确值), p95 由抽样计算。
+    """
+    edges, blocks = w.edges, w.blocks
+    valid = edges == edges
+    clean = np.where(valid, edges, 0.0)
+    totals = blocks[:, 2:].sum(axis=0)     # 完整块的 sum / sum² / 有效样本数
+    count = totals[2] + valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (totals[0] + clean.sum(axis=0)) / count
+        # 方差 = E[x²] - E[x]²
+        square = (totals[1] + np.einsum("ij,ij->j", clean, clean)) / count
+    empty = count == 0
+    result = {
+        "min": np.fmin(np.fmin.reduce(blocks[:, 0], axis=0, initial=np.inf),
+                       np.fmin.reduce(edges, axis=0, initial=np.inf)),
+        "max": np.fmax(np.fmax.reduce(blocks[:, 1], axis=0, initial=-np.inf),
+                       np.fmax.reduce(edges, axis=0, initial=-np.inf)),
+        "mean": mean,
+        "p95": _p95(w.sample),
+        "std": np.sqrt(np.maximum(square - mean * mean, 0.0)),
+    }
+    for name in ("min", "max", "mean", "std"):
+        result[name][empty] = np.nan
+    return result
+
+
+# --- 数据模型 ---
+class WindowStats(BaseModel):
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+    p95: Optional[float]
+    std: Optional[float]
+
+
+class RollingSensor(BaseModel):
+    identifier: str
+    sensor: str
+    sensor_type: str
+    stats: WindowStats
+
+
+class RollingDevice(BaseModel):
+    device: str                 # identifier 前缀, 如 /gpu-nvidia/1 (同型号的多块 GPU 也能区分)
+    hardware: str
+    hardware_type: str
+    sensors: List[RollingSensor]
+
+
+class RollingResponse(BaseModel):
+    window: float               # 请求的窗口 (秒)
+    samples: int                # 窗口内的样本数
+    span: float                 # 窗口内首末样本的时间差 (秒)
+    aggregate: Dict[str, WindowStats]   # SystemStats 字段 (合并后的值)
+    devices: List[RollingDevice]
+
+
+def _device(identifier: str) -> str:
+    """/gpu-nvidia/1/temperature/0 -> /gpu-nvidia/1"""
+    return identifier.rsplit("/", 2)[0]
+
+
+def _rows(stats: Dict[str, np.ndarray]) -> List[dict]:
+    """统计量数组 -> 每行一个 WindowStats 形状的字典 (一次性取整与转换, NaN -> None)"""
+    columns = [np.round(stats[name], NDIGITS).tolist() for name in STATS]
+    return [{name: (v if v == v else None) for name, v in zip(STATS, row)} for row in zip(*columns)]
+
+
+class RollingStats:
+    """采样线程回调: 每个快照追加一行合并字段和一行逐设备读数"""
+
+    def __init__(self, minutes: float = 10.0, period: float = 0.25):
+        self.minutes = minutes
+        # 按最快采样周期分配容量, 采样变慢 (按需 / 心跳) 时覆盖的时间更长
+        self.capacity = max(int(math.ceil(minutes * 60 / period)), 1)
+        self.aggregate = WindowBuffer(len(METRICS), self.capacity)
+        self.devices: Optional[WindowBuffer] = None
+        self.catalog = ()
+        self._version: Optional[int] = None
+        self._seq = 0
+        self._cache: Tuple[Optional[tuple], Optional[dict]] = (None, None)
+        self._lock = threading.Lock()
+
+    @property
+    def max_window(self) -> float:
+        return self.minutes * 60
+
+    def offer(self, snap: Snapshot, devices: Optional[SensorReadings]):
+        stats = snap.stats
+        row = np.array([getattr(stats, f) for f in METRICS], dtype=np.float64)
+        with self._lock:
+            self._seq = snap.seq
+            self.aggregate.append(snap.monotonic, row)
+            if devices is None:
+                return
+            if devices.version != self._version:
+                # 传感器索引重建 (硬件增减): 逐设备缓冲区按新的编目重新开始
+                self.devices = WindowBuffer(len(devices.catalog), self.capacity)
+                self.catalog = devices.catalog
+                self._version = devices.version
+            self.devices.append(snap.monotonic, devices.values)
+
+    def compute(self, window: float) -> Tuple[np.ndarray, Dict[str, np.ndarray], tuple, Optional[Dict[str, np.ndarray]]]:
+        """窗口内的统计量 (数组形式): (样本时刻, 合并字段统计, 设备传感器编目, 逐设备统计)"""
+        since = time.monotonic() - window
+        with self._lock:
+            # 锁内只拷贝 (下一个样本会覆盖满窗口的最旧一列), 统计在锁外计算
+            aggregate = self.aggregate.extract(since)
+            devices = self.devices.extract(since) if self.devices else None
+            catalog = self.catalog
+        return (aggregate.times, extract_stats(aggregate), catalog,
+                None if devices is None else extract_stats(devices))
+
+    def query(self, window: float) -> dict:
+        """RollingResponse 形状的字典 (直接构建字典, 不逐个实例化响应模型)"""
+        cache_key = (window, self._seq)
+        cached_key, cached = self._cache
+        if cached_key == cache_key:
+            return cached
+        times, aggregate, catalog, device_stats = self.compute(window)
+        devices: Dict[str, dict] = {}
+        if device_stats is not None:
+            for info, stats in zip(catalog, _rows(device_stats)):
+                key = _device(info.identifier)
+                device = devices.get(key)
+                if device is None:
+                    device = devices[key] = {"device": key, "hardware": info.hardware,
+                                              "hardware_type": info.hardware_type, "sensors": []}
+                device["sensors"].append({"identifier": info.identifier, "sensor": info.sensor,
+                                          "sensor_type": info.sensor_type, "stats": stats})
+        result = {
+            "window": window,
+            "samples": len(times),
+            "span": round(float(times[-1] - times[0]), 3) if len(times) else 0.0,
+            "aggregate": dict(zip(METRICS, _rows(aggregate))),
+            "devices": list(devices.values()),
+        }
+        self._cache = (cache_key, result)
+        return result
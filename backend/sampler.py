@@ -0,0 +1,109 @@
+"""
+黑塔之眼 - 后台采样器
+==========================================
+- 单一采样线程独占硬件对象, 按固定周期采样
+- 每次采样发布一个不可变、带序号的快照 (Snapshot)
+- HTTP 处理函数只读取最新快照 (O(1)), 不再触碰硬件
+- 订阅者 (listener) 在采样线程内收到每个新快照, 须快速返回
+- 采样周期可在运行时调整 (按需采样), wake() 立即开始下一次采样
+"""
+
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger("HertaBackend")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """一次采样结果 (不可变)"""
+    seq: int            # 采样序号, 从 1 开始单调递增
+    timestamp: float    # 采样时刻 (time.time)
+    monotonic: float    # 采样时刻 (time.monotonic), 用于计算样本年龄
+    stats: Any          # SystemStats
+    sensors: Any = None # SensorReadings (完整传感器树)
+
+    @property
+    def age(self) -> float:
+        """样本年龄 (秒)"""
+        return time.monotonic() - self.monotonic
+
+
+class Sampler:
+    """
+    后台采样线程。
+    read 返回 (stats, sensors), 且只会在采样线程内被调用,
+    因此硬件对象 (Computer) 由该线程独占。
+    """
+
+    def __init__(self, read: Callable[[], Any], period: float = 1.0):
+        self._read = read
+        self.period = period
+        self._snapshot: Optional[Snapshot] = None
+        self._listeners: List[Callable[[Snapshot], None]] = []
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="HertaSampler", daemon=True)
+        self._thread.start()
+        logger.info(f"采样线程已启动 (周期 {self.period}s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_listener(self, listener: Callable[[Snapshot], None]):
+        """注册新快照回调 (在采样线程内调用)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Snapshot], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def wake(self):
+        """跳过当前等待, 立即采样 (例如从空闲心跳切换到高频采样时)"""
+        self._wake_event.set()
+
+    def latest(self) -> Optional[Snapshot]:
+        """最新快照 (尚未完成首次采样时为 None)"""
+        return self._snapshot
+
+    def _run(self):
+        seq = 0
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                stats, sensors = self._read()
+            except Exception as e:
+                logger.error(f"采样失败: {e}")
+            else:
+                seq += 1
+                # 引用赋值是原子的, 读者总能拿到完整的快照
+                snap = Snapshot(seq, time.time(), time.monotonic(), stats, sensors)
+                self._snapshot = snap
+                for listener in list(self._listeners):
+                    try:
+                        listener(snap)
+                    except Exception as e:
+                        logger.error(f"快照订阅者异常: {e}")
+
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # 采样耗时超过周期: 丢弃落后的节拍, 不做追赶
+                next_tick = time.monotonic()
+                delay = 0
+            if self._wake_event.wait(delay):
+                self._wake_event.clear()
+                next_tick = time.monotonic()
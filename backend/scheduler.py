@@ -0,0 +1,204 @@
+"""
+黑塔之眼 - 分类更新调度器
+==========================================
+- 按硬件类别 (cpu / gpu / memory / motherboard / controller) 设定各自的 Update() 周期
+- 快速类别在采样线程内按需更新 (inline)
+- 慢速类别 (SuperIO / EC 等) 由独立后台线程更新, 不会拖慢快速类别
+- 记录每个类别的最近更新时刻与更新耗时
+- 启用耗时统计时, 另外按单个硬件记录 Update() 耗时直方图
+- 按需调度 (set_demand): 只更新有消费者的类别, 周期取 max(类别周期, 需求周期)
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("HertaBackend")
+
+
+class Cadence(NamedTuple):
+    period: float       # 更新周期 (秒)
+    background: bool    # True: 独立线程更新, 不占用采样线程
+
+
+# HardwareType -> 类别
+HARDWARE_CLASS = {
+    "Cpu": "cpu",
+    "GpuNvidia": "gpu",
+    "GpuAmd": "gpu",
+    "GpuIntel": "gpu",
+    "Memory": "memory",
+    "Motherboard": "motherboard",
+    "SuperIO": "motherboard",
+    "EmbeddedController": "motherboard",
+    "Cooler": "controller",
+    "Psu": "controller",
+}
+
+DEFAULT_CADENCE: Dict[str, Cadence] = {
+    "cpu": Cadence(0.25, False),
+    "gpu": Cadence(0.25, False),
+    "memory": Cadence(1.0, False),
+    "motherboard": Cadence(5.0, True),
+    "controller": Cadence(5.0, True),
+}
+FALLBACK_CADENCE = Cadence(1.0, False)
+
+# 到期判定容差 (秒): 采样周期与更新周期相同时, 避免因抖动跳过一拍
+DUE_SLACK = 0.02
+
+
+def hardware_class(h_type: str) -> str:
+    return HARDWARE_CLASS.get(h_type, h_type.lower())
+
+
+class ClassState:
+    """单个硬件类别的调度状态"""
+
+    def __init__(self, name: str, cadence: Cadence):
+        self.name = name
+        self.cadence = cadence
+        self.hardware: List = []
+        # 启用耗时统计时: [(硬件, 直方图), ...], 与 hardware 一同整体替换
+        self.timed: Optional[List[Tuple]] = None
+        self.last_update: Optional[float] = None   # time.time()
+        self.last_cost: Optional[float] = None     # 秒
+        self.avg_cost: Optional[float] = None      # 指数滑动平均 (秒)
+        self.updates = 0
+        self.errors = 0
+        # 按需调度: 无消费者的类别不更新; period 为当前生效的周期
+        self.active = True
+        self.period = cadence.period
+        self._next_due = 0.0                        # time.monotonic()
+        self._wake = threading.Event()              # 后台类别: 需求变化时唤醒
+
+    def _update_one(self, hardware):
+        try:
+            hardware.Update()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"[{self.name}] Update() 失败: {e}")
+
+    def update(self):
+        t0 = time.perf_counter()
+        timed = self.timed
+        if timed is None:
+            for hardware in self.hardware:
+                self._update_one(hardware)
+        else:
+            for hardware, hist in timed:
+                t1 = time.perf_counter()
+                self._update_one(hardware)
+                hist.record(time.perf_counter() - t1)
+        cost = time.perf_counter() - t0
+
+        self.last_update = time.time()
+        self.last_cost = cost
+        self.avg_cost = cost if self.avg_cost is None else self.avg_cost * 0.9 + cost * 0.1
+        self.updates += 1
+        self._next_due = time.monotonic() + self.period
+
+    def set_demand(self, period: Optional[float]):
+        """period 为 None 表示无人需要该类别"""
+        if period is None:
+            self.active = False
+            return
+        period = max(self.cadence.period, period)
+        if not self.active or period < self.period:
+            # 新增需求或需求变快: 立即更新一次
+            self._next_due = 0.0
+        self.active = True
+        self.period = period
+        self._wake.set()
+
+    def to_dict(self) -> dict:
+        return {
+            "period": self.cadence.period,
+            "active": self.active,
+            "effective_period": self.period,
+            "background": self.cadence.background,
+            "hardware": len(self.hardware),
+            "last_update": self.last_update,
+            "last_cost_ms": None if self.last_cost is None else round(self.last_cost * 1000, 3),
+            "avg_cost_ms": None if self.avg_cost is None else round(self.avg_cost * 1000, 3),
+            "updates": self.updates,
+            "errors": self.errors,
+        }
+
+
+class UpdateScheduler:
+    def __init__(self, cadences: Dict[str, Cadence] = DEFAULT_CADENCE, timings=None):
+        self.cadences = dict(cadences)
+        self.timings = timings      # Optional[backend.timings.Timings]
+        self.classes: Dict[str, ClassState] = {}
+        # 按需调度: 类别 -> 需求周期; None 表示不做按需控制 (所有类别按 cadences 更新)
+        self.demand: Optional[Dict[str, float]] = None
+        self._workers: Dict[str, threading.Thread] = {}
+        self._stop_event = threading.Event()
+
+    def assign(self, handles):
+        """按类别重新分组硬件 (索引重建后调用)"""
+        groups: Dict[str, List] = {}
+        for handle in handles:
+            groups.setdefault(hardware_class(handle.h_type), []).append(handle)
+
+        for name, group in groups.items():
+            state = self.classes.get(name)
+            if state is None:
+                state = self.classes[name] = ClassState(name, self.cadences.get(name, FALLBACK_CADENCE))
+                if self.demand is not None:
+                    state.set_demand(self.demand.get(name))
+            # 列表整体替换, 后台线程读取时无需加锁
+            state.hardware = [handle.hardware for handle in group]
+            if self.timings is not None:
+                state.timed = [(handle.hardware, self.timings.histogram(f"update {name}/{handle.name}"))
+                               for handle in group]
+        for name, state in self.classes.items():
+            if name not in groups:
+                state.hardware = []
+                state.timed = None if self.timings is None else []
+
+        for name, state in self.classes.items():
+            if state.cadence.background and name not in self._workers:
+                self._start_worker(state)
+
+    def set_demand(self, demand: Optional[Dict[str, float]]):
+        """设置各类别的需求周期; 未列出的类别停止更新, None 恢复为全部按 cadences 更新"""
+        self.demand = demand
+        for name, state in self.classes.items():
+            state.set_demand(state.cadence.period if demand is None else demand.get(name))
+
+    def run_due(self):
+        """在采样线程内更新到期的 inline 类别"""
+        now = time.monotonic() + DUE_SLACK
+        for state in self.classes.values():
+            if state.active and not state.cadence.background and now >= state._next_due:
+                state.update()
+
+    def _start_worker(self, state: ClassState):
+        thread = threading.Thread(target=self._worker, args=(state,),
+                                  name=f"HertaUpdate-{state.name}", daemon=True)
+        self._workers[state.name] = thread
+        thread.start()
+        logger.info(f"后台更新线程已启动: {state.name} (周期 {state.cadence.period}s)")
+
+    def _worker(self, state: ClassState):
+        while not self._stop_event.is_set():
+            if state.active and time.monotonic() + DUE_SLACK >= state._next_due:
+                state.update()
+            # 无需求时一直等待, 直到 set_demand / stop 唤醒
+            timeout = max(0.0, state._next_due - time.monotonic()) if state.active else None
+            if state._wake.wait(timeout):
+                state._wake.clear()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        for state in self.classes.values():
+            state._wake.set()
+        for thread in self._workers.values():
+            thread.join(timeout)
+        self._workers.clear()
+
+    def status(self) -> Dict[str, dict]:
+        return {name: state.to_dict() for name, state in self.classes.items()}
@@ -0,0 +1,113 @@
+"""
+黑塔之眼 - 传感器查询
+==========================================
+- 基于传感器编目 (含 SubHardware) 建立内存索引:
+  硬件类型 / 硬件类别 (gpu, cpu...) / 传感器类型 / identifier
+- 索引只在编目版本变化时重建, 查询时不遍历 CLR 对象
+- 数值来自最近一次采样的完整传感器树读数
+"""
+
+import fnmatch
+import math
+from typing import Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+from backend.hardware import SensorInfo, SensorReadings
+from backend.scheduler import hardware_class
+
+
+# --- 数据模型 ---
+class SensorValue(BaseModel):
+    identifier: str
+    hardware_type: str
+    hardware: str
+    sensor_type: str
+    sensor: str
+    value: Optional[float]
+
+
+class SensorsResponse(BaseModel):
+    timestamp: float        # 传感器树读取时刻
+    sample_seq: int
+    sensors: List[SensorValue]
+
+
+def _has_glob(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
+
+
+class SensorQueryIndex:
+    """某一编目版本的查询索引"""
+
+    def __init__(self, catalog: List[SensorInfo]):
+        self.catalog = catalog
+        self.by_hardware: Dict[str, Set[int]] = {}     # 小写硬件类型 / 类别 -> 下标
+        self.by_type: Dict[str, Set[int]] = {}         # 小写传感器类型 -> 下标
+        self.by_identifier: Dict[str, int] = {}
+        self._names = [info.sensor.lower() for info in catalog]
+        # 名称通配符可从任一单词开头匹配 ("Hot*" 匹配 "GPU Hot Spot")
+        self._suffixes = [self._word_suffixes(n) for n in self._names]
+
+        for i, info in enumerate(catalog):
+            for key in {info.hardware_type.lower(), hardware_class(info.hardware_type)}:
+                self.by_hardware.setdefault(key, set()).add(i)
+            self.by_type.setdefault(info.sensor_type.lower(), set()).add(i)
+            self.by_identifier[info.identifier] = i
+
+    @staticmethod
+    def _word_suffixes(name: str) -> List[str]:
+        return [name] + [name[i + 1:] for i, c in enumerate(name) if c == " "]
+
+    @staticmethod
+    def _lookup(index: Dict[str, Set[int]], pattern: str) -> Set[int]:
+        pattern = pattern.lower()
+        if not _has_glob(pattern):
+            return index.get(pattern, set())
+        # 通配符只匹配键 (类型种类很少), 不扫描传感器
+        result: Set[int] = set()
+        for key, ids in index.items():
+            if fnmatch.fnmatchcase(key, pattern):
+                result |= ids
+        return result
+
+    def query(self, hardware: Optional[str] = None, sensor_type: Optional[str] = None,
+              name: Optional[str] = None) -> List[int]:
+        candidates: Optional[Set[int]] = None
+        if hardware:
+            candidates = self._lookup(self.by_hardware, hardware)
+        if sensor_type:
+            ids = self._lookup(self.by_type, sensor_type)
+            candidates = ids if candidates is None else candidates & ids
+
+        ordered = sorted(candidates) if candidates is not None else range(len(self.catalog))
+        if name:
+            pattern = name.lower()
+            if _has_glob(pattern):
+                ordered = [i for i in ordered
+                           if any(fnmatch.fnmatchcase(s, pattern) for s in self._suffixes[i])]
+            else:
+                ordered = [i for i in ordered if self._names[i] == pattern]
+        return list(ordered)
+
+
+class SensorQuery:
+    """按编目版本缓存查询索引"""
+
+    def __init__(self):
+        self._index: Optional[SensorQueryIndex] = None
+        self._version: Optional[int] = None
+
+    def index_for(self, readings: SensorReadings) -> SensorQueryIndex:
+        if self._index is None or self._version != readings.version:
+            self._index = SensorQueryIndex(list(readings.catalog))
+            self._version = readings.version
+        return self._index
+
+    def values(self, readings: SensorReadings, ids: List[int]) -> List[SensorValue]:
+        result = []
+        for i in ids:
+            info = readings.catalog[i]
+            value = float(readings.values[i])
+            result.append(SensorValue(**info._asdict(), value=None if math.isnan(value) else value))
+        return result
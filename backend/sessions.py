@@ -0,0 +1,329 @@
+"""
+黑塔之眼 - 游戏会话与战报
+==========================================
+- 由持续的 GPU 负载自动识别游戏会话: 进入 / 退出阈值 + 持续时间 (迟滞)
+- 会话期间对每个指标做流式统计, 内存占用恒定 (不保存样本):
+  min / max / mean, P² 估计的 p50 / p95 / p99, 高温时长, gpu_power 积分得到的能耗
+- 退出判定期间 (负载低于退出阈值, 最长 exit_after 秒) 的样本先暂存: 负载恢复则补计入会话,
+  确认结束则丢弃, 会话在负载下降时刻结束 (战报不含结束前一分钟的空闲数据)
+- 结束的会话追加写入 JSON Lines 文件 (可选), 重启后仍可查看; 损坏的行 (如写入中途崩溃) 跳过
+"""
+
+import os
+import threading
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from backend.history import METRICS
+from backend.sampler import Snapshot
+
+logger = logging.getLogger("HertaBackend")
+
+QUANTILES = (0.50, 0.95, 0.99)
+# 高温时长统计的阈值 (°C)
+THERMAL_THRESHOLDS: Dict[str, List[float]] = {
+    "gpu_temp": [80.0, 85.0],
+    "cpu_temp": [85.0, 90.0],
+}
+MAX_GAP = 5.0           # 相邻样本间隔超过该值 (秒) 时不积分能耗 / 时长, 视为数据缺失
+MAX_SESSIONS = 100      # 内存中保留的已结束会话数
+
+
+# --- 数据模型 ---
+class MetricReport(BaseModel):
+    samples: int
+    min: float
+    max: float
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+
+
+class SessionSummary(BaseModel):
+    id: int
+    state: str              # active / completed
+    start: float
+    end: float
+    duration: float         # 秒
+    samples: int
+    energy_wh: Optional[float]
+    gpu_usage_avg: Optional[float]
+    gpu_temp_max: Optional[float]
+
+
+class SessionReport(SessionSummary):
+    metrics: Dict[str, MetricReport]
+    time_above: Dict[str, float]    # 如 "gpu_temp>80": 秒
+
+
+# --- 流式分位数 (P² 算法, Jain & Chlamtac 1985) ---
+class P2Quantile:
+    """单个分位数的 P² 估计: 5 个标记点, O(1) 内存与更新"""
+
+    __slots__ = ("p", "q", "n", "np", "dn", "_init")
+
+    def __init__(self, p: float):
+        self.p = p
+        self.q: List[float] = []
+        self._init: List[float] = []
+
+    def add(self, x: float):
+        if len(self.q) < 5:
+            self._init.append(x)
+            if len(self._init) == 5:
+                p = self.p
+                self.q = sorted(self._init)
+                self.n = [0, 1, 2, 3, 4]
+                self.np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+                self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+            return
+
+        q, n = self.q, self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+
+        # 调整中间三个标记点的高度
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                # 抛物线插值, 越界时退化为线性插值
+                qp = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = qp
+                n[i] += s
+
+    def value(self) -> Optional[float]:
+        if len(self.q) == 5:
+            return self.q[2]
+        if not self._init:
+            return None
+        # 样本不足 5 个: 直接取最近秩
+        ordered = sorted(self._init)
+        return ordered[min(int(self.p * len(ordered)), len(ordered) - 1)]
+
+
+class MetricAccumulator:
+    __slots__ = ("count", "min", "max", "total", "quantiles")
+
+    def __init__(self):
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.total = 0.0
+        self.quantiles = [P2Quantile(p) for p in QUANTILES]
+
+    def add(self, x: float):
+        self.count += 1
+        self.total += x
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        for est in self.quantiles:
+            est.add(x)
+
+    def report(self) -> MetricReport:
+        p50, p95, p99 = (round(est.value(), 2) for est in self.quantiles)
+        return MetricReport(samples=self.count, min=self.min, max=self.max,
+                            mean=round(self.total / self.count, 2), p50=p50, p95=p95, p99=p99)
+
+
+class Session:
+    """单个会话的流式统计"""
+
+    def __init__(self, session_id: int, start: float):
+        self.id = session_id
+        self.start = start
+        self.end = start
+        self.samples = 0
+        self.energy_j = 0.0
+        self.metrics: Dict[str, MetricAccumulator] = {m: MetricAccumulator() for m in METRICS}
+        self.time_above: Dict[str, float] = {f"{field}>{t:g}": 0.0
+                                             for field, ts in THERMAL_THRESHOLDS.items() for t in ts}
+        self._last_ts: Optional[float] = None
+        self._last_power: Optional[float] = None
+
+    def add(self, snap: Snapshot):
+        stats = snap.stats
+        dt = None if self._last_ts is None else snap.timestamp - self._last_ts
+        if dt is not None and dt > MAX_GAP:
+            dt = None
+        self._last_ts = snap.timestamp
+        self.end = snap.timestamp
+        self.samples += 1
+
+        for name, acc in self.metrics.items():
+            value = getattr(stats, name)
+            if value is not None:
+                acc.add(value)
+
+        if dt is not None:
+            # 能耗: gpu_power 梯形积分
+            power = stats.gpu_power
+            if power is not None and self._last_power is not None:
+                self.energy_j += (power + self._last_power) / 2 * dt
+            for field, thresholds in THERMAL_THRESHOLDS.items():
+                value = getattr(stats, field)
+                if value is not None:
+                    for t in thresholds:
+                        if value > t:
+                            self.time_above[f"{field}>{t:g}"] += dt
+        self._last_power = stats.gpu_power
+
+    def _summary_fields(self, state: str) -> dict:
+        usage = self.metrics["gpu_usage"]
+        temp = self.metrics["gpu_temp"]
+        return dict(
+            id=self.id, state=state, start=self.start, end=self.end,
+            duration=round(self.end - self.start, 1), samples=self.samples,
+            energy_wh=round(self.energy_j / 3600, 2) if self.metrics["gpu_power"].count else None,
+            gpu_usage_avg=round(usage.total / usage.count, 1) if usage.count else None,
+            gpu_temp_max=temp.max if temp.count else None,
+        )
+
+    def report(self, state: str) -> SessionReport:
+        return SessionReport(
+            **self._summary_fields(state),
+            metrics={name: acc.report() for name, acc in self.metrics.items() if acc.count},
+            time_above={k: round(v, 1) for k, v in self.time_above.items()},
+        )
+
+
+class SessionDetector:
+    """
+    采样线程回调。
+    gpu_usage >= enter 持续 enter_after 秒则开始会话 (起点为负载开始时刻, 期间的样本计入);
+    gpu_usage < exit 持续 exit_after 秒则结束会话。
+    """
+
+    def __init__(self, enter: float = 60.0, exit: float = 30.0, enter_after: float = 30.0,
+                 exit_after: float = 60.0, path: Optional[str] = None):
+        self.enter = enter
+        self.exit = exit
+        self.enter_after = enter_after
+        self.exit_after = exit_after
+        self.path = path
+        self._lock = threading.Lock()
+        self._completed: deque = deque(maxlen=MAX_SESSIONS)    # SessionReport, 旧的在前
+        self._candidate: Optional[Session] = None               # 等待确认的会话
+        self._active: Optional[Session] = None
+        self._exit_since: Optional[float] = None
+        self._tail: List[Snapshot] = []                         # 退出判定期间暂存的样本
+        self._next_id = 1
+        if path:
+            self._load(path)
+
+    def _load(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    self._completed.append(SessionReport.model_validate_json(line))
+                except ValueError:
+                    logger.warning(f"跳过损坏的会话记录: {path} 第 {number} 行")
+        if self._completed:
+            self._next_id = self._completed[-1].id + 1
+            logger.info(f"已加载 {len(self._completed)} 个历史会话: {path}")
+
+    @property
+    def engaged(self) -> bool:
+        """进入阈值待确认或会话进行中 (此时才需要全部指标)"""
+        return self._active is not None or self._candidate is not None
+
+    def offer(self, snap: Snapshot):
+        usage = snap.stats.gpu_usage
+        if usage is None:
+            return      # 数据缺失: 保持当前状态
+        now = snap.timestamp
+        with self._lock:
+            if self._active is None:
+                if usage < self.enter:
+                    self._candidate = None
+                    return
+                if self._candidate is None:
+                    self._candidate = Session(self._next_id, now)
+                self._candidate.add(snap)
+                if now - self._candidate.start >= self.enter_after:
+                    self._active, self._candidate = self._candidate, None
+                    self._next_id += 1
+                    self._exit_since = None
+                    logger.info(f"🎮 游戏会话 #{self._active.id} 开始")
+                return
+
+            if usage >= self.exit:
+                # 负载恢复: 暂存的样本补计入会话
+                for pending in self._tail:
+                    self._active.add(pending)
+                self._tail.clear()
+                self._exit_since = None
+                self._active.add(snap)
+                return
+            if self._exit_since is None:
+                self._exit_since = now
+            self._tail.append(snap)
+            if now - self._exit_since >= self.exit_after:
+                self._finish()
+
+    def _finish(self):
+        if self._exit_since is not None:
+            # 退出判定期间的样本丢弃, 会话在负载下降时刻结束
+            self._active.end = self._exit_since
+            self._tail.clear()
+            self._exit_since = None
+        report = self._active.report("completed")
+        self._active = None
+        self._completed.append(report)
+        logger.info(f"🏁 游戏会话 #{report.id} 结束: {report.duration:.0f}s, {report.energy_wh} Wh")
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(report.model_dump_json() + "\n")
+            except OSError as e:
+                logger.error(f"会话写入失败: {e}")
+
+    def close(self):
+        """关闭时结束进行中的会话, 避免丢失战报"""
+        with self._lock:
+            if self._active is not None:
+                self._finish()
+
+    def sessions(self) -> List[SessionSummary]:
+        """全部会话摘要 (新的在前, 含进行中的会话)"""
+        with self._lock:
+            result = [SessionSummary(**r.model_dump(exclude={"metrics", "time_above"}))
+                      for r in reversed(self._completed)]
+            if self._active is not None:
+                result.insert(0, SessionSummary(**self._active._summary_fields("active")))
+        return result
+
+    def report(self, session_id: int) -> Optional[SessionReport]:
+        with self._lock:
+            if self._active is not None and self._active.id == session_id:
+                return self._active.report("active")
+            for r in self._completed:
+                if r.id == session_id:
+                    return r
+        return None
@@ -0,0 +1,238 @@
+"""
+黑塔之眼 - 共享内存快照通道
+==========================================
+- 后端把每个快照写入固定布局的 multiprocessing.shared_memory 块, 供同机的悬浮窗 / Overlay 读取
+- 顺序锁 (seqlock): 写入前序号加一 (奇数), 写完再加一 (偶数); 读者在前后两次读到同一偶数序号时数据一致
+- 读取只有内存访问 (struct.unpack_from), 没有系统调用, 不经过 HTTP / JSON
+- 字段名写在块头部 (JSON), 读者不需要导入后端模块; 缺失值为 NaN
+- 读者定期在块内写入自己的心跳, 后端据此把 "悬浮窗" 计为按需采样的消费者
+
+布局 (小端, 8 字节对齐):
+    0   magic "HERTASHM" | 8 布局版本 u32 | 12 字段数 u32 | 16 seqlock 序号 u64 | 24 读者心跳 f64 (time.time)
+    32  字段名 JSON (NAMES_SIZE 字节, NUL 填充)
+    PAYLOAD_OFFSET  采样序号 u64 | 采样时刻 f64 | 各字段 f64 ...
+
+独立读取 (无需后端依赖):
+    python -m backend.shm              # 每秒 10 次打印 GPU% / 温度 / FPS
+    python -m backend.shm --once       # 打印一次完整快照 (JSON)
+"""
+
+import argparse
+import json
+import math
+import struct
+import sys
+import time
+import logging
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger("HertaBackend")
+
+DEFAULT_NAME = "herta_snapshot"
+MAGIC = b"HERTASHM"
+LAYOUT_VERSION = 1
+HEADER = struct.Struct("<8sIIQd")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 16
+READER_OFFSET = 24
+NAMES_SIZE = 1024
+PAYLOAD_OFFSET = HEADER.size + NAMES_SIZE
+MAX_SPINS = 1000            # 读者等待写入完成的最大重试次数 (写入只需数微秒)
+YIELD_AFTER = 16            # 连续重试超过该次数后让出 CPU (写入端可能被抢占在写入中途)
+READER_TOUCH = 1.0          # 读者心跳写入间隔 (秒)
+READER_TTL = 5.0            # 后端视读者为活跃的时长 (秒)
+STALE_AFTER = 15.0          # 样本超过该年龄 (秒, 大于空闲心跳周期) 时, 参考读者重新打开 (后端可能已重启)
+
+
+def _payload(n_fields: int) -> struct.Struct:
+    return struct.Struct(f"<Qd{n_fields}d")
+
+
+# --- 写入端 (后端采样线程) ---
+class SnapshotPublisher:
+    """采样线程回调: 每个快照写入共享内存一次"""
+
+    def __init__(self, name: str, fields: List[str]):
+        names = json.dumps(fields).encode("utf-8")
+        if len(names) > NAMES_SIZE:
+            raise ValueError(f"字段名过长 ({len(names)} > {NAMES_SIZE} 字节)")
+        self.name = name
+        self.fields = list(fields)
+        self._payload = _payload(len(fields))
+        size = PAYLOAD_OFFSET + self._payload.size
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 上次进程异常退出残留的块 (POSIX): 大小足够时直接接管
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.size < size:
+                self._shm.close()
+                raise
+        self._buf = self._shm.buf
+        self._seq = 0
+        HEADER.pack_into(self._buf, 0, MAGIC, LAYOUT_VERSION, len(fields), 0, 0.0)
+        self._buf[HEADER.size:PAYLOAD_OFFSET] = names.ljust(NAMES_SIZE, b"\0")
+        logger.info(f"共享内存快照已启用: {name} ({size} 字节, {len(fields)} 个字段)")
+
+    def offer(self, snap):
+        stats = snap.stats
+        nan = math.nan
+        values = [nan if (v := getattr(stats, f)) is None else v for f in self.fields]
+        buf = self._buf
+        seq = self._seq
+        SEQ.pack_into(buf, SEQ_OFFSET, seq + 1)         # 奇数: 写入中
+        self._payload.pack_into(buf, PAYLOAD_OFFSET, snap.seq, snap.timestamp, *values)
+        SEQ.pack_into(buf, SEQ_OFFSET, seq + 2)         # 偶数: 写入完成
+        self._seq = seq + 2
+
+    def reader_active(self) -> bool:
+        """最近 READER_TTL 秒内是否有读者 (由读者写入的心跳判断)"""
+        (seen,) = struct.unpack_from("<d", self._buf, READER_OFFSET)
+        return time.time() - seen < READER_TTL
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# --- 读取端 (悬浮窗等独立进程) ---
+class SharedSnapshot(NamedTuple):
+    seq: int                            # 采样序号
+    timestamp: float                    # 采样时刻 (time.time)
+    values: Dict[str, Optional[float]]  # 字段 -> 数值 (缺失为 None)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+
+class SnapshotReader:
+    """
+    只读访问后端发布的快照。后端未运行时构造抛出 FileNotFoundError。
+    read_values() 返回原始 float 元组 (按 fields 顺序, 缺失为 NaN), 开销最低;
+    read() 额外组装为字典。
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        if sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if sys.platform != "win32":
+                # 3.13 之前读者进程退出时 resource_tracker 会 unlink 共享块, 需取消登记
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._buf = self._shm.buf
+        magic, version, n_fields, _, _ = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self._shm.close()
+            raise ValueError(f"共享内存布局不匹配: {magic!r} v{version}")
+        names = bytes(self._buf[HEADER.size:PAYLOAD_OFFSET]).rstrip(b"\0")
+        self.name = name
+        self.fields: List[str] = json.loads(names)
+        self._payload = _payload(n_fields)
+        self._touched = 0.0
+
+    def read_values(self) -> Optional[tuple]:
+        """
+        (采样序号, 采样时刻, 字段值...); 尚无数据或写入端卡在写入中时返回 None。
+        无竞争时只有三次 unpack_from; 只有写入端恰好在写入中途被抢占时才会让出 CPU。
+        """
+        buf = self._buf
+        unpack_seq = SEQ.unpack_from
+        unpack_payload = self._payload.unpack_from
+        for spin in range(MAX_SPINS):
+            if spin >= YIELD_AFTER:
+                time.sleep(0)
+            (before,) = unpack_seq(buf, SEQ_OFFSET)
+            if before & 1:
+                continue
+            data = unpack_payload(buf, PAYLOAD_OFFSET)
+            (after,) = unpack_seq(buf, SEQ_OFFSET)
+            if before == after:
+                if not before:
+                    return None
+                self._touch(data[1])
+                return data
+        return None
+
+    def read(self) -> Optional[SharedSnapshot]:
+        data = self.read_values()
+        if data is None:
+            return None
+        values = {f: (None if math.isnan(v) else v) for f, v in zip(self.fields, data[2:])}
+        return SharedSnapshot(data[0], data[1], values)
+
+    def _touch(self, now: float):
+        # 以最新样本时刻近似当前时间, 每秒最多写一次心跳 (避免每次读取都调用 time.time)
+        if now - self._touched >= READER_TOUCH:
+            self._touched = now
+            struct.pack_into("<d", self._buf, READER_OFFSET, time.time())
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- 参考读者 (无界面) ---
+def _fmt(value: Optional[float], unit: str) -> str:
+    return "--" if value is None else f"{value:.0f}{unit}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="黑塔之眼共享内存快照读者")
+    parser.add_argument("--name", default=DEFAULT_NAME, help="共享内存块名称 (HERTA_SHM)")
+    parser.add_argument("--hz", type=float, default=10.0, help="刷新频率")
+    parser.add_argument("--once", action="store_true", help="打印一次完整快照后退出")
+    args = parser.parse_args()
+
+    reader: Optional[SnapshotReader] = None
+    interval = 1.0 / args.hz
+    try:
+        while True:
+            if reader is None:
+                try:
+                    reader = SnapshotReader(args.name)
+                except FileNotFoundError:
+                    if args.once:
+                        sys.exit(f"❌ 共享内存块 {args.name} 不存在 (后端未运行或 HERTA_SHM 为空)")
+                    print("⏳ 等待后端...", end="\r", flush=True)
+                    time.sleep(1.0)
+                    continue
+
+            snap = reader.read()
+            if args.once:
+                print(json.dumps(snap._asdict() if snap else None, ensure_ascii=False, indent=2))
+                return
+            if snap is None or snap.age > STALE_AFTER:
+                # 尚未采样, 或后端重启后旧块不再更新: 稍后重新打开
+                reader.close()
+                reader = None
+                time.sleep(1.0)
+                continue
+
+            v = snap.values
+            print(f"GPU {_fmt(v.get('gpu_usage'), '%'):>5} {_fmt(v.get('gpu_temp'), '°C'):>5}  "
+                  f"FPS {_fmt(v.get('fps'), ''):>4}  #{snap.seq} ({snap.age * 1000:.0f} ms)   ",
+                  end="\r", flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        if reader:
+            reader.close()
+
+
+if __name__ == "__main__":
+    main()
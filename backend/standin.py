@@ -0,0 +1,96 @@
+"""
+黑塔之眼 - 替身后端 (多机调试)
+==========================================
+- 在一个进程内启动多个使用合成传感器树的 /stats + /roast 后端, 无需 DLL
+- 每台替身机器使用不同的随机种子, 数据各不相同
+- 可为指定机器注入响应延迟或让其挂起, 用于验证 Hub 的隔离性
+
+用法:
+    python -m backend.standin --count 4 --base-port 8001 --slow 2=1.5 --hang 3
+    HERTA_RIGS=localhost:8001,localhost:8002,localhost:8003,localhost:8004 python -m backend.hub
+"""
+
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+
+from backend.hardware import HardwareMonitor
+from backend.sampler import Sampler
+from backend.synthetic import build_computer
+
+
+def build_app(index: int, delay: float = 0.0, hang: bool = False, period: float = 0.25) -> FastAPI:
+    """第 index 台替身机器; delay 为 /stats 额外延迟 (秒), hang 为 True 时请求永不返回"""
+    monitor = HardwareMonitor(build_computer(n_gpus=1, seed=index))
+    sampler = Sampler(monitor.sample, period=period)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        sampler.start()
+        yield
+        sampler.stop()
+        monitor.close()
+
+    app = FastAPI(title=f"Herta's Eye stand-in #{index}", lifespan=lifespan)
+
+    def latest():
+        snap = sampler.latest()
+        if snap is None:
+            raise HTTPException(status_code=503, detail="采样尚未就绪")
+        return snap
+
+    @app.get("/stats")
+    async def get_stats():
+        if hang:
+            await asyncio.Event().wait()
+        if delay:
+            await asyncio.sleep(delay)
+        snap = latest()
+        return {**snap.stats.model_dump(), "sample_seq": snap.seq, "sampled_at": round(snap.timestamp, 3)}
+
+    @app.get("/roast")
+    async def get_roast():
+        snap = latest()
+        return {"message": f"替身 #{index}: 一切正常。", "sample_seq": snap.seq, "sample_age": round(snap.age, 3)}
+
+    return app
+
+
+def _parse_delays(items) -> Dict[int, float]:
+    delays: Dict[int, float] = {}
+    for item in items or []:
+        index, _, seconds = item.partition("=")
+        delays[int(index)] = float(seconds or 1.0)
+    return delays
+
+
+async def serve(count: int, base_port: int, host: str = "127.0.0.1",
+                delays: Optional[Dict[int, float]] = None, hangs=()):
+    delays = delays or {}
+    servers = []
+    for i in range(count):
+        app = build_app(i, delay=delays.get(i, 0.0), hang=i in hangs)
+        config = uvicorn.Config(app, host=host, port=base_port + i, log_level="warning")
+        servers.append(uvicorn.Server(config))
+        print(f"🎭 替身 #{i}: http://{host}:{base_port + i}"
+              + (" (挂起)" if i in hangs else f" (延迟 {delays[i]}s)" if i in delays else ""))
+    await asyncio.gather(*(s.serve() for s in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动多个合成数据后端")
+    parser.add_argument("--count", type=int, default=4, help="替身机器数量")
+    parser.add_argument("--base-port", type=int, default=8001, help="第一台机器的端口, 之后依次 +1")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--slow", action="append", metavar="INDEX=SECONDS", help="为指定机器的 /stats 注入延迟")
+    parser.add_argument("--hang", action="append", type=int, default=[], metavar="INDEX", help="指定机器的 /stats 永不返回")
+    args = parser.parse_args()
+    asyncio.run(serve(args.count, args.base_port, args.host, _parse_delays(args.slow), set(args.hang)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+黑塔之眼 - 启动阶段与就绪状态
+==========================================
+- 后端先监听端口, 硬件 (DLL 加载 + Computer.Open) 在采样线程内后台打开
+- 记录各阶段距启动的耗时: 导入完成 / 开始监听 / 硬件打开 / 首个快照, 首个快照到达即为就绪
+- 启动时刻由托盘管理器通过 HERTA_LAUNCH_TS 传入 (含解释器启动与导入), 未设置时为本模块导入时刻
+- /health 只表示进程存活; /ready 在首个快照之前返回 503 (托盘据此等待, 不再固定 sleep)
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger("HertaBackend")
+
+LAUNCH_ENV = "HERTA_LAUNCH_TS"
+_IMPORTED = time.time()
+
+# 阶段 -> 日志中的名称 (按发生顺序)
+PHASES = {
+    "imported": "导入",
+    "listening": "监听",
+    "hardware_opened": "硬件",
+    "first_sample": "首次采样",
+}
+
+
+def launch_time() -> float:
+    """启动时刻 (time.time): 托盘传入的 HERTA_LAUNCH_TS, 否则为本模块导入时刻"""
+    try:
+        return float(os.environ[LAUNCH_ENV])
+    except (KeyError, ValueError):
+        return _IMPORTED
+
+
+class StartupTracker:
+    def __init__(self, launched: Optional[float] = None):
+        self.launched = launched if launched is not None else launch_time()
+        self.phases: Dict[str, float] = {}      # 阶段 -> 距启动的秒数
+        self.ready = False
+        self.error: Optional[str] = None
+
+    def mark(self, phase: str):
+        self.phases[phase] = round(time.time() - self.launched, 3)
+
+    def fail(self, error: str):
+        self.error = error
+        logger.error(f"❌ 启动失败: {error}")
+
+    def first_data(self, snap):
+        """采样线程回调: 首个快照到达即就绪"""
+        if self.ready:
+            return
+        self.mark("first_sample")
+        self.ready = True
+        steps = " → ".join(f"{PHASES[p]} {self.phases[p]:.2f}s" for p in PHASES if p in self.phases)
+        logger.info(f"⏱️ 首个数据就绪: 启动后 {self.phases['first_sample']:.2f}s ({steps})")
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "launched": self.launched,
+            "uptime": round(time.time() - self.launched, 1),
+            "phases": dict(self.phases),
+        }
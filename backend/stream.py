@@ -0,0 +1,139 @@
+"""
+黑塔之眼 - 推送流 (SSE / WebSocket)
+==========================================
+- 每个新快照只序列化一次, 扇出给所有订阅者
+- 首帧为完整数据, 之后只发送变化的字段 (delta)
+- 每个客户端可指定限速 (max_rate) 与字段子集 (fields)
+- 背压: 每个订阅者只保留最新一帧, 慢消费者丢弃中间帧, 不会无限缓冲
+- 保活按距上次发出 (帧或保活) 的时间计算: 字段子集长时间不变 (只有空 delta) 的订阅者也会定期收到保活
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend.sampler import Snapshot
+
+logger = logging.getLogger("HertaBackend")
+
+# 距上次发出超过该时长 (秒) 时发送保活
+KEEPALIVE_INTERVAL = 15.0
+
+Item = Tuple[Snapshot, Dict]
+
+
+class Subscriber:
+    def __init__(self, fields: Optional[List[str]] = None, max_rate: Optional[float] = None):
+        self.fields = fields
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.dropped = 0                      # 被覆盖 (未发送) 的中间帧数
+        self._latest: Optional[Item] = None   # 单槽 "邮箱": 只保留最新一帧
+        self._event = asyncio.Event()
+        self._sent: Optional[Dict] = None     # 客户端当前持有的字段值
+        self._last_send = 0.0
+        self._last_emit: Optional[float] = None     # 最近一次发出帧或保活 (loop.time)
+
+    def offer(self, item: Item):
+        """投递新快照 (事件循环线程内调用)"""
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = item
+        self._event.set()
+
+    async def next_frame(self) -> Optional[Dict]:
+        """
+        等待下一帧。
+        返回 None 表示距上次发出已达 KEEPALIVE_INTERVAL (调用方应发送保活消息);
+        快照不断到达但 delta 为空时同样如此。
+        """
+        loop = asyncio.get_running_loop()
+        if self._last_emit is None:
+            self._last_emit = loop.time()
+        while True:
+            deadline = self._last_emit + KEEPALIVE_INTERVAL
+            # 限速: 等待期间到达的快照会互相覆盖, 醒来后只发送最新的一帧
+            wait = self._last_send + self.min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(min(wait, deadline - loop.time()))
+
+            try:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(self._event.wait(), remaining)
+            except asyncio.TimeoutError:
+                self._last_emit = loop.time()
+                return None
+            self._event.clear()
+            snap, data = self._latest
+            self._latest = None
+
+            frame = self._build(snap, data)
+            if frame is not None:
+                self._last_send = self._last_emit = loop.time()
+                return frame
+
+    def _build(self, snap: Snapshot, data: Dict) -> Optional[Dict]:
+        if self.fields is not None:
+            data = {k: data[k] for k in self.fields}
+
+        if self._sent is None:
+            self._sent = data
+            return {"seq": snap.seq, "timestamp": snap.timestamp, "full": True, "data": data}
+
+        changed = {k: v for k, v in data.items() if self._sent.get(k) != v}
+        if not changed:
+            return None
+        self._sent = data
+        return {"seq": snap.seq, "timestamp": snap.timestamp, "full": False, "data": changed}
+
+
+class StreamHub:
+    """采样线程 -> 事件循环 的快照扇出中心"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subs: Set[Subscriber] = set()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def publish(self, snap: Snapshot):
+        """采样线程回调: 转交事件循环处理"""
+        if self._loop is None or not self._subs:
+            return
+        self._loop.call_soon_threadsafe(self._fanout, snap)
+
+    def _fanout(self, snap: Snapshot):
+        # 每个快照只 dump 一次, 所有订阅者共享
+        item = (snap, snap.stats.model_dump())
+        for sub in self._subs:
+            sub.offer(item)
+
+    def subscribe(self, sub: Subscriber, latest: Optional[Snapshot] = None) -> Subscriber:
+        self._subs.add(sub)
+        # 立即投递当前快照, 新客户端无需等待下一次采样即可收到完整首帧
+        if latest is not None:
+            sub.offer((latest, latest.stats.model_dump()))
+        logger.info(f"推送订阅 +1 (当前 {len(self._subs)})")
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subs.discard(sub)
+        logger.info(f"推送订阅 -1 (当前 {len(self._subs)}, 丢弃中间帧 {sub.dropped})")
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+
+def encode_frame(frame: Dict) -> str:
+    return json.dumps(frame, ensure_ascii=False, separators=(",", ":"))
+
+
+def sse_event(frame: Optional[Dict]) -> str:
+    """SSE 文本格式; frame 为 None 时输出保活注释"""
+    if frame is None:
+        return ": keepalive\n\n"
+    return f"id: {frame['seq']}\ndata: {encode_frame(frame)}\n\n"
@@ -0,0 +1,368 @@
+"""
+黑塔之眼 - 合成传感器树
+==========================================
+- 模拟 LibreHardwareMonitor 的 Computer / IHardware / ISensor 结构
+- 不依赖 Pythonnet 与 DLL, 可在 Linux 上运行 (基准测试 / 调试)
+- 统计每次属性访问 (模拟 CLR 边界调用次数)
+- 风扇 Control 支持 SetSoftware / SetDefault; ThermalPlant 热模型用于在 Linux 上仿真风扇闭环控制
+"""
+
+import math
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class CallCounter:
+    """CLR 边界调用计数器"""
+    def __init__(self):
+        self.calls = 0
+
+
+class FakeEvent:
+    """模拟 .NET 事件 (支持 += / -=)"""
+    def __init__(self):
+        self._handlers: List[Callable] = []
+
+    def __iadd__(self, handler):
+        self._handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+        return self
+
+    def fire(self, *args):
+        for handler in list(self._handlers):
+            handler(*args)
+
+
+class FakeControl:
+    """模拟 IControl (Control 类传感器的 sensor.Control): 软件设定值覆盖传感器读数"""
+    def __init__(self, sensor: "FakeSensor", on_change: Optional[Callable[[], None]] = None):
+        self._sensor = sensor
+        self._on_change = on_change
+        self.ControlMode = "Default"
+        self.SoftwareValue = 0.0
+
+    def SetSoftware(self, value: float):
+        self._sensor._counter.calls += 1
+        self.ControlMode = "Software"
+        self.SoftwareValue = float(value)
+        self._sensor._value = float(value)
+        if self._on_change:
+            self._on_change()
+
+    def SetDefault(self):
+        self._sensor._counter.calls += 1
+        self.ControlMode = "Default"
+        if self._on_change:
+            self._on_change()
+
+
+class FakeSensor:
+    def __init__(self, counter: CallCounter, hw_ident: str, sensor_type: str, name: str,
+                 index: int, base: float, amplitude: float = 0.0, rng: Optional[random.Random] = None):
+        self._counter = counter
+        self._type = sensor_type
+        self._name = name
+        self._identifier = f"{hw_ident}/{sensor_type.lower()}/{index}"
+        self._base = base
+        self._amplitude = amplitude
+        self._phase = (rng or random).uniform(0, 2 * math.pi)
+        self._value: Optional[float] = None
+        self._control = FakeControl(self) if sensor_type == "Control" else None
+
+    # 每个属性访问都计为一次 CLR 调用
+    @property
+    def Identifier(self):
+        self._counter.calls += 1
+        return self._identifier
+
+    @property
+    def SensorType(self):
+        self._counter.calls += 1
+        return self._type
+
+    @property
+    def Name(self):
+        self._counter.calls += 1
+        return self._name
+
+    @property
+    def Value(self):
+        self._counter.calls += 1
+        return self._value
+
+    @property
+    def Control(self):
+        self._counter.calls += 1
+        return self._control
+
+    def _tick(self, t: float):
+        if self._control is not None and self._control.ControlMode == "Software":
+            return      # 软件控制中: 读数即设定值
+        self._value = self._base + self._amplitude * math.sin(t * 0.3 + self._phase)
+
+
+class FakeHardware:
+    def __init__(self, counter: CallCounter, hardware_type: str, name: str, identifier: str):
+        self._counter = counter
+        self._type = hardware_type
+        self._name = name
+        self._identifier = identifier
+        self._sensors: List[FakeSensor] = []
+        self._sub: List["FakeHardware"] = []
+        self._ticks = 0
+        self.SensorAdded = FakeEvent()
+        self.SensorRemoved = FakeEvent()
+
+    @property
+    def HardwareType(self):
+        self._counter.calls += 1
+        return self._type
+
+    @property
+    def Name(self):
+        self._counter.calls += 1
+        return self._name
+
+    @property
+    def Identifier(self):
+        self._counter.calls += 1
+        return self._identifier
+
+    @property
+    def Sensors(self):
+        self._counter.calls += 1
+        return list(self._sensors)
+
+    @property
+    def SubHardware(self):
+        self._counter.calls += 1
+        return list(self._sub)
+
+    def Update(self):
+        self._counter.calls += 1
+        self._ticks += 1
+        for sensor in self._sensors:
+            sensor._tick(self._ticks)
+
+    def add_sensor(self, sensor: FakeSensor, notify: bool = True):
+        self._sensors.append(sensor)
+        if notify:
+            self.SensorAdded.fire(sensor)
+
+
+class FakeComputer:
+    def __init__(self):
+        self.counter = CallCounter()
+        self._hardware: List[FakeHardware] = []
+        self.HardwareAdded = FakeEvent()
+        self.HardwareRemoved = FakeEvent()
+
+    @property
+    def Hardware(self):
+        self.counter.calls += 1
+        return list(self._hardware)
+
+    def add_hardware(self, hardware: FakeHardware, notify: bool = True):
+        self._hardware.append(hardware)
+        if notify:
+            self.HardwareAdded.fire(hardware)
+
+    def remove_hardware(self, hardware: FakeHardware):
+        self._hardware.remove(hardware)
+        self.HardwareRemoved.fire(hardware)
+
+    def Open(self):
+        pass
+
+    def Close(self):
+        pass
+
+
+# --- 构建器 ---
+def _add(hw: FakeHardware, rng: random.Random, sensor_type: str, names, base, amplitude=0.0):
+    start = sum(1 for s in hw._sensors if s._type == sensor_type)
+    for i, name in enumerate(names):
+        hw.add_sensor(FakeSensor(hw._counter, hw._identifier, sensor_type, name,
+                                 start + i, base, amplitude, rng), notify=False)
+
+
+def build_cpu(counter: CallCounter, rng: random.Random, n_cores: int) -> FakeHardware:
+    hw = FakeHardware(counter, "Cpu", "AMD Ryzen 9 7950X", "/amdcpu/0")
+    cores = [f"CPU Core #{i + 1}" for i in range(n_cores)]
+    _add(hw, rng, "Load", ["CPU Total", "CPU Core Max"], 35, 20)
+    _add(hw, rng, "Load", cores, 35, 30)
+    _add(hw, rng, "Temperature", ["Core (Tctl/Tdie)", "CPU Package", "Core Max"], 62, 10)
+    _add(hw, rng, "Temperature", [f"Core #{i + 1}" for i in range(n_cores)], 58, 12)
+    _add(hw, rng, "Clock", [f"Core #{i + 1}" for i in range(n_cores)], 4800, 300)
+    _add(hw, rng, "Power", ["Package", "Core (SVI2 TFN)"], 90, 40)
+    _add(hw, rng, "Voltage", ["Core (SVI2 TFN)", "SoC (SVI2 TFN)"], 1.2, 0.05)
+    return hw
+
+
+def build_memory(counter: CallCounter, rng: random.Random) -> FakeHardware:
+    hw = FakeHardware(counter, "Memory", "Total Memory", "/ram")
+    _add(hw, rng, "Load", ["Memory"], 48, 5)
+    _add(hw, rng, "Data", ["Memory Used", "Memory Available"], 15, 2)
+    return hw
+
+
+def build_gpu(counter: CallCounter, rng: random.Random, index: int) -> FakeHardware:
+    hw = FakeHardware(counter, "GpuNvidia", f"NVIDIA GeForce RTX 4070 #{index}", f"/gpu-nvidia/{index}")
+    _add(hw, rng, "Load", ["GPU Core", "GPU Memory Controller", "GPU Video Engine", "GPU Memory"], 70, 25)
+    _add(hw, rng, "Temperature", ["GPU Core", "GPU Hot Spot"], 68, 10)
+    _add(hw, rng, "SmallData", ["GPU Memory Free"], 6000, 1000)
+    _add(hw, rng, "SmallData", ["GPU Memory Used"], 6000, 1000)
+    _add(hw, rng, "SmallData", ["GPU Memory Total"], 12282)
+    _add(hw, rng, "Power", ["GPU Package"], 160, 40)
+    _add(hw, rng, "Clock", ["GPU Core"], 2600, 150)
+    _add(hw, rng, "Clock", ["GPU Memory"], 10501)
+    _add(hw, rng, "Fan", ["GPU Fan 1", "GPU Fan 2"], 1500, 400)
+    _add(hw, rng, "Control", ["GPU Fan 1", "GPU Fan 2"], 50, 20)
+    return hw
+
+
+def build_motherboard(counter: CallCounter, rng: random.Random) -> FakeHardware:
+    hw = FakeHardware(counter, "Motherboard", "ASUS ROG STRIX X670E-E", "/motherboard")
+    sio = FakeHardware(counter, "SuperIO", "Nuvoton NCT6799D", "/lpc/nct6799d/0")
+    _add(sio, rng, "Voltage", ["Vcore", "+5V", "AVCC", "+3.3V", "+12V", "CPU VDDIO / MC"], 3.3, 0.05)
+    _add(sio, rng, "Temperature", ["CPU", "Motherboard", "VRM MOS", "PCH"], 45, 5)
+    _add(sio, rng, "Fan", [f"Fan #{i + 1}" for i in range(5)], 1100, 200)
+    _add(sio, rng, "Control", [f"Fan #{i + 1}" for i in range(5)], 45, 10)
+    hw._sub.append(sio)
+    return hw
+
+
+def build_computer(n_gpus: int = 1, n_cores: int = 8, seed: int = 0,
+                   motherboard: bool = True) -> FakeComputer:
+    """构建一棵 LibreHardwareMonitor 形状的合成传感器树"""
+    rng = random.Random(seed)
+    computer = FakeComputer()
+    c = computer.counter
+    computer.add_hardware(build_cpu(c, rng, n_cores), notify=False)
+    computer.add_hardware(build_memory(c, rng), notify=False)
+    for i in range(n_gpus):
+        computer.add_hardware(build_gpu(c, rng, i), notify=False)
+    if motherboard:
+        computer.add_hardware(build_motherboard(c, rng), notify=False)
+    return computer
+
+
+# --- 热模型 (风扇控制仿真) ---
+class ThermalPlant:
+    """
+    GPU 一阶热模型 + 风扇转速滞后, 按真实时间 (time.monotonic) 积分:
+        C·dT/dt = P(load) - (G_STILL + G_FAN·rpm/MAX_RPM)·(T - AMBIENT)
+    风扇占空比来自 Control 传感器的软件设定值 (无软件控制时为 AUTO_DUTY)。
+    记录温度向上越过各阈值的真实时刻, 以及其后第一次提高占空比的时刻 (端到端反应延迟)。
+    """
+
+    AMBIENT = 30.0      # °C
+    CAPACITY = 40.0     # J/K
+    G_STILL = 1.5       # W/K, 风扇停转时的散热
+    G_FAN = 5.0         # W/K, 满转速时额外的散热
+    P_IDLE = 30.0       # W
+    P_MAX = 250.0       # W
+    MAX_RPM = 3000.0
+    FAN_TAU = 1.5       # 风扇转速时间常数 (秒)
+    AUTO_DUTY = 30.0    # 驱动默认占空比 (%)
+    MAX_STEP = 0.02     # 积分步长 (秒)
+
+    def __init__(self, load: Callable[[float], float], thresholds: List[float] = (), temp: float = 40.0):
+        self.load = load                    # 经过时间 (秒) -> GPU 负载 (%)
+        self.thresholds = sorted(thresholds)
+        self.temp = temp
+        self.rpm = self.AUTO_DUTY / 100 * self.MAX_RPM
+        self.duty = self.AUTO_DUTY
+        self.start = time.monotonic()
+        self.crossings: List[list] = []     # [阈值, 越过时刻, 响应时刻 or None] (相对 start, 秒)
+        self._last = self.start
+        self._hang_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def power(self) -> float:
+        return self.P_IDLE + (self.P_MAX - self.P_IDLE) * self.load(self._last - self.start) / 100
+
+    def advance(self, now: float):
+        with self._lock:
+            while self._last < now:
+                dt = min(self.MAX_STEP, now - self._last)
+                power = self.power
+                g = self.G_STILL + self.G_FAN * self.rpm / self.MAX_RPM
+                before = self.temp
+                self.temp += (power - g * (self.temp - self.AMBIENT)) / self.CAPACITY * dt
+                self.rpm += (self.duty / 100 * self.MAX_RPM - self.rpm) * min(1.0, dt / self.FAN_TAU)
+                self._last += dt
+                for t in self.thresholds:
+                    if before <= t < self.temp:
+                        self.crossings.append([t, self._last - self.start, None])
+
+    def set_duty(self, duty: float):
+        now = time.monotonic()
+        self.advance(now)
+        with self._lock:
+            if duty > self.duty:
+                for crossing in self.crossings:
+                    if crossing[2] is None:
+                        crossing[2] = now - self.start
+            self.duty = duty
+
+    def hang(self, seconds: float):
+        """模拟驱动卡死: 之后的 Update() 阻塞 seconds 秒 (采样线程停摆, 快照变旧)"""
+        self._hang_until = time.monotonic() + seconds
+
+
+class PlantGpu(FakeHardware):
+    """读数来自 ThermalPlant 的 GPU; 风扇 Control 的设定值回馈到热模型"""
+
+    def __init__(self, counter: CallCounter, rng: random.Random, plant: ThermalPlant):
+        base = build_gpu(counter, rng, 0)
+        super().__init__(counter, base._type, base._name, base._identifier)
+        self._sensors = base._sensors
+        self._plant = plant
+        self._controls = [s._control for s in self._sensors if s._control is not None]
+        for control in self._controls:
+            control._on_change = self._duty_changed
+        by_name = {(s._type, s._name): s for s in self._sensors}
+        self._load = by_name[("Load", "GPU Core")]
+        self._temps = [by_name[("Temperature", "GPU Core")], by_name[("Temperature", "GPU Hot Spot")]]
+        self._fans = [s for s in self._sensors if s._type == "Fan"]
+        self._power = by_name[("Power", "GPU Package")]
+
+    def _duty_changed(self):
+        duties = [c.SoftwareValue for c in self._controls if c.ControlMode == "Software"]
+        self._plant.set_duty(sum(duties) / len(duties) if duties else ThermalPlant.AUTO_DUTY)
+
+    def Update(self):
+        super().Update()
+        plant = self._plant
+        while time.monotonic() < plant._hang_until:
+            time.sleep(0.05)
+        plant.advance(time.monotonic())
+        self._load._value = plant.load(plant._last - plant.start)
+        self._temps[0]._value = plant.temp
+        self._temps[1]._value = plant.temp + 8.0
+        for fan in self._fans:
+            fan._value = plant.rpm
+        self._power._value = plant.power
+        for control in self._controls:
+            if control.ControlMode != "Software":
+                control._sensor._value = plant.duty
+
+
+def build_plant_computer(plant: ThermalPlant, n_cores: int = 8, seed: int = 0) -> FakeComputer:
+    """单 GPU 合成树, GPU 由热模型驱动 (风扇控制仿真)"""
+    rng = random.Random(seed)
+    computer = FakeComputer()
+    c = computer.counter
+    computer.add_hardware(build_cpu(c, rng, n_cores), notify=False)
+    computer.add_hardware(build_memory(c, rng), notify=False)
+    computer.add_hardware(PlantGpu(c, rng, plant), notify=False)
+    computer.add_hardware(build_motherboard(c, rng), notify=False)
+    return computer
@@ -0,0 +1,402 @@
+"""
+黑塔之眼 - 降频检测 (温度墙 / 功耗墙 / 空闲)
+==========================================
+- 每个快照对每块 GPU 增量求值一次, 每块 GPU 只保存固定数量的状态 (O(1) 时间与内存)
+- 基准频率: 高负载且未降频时 GPU 核心频率的 EWMA (时间常数 CLOCK_TAU); 降频期间不更新, 不会被拉低
+- 功耗上限: 高负载样本功耗的衰减峰值 (缓慢跟随当前功耗, 新高立即跟上), 接近该值视为 "顶到功耗墙";
+  低负载样本不参与, 否则长时间空闲后峰值会衰减到空闲功耗
+- 频率低于基准 DROP 以上时按优先级判定原因:
+    idle     负载低 (< IDLE_LOAD), 驱动主动降频, 属正常现象
+    thermal  温度接近温度墙 (TEMP_LIMIT - TEMP_MARGIN)
+    power    功耗接近功耗上限 (POWER_RATIO × 峰值)
+  原因无法解释的频率下降不记为降频 (基准随之更新)
+- 原因持续 ENTER 秒开始一个事件, 恢复持续 EXIT 秒后结束; 事件记录起止时间、原因、频率亏损
+- 读数来自 HardwareMonitor.device_readings() (每块 GPU 分开, 未经合并)
+- 空闲降频只体现在设备状态与进行中事件里, 不进入最近事件列表 (避免挤掉温度墙 / 功耗墙记录)
+- 任一 GPU 负载达到 IDLE_LOAD 或有进行中的温度墙 / 功耗墙事件时才需要 1 Hz 采样 (engaged), 平时随心跳周期求值
+
+独立仿真 (不访问硬件, 虚拟时间):
+    python -m backend.throttle --simulate
+"""
+
+import argparse
+import math
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from backend.hardware import SensorReadings
+from backend.sampler import Snapshot
+
+logger = logging.getLogger("HertaBackend")
+
+CLOCK_TAU = 30.0        # 基准频率 EWMA 时间常数 (秒)
+POWER_TAU = 600.0       # 功耗峰值的衰减时间常数 (秒)
+HIGH_LOAD = 80.0        # 负载不低于该值 (%) 时才更新基准频率
+IDLE_LOAD = 40.0        # 负载低于该值 (%) 的频率下降视为空闲降频
+DROP = 0.05             # 相对基准下降超过该比例视为降频
+MIN_DEFICIT = 50.0      # 且亏损至少 (MHz)
+TEMP_LIMIT = float(os.environ.get("HERTA_THROTTLE_TEMP", "83"))    # GPU 核心温度墙 (°C, NVIDIA 默认温度目标)
+TEMP_MARGIN = 3.0       # 距温度墙该值以内视为接近 (°C)
+POWER_RATIO = 0.95      # 功耗达到峰值的该比例视为顶到功耗墙
+ENTER = 1.0             # 原因持续该时长 (秒) 后开始事件
+EXIT = 2.0              # 恢复持续该时长 (秒) 后结束事件
+EVAL_PERIOD = 1.0       # 检测所需的采样周期 (秒, 按需采样时的需求周期)
+RECENT_EVENTS = 100     # 保留的最近事件数
+FIELDS = ["gpu_usage", "gpu_temp", "gpu_power", "gpu_clock"]
+
+REASONS = {"thermal": "温度墙", "power": "功耗墙", "idle": "空闲"}
+
+
+# --- 数据模型 ---
+class ThrottleEvent(BaseModel):
+    device: str                 # 如 /gpu-nvidia/0
+    hardware: str
+    reason: str                 # thermal / power / idle
+    start: float                # time.time
+    end: Optional[float]        # 进行中为 None
+    duration: float             # 秒 (进行中为截至目前)
+    baseline_mhz: float         # 事件开始时的基准频率
+    min_clock_mhz: float
+    max_deficit_mhz: float      # 最大频率亏损 (基准 - 当前)
+    mean_deficit_mhz: float
+    max_temp: Optional[float]
+    max_power: Optional[float]
+
+
+class ThrottleDevice(BaseModel):
+    device: str
+    hardware: str
+    state: str                  # learning (尚无基准) / ok / thermal / power / idle
+    clock_mhz: Optional[float]
+    baseline_mhz: Optional[float]
+    deficit_mhz: Optional[float]
+    temp: Optional[float]
+    power: Optional[float]
+    power_peak: Optional[float]
+    load: Optional[float]
+
+
+class ThrottleResponse(BaseModel):
+    devices: List[ThrottleDevice]
+    active: List[ThrottleEvent]
+    recent: List[ThrottleEvent]
+
+
+def _value(values, column: Optional[int]) -> Optional[float]:
+    if column is None:
+        return None
+    v = float(values[column])
+    return None if math.isnan(v) else v
+
+
+class _Episode:
+    """进行中的降频事件 (增量更新的聚合量)"""
+
+    __slots__ = ("reason", "start", "baseline", "min_clock", "max_deficit", "deficit_sum", "count",
+                 "max_temp", "max_power", "clean_since")
+
+    def __init__(self, reason: str, start: float, baseline: float):
+        self.reason = reason
+        self.start = start
+        self.baseline = baseline
+        self.min_clock = math.inf
+        self.max_deficit = 0.0
+        self.deficit_sum = 0.0
+        self.count = 0
+        self.max_temp: Optional[float] = None
+        self.max_power: Optional[float] = None
+        self.clean_since: Optional[float] = None
+
+    def add(self, clock: float, deficit: float, temp: Optional[float], power: Optional[float]):
+        self.min_clock = min(self.min_clock, clock)
+        self.max_deficit = max(self.max_deficit, deficit)
+        self.deficit_sum += deficit
+        self.count += 1
+        if temp is not None:
+            self.max_temp = temp if self.max_temp is None else max(self.max_temp, temp)
+        if power is not None:
+            self.max_power = power if self.max_power is None else max(self.max_power, power)
+
+
+class GpuTracker:
+    """单块 GPU 的在线检测状态"""
+
+    def __init__(self, device: str, hardware: str, columns: Dict[str, Optional[int]]):
+        self.device = device
+        self.hardware = hardware
+        self.columns = columns      # clock / temp / power / load -> device_readings 中的列
+        self.baseline: Optional[float] = None
+        self.power_peak: Optional[float] = None
+        self.reading: Dict[str, Optional[float]] = dict.fromkeys(columns)
+        self.reason: Optional[str] = None
+        self.pending: Optional[str] = None
+        self.pending_since = 0.0
+        self.episode: Optional[_Episode] = None
+        self.updated = 0.0          # 最近一个样本的 time.time
+        self._last: Optional[float] = None
+
+    def step(self, values, now: float, wall: float) -> List[ThrottleEvent]:
+        """处理一个样本; 返回本次开始 / 结束的事件"""
+        r = self.reading
+        for name, column in self.columns.items():
+            r[name] = _value(values, column)
+        clock, temp, power, load = r["clock"], r["temp"], r["power"], r["load"]
+        dt = now - self._last if self._last is not None else 0.0
+        self._last = now
+        self.updated = wall
+        if clock is None:
+            return []
+
+        if power is not None and (load is None or load >= HIGH_LOAD):
+            # 衰减峰值: 新高立即跟上, 否则以 POWER_TAU 缓慢回落 (只看高负载样本)
+            if self.power_peak is None or power >= self.power_peak:
+                self.power_peak = power
+            else:
+                self.power_peak += (power - self.power_peak) * (1 - math.exp(-dt / POWER_TAU))
+
+        reason = None
+        if self.baseline is not None:
+            deficit = self.baseline - clock
+            if deficit >= max(DROP * self.baseline, MIN_DEFICIT):
+                if load is not None and load < IDLE_LOAD:
+                    reason = "idle"
+                elif temp is not None and temp >= TEMP_LIMIT - TEMP_MARGIN:
+                    reason = "thermal"
+                elif power is not None and self.power_peak and power >= POWER_RATIO * self.power_peak:
+                    reason = "power"
+        self.reason = reason
+
+        if reason is None and load is not None and load >= HIGH_LOAD:
+            # 基准只在高负载且未降频时更新 (原因不明的下降也跟随, 例如驱动调整了加速频率)
+            if self.baseline is None:
+                self.baseline = clock
+            else:
+                self.baseline += (clock - self.baseline) * (1 - math.exp(-dt / CLOCK_TAU))
+        return self._advance(reason, clock, temp, power, now, wall)
+
+    def _advance(self, reason, clock, temp, power, now: float, wall: float) -> List[ThrottleEvent]:
+        events = []
+        episode = self.episode
+        if episode is not None:
+            if reason == episode.reason:
+                episode.add(clock, self.baseline - clock, temp, power)
+                episode.clean_since = None
+                return events
+            # 恢复 (或原因改变) 持续 EXIT 秒后结束; 原因改变时立即结束
+            if reason is None and episode.clean_since is None:
+                episode.clean_since = wall
+            if reason is None and wall - episode.clean_since < EXIT:
+                return events
+            events.append(self._close(episode.clean_since if reason is None else wall))
+
+        if reason is None:
+            self.pending = None
+            return events
+        if reason != self.pending:
+            self.pending, self.pending_since = reason, wall
+        if wall - self.pending_since >= ENTER:
+            self.episode = _Episode(reason, self.pending_since, self.baseline)
+            self.episode.add(clock, self.baseline - clock, temp, power)
+            self.pending = None
+            events.append(self.event(self.episode, None, wall))
+        return events
+
+    def _close(self, end: float) -> ThrottleEvent:
+        event = self.event(self.episode, end, end)
+        self.episode = None
+        return event
+
+    def event(self, episode: _Episode, end: Optional[float], now: float) -> ThrottleEvent:
+        return ThrottleEvent(
+            device=self.device, hardware=self.hardware, reason=episode.reason,
+            start=episode.start, end=end, duration=round((end or now) - episode.start, 2),
+            baseline_mhz=round(episode.baseline, 1), min_clock_mhz=round(episode.min_clock, 1),
+            max_deficit_mhz=round(episode.max_deficit, 1),
+            mean_deficit_mhz=round(episode.deficit_sum / max(episode.count, 1), 1),
+            max_temp=episode.max_temp, max_power=episode.max_power,
+        )
+
+    def status(self) -> ThrottleDevice:
+        r = {name: None if v is None else round(v, 1) for name, v in self.reading.items()}
+        baseline = None if self.baseline is None else round(self.baseline, 1)
+        deficit = round(baseline - r["clock"], 1) if baseline is not None and r["clock"] is not None else None
+        state = "learning" if baseline is None else (self.episode.reason if self.episode else "ok")
+        return ThrottleDevice(
+            device=self.device, hardware=self.hardware, state=state,
+            clock_mhz=r["clock"], baseline_mhz=baseline, deficit_mhz=deficit, temp=r["temp"], power=r["power"],
+            power_peak=None if self.power_peak is None else round(self.power_peak, 1), load=r["load"],
+        )
+
+
+def _gpu_columns(catalog) -> Dict[str, Dict]:
+    """按设备 (identifier 前缀) 找出每块 GPU 的 频率 / 温度 / 功耗 / 负载 列 (仅在编目变化时调用)"""
+    gpus: Dict[str, Dict] = {}
+    for i, info in enumerate(catalog):
+        if "Gpu" not in info.hardware_type:
+            continue
+        device = info.identifier.rsplit("/", 2)[0]
+        gpu = gpus.setdefault(device, {"hardware": info.hardware,
+                                       "columns": dict.fromkeys(("clock", "temp", "power", "load"))})
+        columns = gpu["columns"]
+        kind = (info.sensor_type, info.sensor)
+        if kind == ("Clock", "GPU Core"):
+            columns["clock"] = i
+        elif kind == ("Load", "GPU Core"):
+            columns["load"] = i
+        elif info.sensor_type == "Temperature" and (info.sensor == "GPU Core" or columns["temp"] is None):
+            columns["temp"] = i     # 优先核心温度 (热点温度通常高 10°C 以上)
+        elif info.sensor_type == "Power" and columns["power"] is None:
+            columns["power"] = i
+    return gpus
+
+
+class ThrottleDetector:
+    """采样线程回调: 每个快照对每块 GPU 求值一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gpus: List[GpuTracker] = []
+        self._version: Optional[int] = None
+        self._recent: deque = deque(maxlen=RECENT_EVENTS)
+        self.engaged = False        # 需要 1 Hz 采样 (采样线程写, 只读布尔值)
+
+    def offer(self, snap: Snapshot, devices: Optional[SensorReadings]):
+        if devices is None:
+            return
+        # 求值与读取 (active / status) 互斥: 事件聚合量与 episode 不会被读到一半
+        with self._lock:
+            if devices.version != self._version:
+                # 传感器索引重建: 保留已知 GPU 的基准, 只重新定位列
+                known = {g.device: g for g in self._gpus}
+                gpus = []
+                for device, gpu in _gpu_columns(devices.catalog).items():
+                    tracker = known.get(device) or GpuTracker(device, gpu["hardware"], gpu["columns"])
+                    tracker.columns = gpu["columns"]
+                    gpus.append(tracker)
+                self._gpus = gpus
+                self._version = devices.version
+            events = []
+            for gpu in self._gpus:
+                events += gpu.step(devices.values, snap.monotonic, snap.timestamp)
+            # 空闲事件可能一直持续 (GPU 闲置在基准频率以下), 不计入
+            self.engaged = any((g.episode is not None and g.episode.reason != "idle")
+                               or (g.reading["load"] or 0.0) >= IDLE_LOAD for g in self._gpus)
+            for event in events:
+                if event.reason != "idle":
+                    self._record(event)
+        for event in events:
+            if event.reason != "idle":
+                log = logger.warning if event.end is None else logger.info
+                state = "开始" if event.end is None else f"结束 ({event.duration:.1f}s)"
+                log(f"降频{state} [{REASONS[event.reason]}] {event.hardware}: "
+                    f"-{event.max_deficit_mhz:.0f} MHz (基准 {event.baseline_mhz:.0f} MHz)")
+
+    def _record(self, event: ThrottleEvent):
+        # 调用方持有 self._lock
+        if event.end is None:
+            self._recent.append(event)
+            return
+        # 结束事件替换其开始记录
+        for i in range(len(self._recent) - 1, -1, -1):
+            e = self._recent[i]
+            if e.device == event.device and e.start == event.start and e.end is None:
+                self._recent[i] = event
+                return
+        self._recent.append(event)
+
+    def _active(self) -> List[ThrottleEvent]:
+        # 调用方持有 self._lock; 进行中事件的时长截至最近一个样本
+        return [g.event(g.episode, None, g.updated) for g in self._gpus if g.episode is not None]
+
+    def _recent_events(self, active: List[ThrottleEvent]) -> List[ThrottleEvent]:
+        # 进行中的事件以当前聚合量返回
+        current = {(e.device, e.start): e for e in active}
+        return [current.get((e.device, e.start), e) if e.end is None else e for e in reversed(self._recent)]
+
+    def active(self) -> List[ThrottleEvent]:
+        with self._lock:
+            return self._active()
+
+    def recent(self) -> List[ThrottleEvent]:
+        with self._lock:
+            return self._recent_events(self._active())
+
+    def status(self) -> ThrottleResponse:
+        with self._lock:
+            active = self._active()
+            return ThrottleResponse(devices=[g.status() for g in self._gpus],
+                                    active=active, recent=self._recent_events(active))
+
+
+# --- 仿真 ---
+def simulate(period: float = 0.25):
+    """
+    虚拟时间回放的场景 (不访问硬件): 空闲 -> 满载 -> 过热 -> 功耗墙 -> 空闲,
+    打印检测到的事件与每个样本的检测耗时。
+    """
+    from types import SimpleNamespace
+    from backend.hardware import SensorInfo
+
+    ident = "/gpu-nvidia/0"
+    catalog = (
+        SensorInfo(f"{ident}/load/0", "GpuNvidia", "Simulated GPU", "Load", "GPU Core"),
+        SensorInfo(f"{ident}/temperature/0", "GpuNvidia", "Simulated GPU", "Temperature", "GPU Core"),
+        SensorInfo(f"{ident}/power/0", "GpuNvidia", "Simulated GPU", "Power", "GPU Package"),
+        SensorInfo(f"{ident}/clock/0", "GpuNvidia", "Simulated GPU", "Clock", "GPU Core"),
+    )
+    # (时长 秒, 负载 %, 温度 °C, 功耗 W, 频率 MHz)
+    phases = [
+        ("空闲", 30, 5, 40, 30, 210),
+        ("满载", 120, 99, 72, 240, 2750),
+        ("过热", 40, 99, 82, 235, 2520),
+        ("恢复", 30, 99, 74, 240, 2745),
+        ("功耗墙", 40, 99, 75, 285, 2580),
+        ("恢复", 30, 99, 72, 240, 2750),
+        ("空闲", 3600, 3, 45, 20, 210),   # 长时间空闲: 不应被判为功耗墙
+    ]
+    detector = ThrottleDetector()
+    t, seq = 0.0, 0
+    wall0 = time.time()
+    costs = []
+    for name, duration, load, temp, power, clock in phases:
+        for _ in range(int(duration / period)):
+            seq += 1
+            t += period
+            jitter = math.sin(seq * 0.7)
+            values = [load, temp + jitter, power + 2 * jitter, clock + 10 * jitter]
+            snap = SimpleNamespace(seq=seq, monotonic=t, timestamp=wall0 + t)
+            readings = SensorReadings(catalog, 1, wall0 + t, values)
+            t0 = time.perf_counter()
+            detector.offer(snap, readings)
+            costs.append(time.perf_counter() - t0)
+        state = detector.status().devices[0]
+        print(f"{t:>7.1f}s  {name:<6}基准 {state.baseline_mhz or 0:>6.0f} MHz  状态 {state.state}")
+
+    print(f"\n{'原因':<8}{'开始':>8}{'结束':>8}{'时长':>8}{'最大亏损':>10}{'平均亏损':>10}")
+    for e in reversed(detector.recent()):
+        end = f"{e.end - wall0:.1f}" if e.end else "-"
+        print(f"{e.reason:<8}{e.start - wall0:>8.1f}{end:>8}{e.duration:>8.1f}"
+              f"{e.max_deficit_mhz:>10.0f}{e.mean_deficit_mhz:>10.0f}")
+    costs.sort()
+    print(f"\n每个样本检测耗时: p50 {costs[len(costs) // 2] * 1e6:.1f} µs, "
+          f"p99 {costs[int(len(costs) * 0.99)] * 1e6:.1f} µs ({len(costs)} 个样本)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="黑塔之眼降频检测")
+    parser.add_argument("--simulate", action="store_true", help="虚拟时间场景仿真 (不访问硬件)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
+    if not args.simulate:
+        parser.error("降频检测随后端运行 (GET /throttle); 独立运行只支持 --simulate")
+    simulate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+黑塔之眼 - 热路径耗时统计
+==========================================
+- 定长对数直方图 (每倍频 8 个桶, 1 µs ~ 100 s), 记录一次只做一次 log2 与几次加法, 可常开
+- 按名称分组: 每个硬件的 Update(), 传感器读取, 响应模型构建 / 序列化, HTTP 请求总耗时
+- 关闭时不安装任何计时包装 (调用方持有 None), 热路径零开销
+- 可选: 后台线程定期把 p99 最高的几项写入日志
+"""
+
+import math
+import threading
+import time
+import logging
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("HertaBackend")
+
+SUB_BUCKETS = 8                         # 每倍频的桶数 (相对误差约 9%)
+N_BUCKETS = 27 * SUB_BUCKETS + 2        # 2^27 µs ≈ 134 s, 超出的计入最后一个桶
+LOG_TOP = 8                             # 定期日志输出的条目数
+
+
+class Histogram:
+    """
+    定长对数直方图 (单位: 秒)。
+    不加锁: 多个线程同时记录同一直方图时, 极少量计数可能丢失, 对分位数无实质影响。
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        us = seconds * 1e6
+        # 桶 i (i >= 1) 覆盖 [2^((i-1)/SUB), 2^(i/SUB)) µs, 桶 0 为 < 1 µs
+        i = min(int(math.log2(us) * SUB_BUCKETS) + 1, N_BUCKETS - 1) if us >= 1.0 else 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """近似分位数 (秒): 所在桶的几何中点, 不超过最大值"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                if i == 0:
+                    return min(0.5e-6, self.max)
+                return min(2 ** ((i - 0.5) / SUB_BUCKETS) * 1e-6, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        ms = 1000.0
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * ms, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * ms, 4),
+            "p95_ms": round(self.percentile(0.95) * ms, 4),
+            "p99_ms": round(self.percentile(0.99) * ms, 4),
+            "max_ms": round(self.max * ms, 4),
+        }
+
+
+class Timings:
+    """按名称管理直方图; 启用时才创建, 调用方以 Optional[Timings] 表示开关"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._log_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.since = time.time()
+
+    def histogram(self, name: str) -> Histogram:
+        hist = self._histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(name, Histogram())
+        return hist
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """装饰器: 记录函数每次调用的耗时"""
+        hist = self.histogram(name)
+
+        def decorator(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    hist.record(time.perf_counter() - t0)
+            return wrapper
+        return decorator
+
+    def report(self) -> dict:
+        histograms = dict(self._histograms)
+        return {
+            "since": self.since,
+            "timings": {name: histograms[name].summary() for name in sorted(histograms)},
+        }
+
+    def reset(self):
+        """清空所有直方图 (已持有的直方图对象原地清零)"""
+        for hist in list(self._histograms.values()):
+            hist.__init__()
+        self.since = time.time()
+
+    # --- 定期日志 ---
+    def start_logging(self, interval: float):
+        if self._log_thread and self._log_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._log_thread = threading.Thread(target=self._log_loop, args=(interval,),
+                                            name="HertaTimings", daemon=True)
+        self._log_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _log_loop(self, interval: float):
+        while not self._stop_event.wait(interval):
+            entries: List = sorted(((h.percentile(0.99), name, h) for name, h in list(self._histograms.items())
+                                    if h.count), reverse=True)[:LOG_TOP]
+            if entries:
+                lines = ", ".join(f"{name} p99={p99 * 1000:.2f}ms (n={h.count})" for p99, name, h in entries)
+                logger.info(f"耗时统计: {lines}")
+
+
+class TimingMiddleware:
+    """
+    ASGI 中间件: 按路由模板记录 HTTP 请求总耗时 (含序列化与发送)。
+    SSE 等流式响应不计入 (其耗时即连接时长)。
+    """
+
+    def __init__(self, app, timings: Timings):
+        self.app = app
+        self.timings = timings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                streaming = any(k == b"content-type" and v.startswith(b"text/event-stream")
+                                for k, v in message.get("headers", ()))
+            elif message["type"] == "http.response.body" and not message.get("more_body") and not streaming:
+                # 路由匹配后 FastAPI 把路由写入 scope, 用模板而非实际路径避免条目无限增长
+                route = scope.get("route")
+                path = route.path if route is not None else "(unmatched)"
+                self.timings.histogram(f"http {scope['method']} {path}").record(time.perf_counter() - t0)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
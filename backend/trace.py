@@ -0,0 +1,245 @@
+"""
+黑塔之眼 - 传感器轨迹录制与回放
+==========================================
+- 录制: 每次新的完整传感器树读数追加一行, 只追加不改写
+- 文件格式 (小端):
+    b"HERTATRC" | u32 格式版本 | u32 头部长度 | JSON 头部 (固定 schema, 8 字节对齐)
+    之后为定长 float32 行: [相对起始时刻的秒数, 传感器 0, 传感器 1, ...], 无数据为 NaN
+  可直接 np.memmap 为 (行数, 1 + 传感器数) 的数组, 每列即一个传感器的时间序列
+- 回放: 把轨迹还原为 LibreHardwareMonitor 形状的对象树 (基于 backend.synthetic),
+  HardwareMonitor / 采样线程 / 各接口照常工作, 不需要 Pythonnet 与 DLL
+"""
+
+import json
+import os
+import platform
+import struct
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from backend.hardware import SensorInfo, SensorReadings
+from backend.sampler import Snapshot
+from backend.synthetic import CallCounter, FakeComputer, FakeHardware, FakeSensor
+
+logger = logging.getLogger("HertaBackend")
+
+MAGIC = b"HERTATRC"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sII")    # magic, 格式版本, 头部长度
+FLUSH_INTERVAL = 5.0                # 落盘间隔 (秒), 录制期间其它进程也能读取已写入的行
+
+
+def _encode_header(header: dict) -> bytes:
+    body = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    # 补齐到 8 字节边界, 数据区按 float32 对齐
+    body += b" " * (-(_PREFIX.size + len(body)) % 8)
+    return _PREFIX.pack(MAGIC, FORMAT_VERSION, len(body)) + body
+
+
+def read_header(path: str) -> Tuple[dict, int]:
+    """返回 (头部, 数据区偏移)"""
+    with open(path, "rb") as f:
+        magic, version, length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"不是黑塔轨迹文件: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的轨迹格式版本: {version}")
+        header = json.loads(f.read(length).decode("utf-8"))
+    return header, _PREFIX.size + length
+
+
+# --- 录制 ---
+class TraceRecorder:
+    """
+    采样线程回调: 每个新的 SensorReadings 追加一行。
+    schema 取自首次读数的编目; 之后编目变化时按 identifier 映射, 新增传感器不录制, 消失的传感器记为 NaN。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._file = None
+        self._start = 0.0
+        self._columns: Dict[str, int] = {}
+        self._mapping: Optional[Tuple[int, np.ndarray, np.ndarray]] = None   # (编目版本, 源下标, 目标列)
+        self._last: Optional[SensorReadings] = None
+        self._flushed = 0.0
+        self._failed = False
+
+    def _open(self, readings: SensorReadings):
+        identifiers = [info.identifier for info in readings.catalog]
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            # 已有轨迹: schema 一致则续写
+            header, offset = read_header(self.path)
+            if [s[0] for s in header["sensors"]] != identifiers:
+                raise ValueError(f"已有轨迹的传感器编目不同: {self.path}")
+            self._start = header["start"]
+            self._columns = {ident: i for i, ident in enumerate(identifiers)}
+            row_bytes = 4 * (1 + len(identifiers))
+            # 截掉上次异常退出时残留的半行
+            whole = offset + (os.path.getsize(self.path) - offset) // row_bytes * row_bytes
+            os.truncate(self.path, whole)
+            self.rows = (whole - offset) // row_bytes
+            self._file = open(self.path, "ab")
+        else:
+            self._start = readings.timestamp
+            self._columns = {ident: i for i, ident in enumerate(identifiers)}
+            header = {
+                "format": FORMAT_VERSION,
+                "start": self._start,
+                "host": platform.node(),
+                "sensors": [list(info) for info in readings.catalog],
+            }
+            self._file = open(self.path, "wb")
+            self._file.write(_encode_header(header))
+        logger.info(f"轨迹录制: {self.path} ({len(self._columns)} 个传感器)")
+
+    def _map(self, readings: SensorReadings) -> Tuple[np.ndarray, np.ndarray]:
+        if self._mapping is None or self._mapping[0] != readings.version:
+            src, dst, dropped = [], [], 0
+            for i, info in enumerate(readings.catalog):
+                col = self._columns.get(info.identifier)
+                if col is None:
+                    dropped += 1
+                else:
+                    src.append(i)
+                    dst.append(col)
+            if dropped:
+                logger.warning(f"轨迹录制: {dropped} 个新增传感器不在 schema 中, 不会录制")
+            self._mapping = (readings.version, np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64))
+        return self._mapping[1], self._mapping[2]
+
+    def offer(self, snap: Snapshot):
+        readings = snap.sensors
+        # 完整树按 tree_period 读取, 期间快照复用同一读数, 只录制一次
+        if readings is None or readings is self._last or self._failed:
+            return
+        self._last = readings
+        try:
+            if self._file is None:
+                self._open(readings)
+            src, dst = self._map(readings)
+            row = np.full(1 + len(self._columns), np.nan, dtype=np.float32)
+            row[0] = readings.timestamp - self._start
+            row[1 + dst] = readings.values[src]
+            self._file.write(row.tobytes())
+            self.rows += 1
+            now = time.monotonic()
+            if now - self._flushed >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._flushed = now
+        except (OSError, ValueError) as e:
+            logger.error(f"轨迹录制已停止: {e}")
+            self._failed = True
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"轨迹录制结束: {self.rows} 行")
+
+
+# --- 读取 ---
+class Trace:
+    """只读轨迹: 数据区内存映射, 不整体载入内存"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header, offset = read_header(path)
+        self.catalog: Tuple[SensorInfo, ...] = tuple(SensorInfo(*s) for s in self.header["sensors"])
+        self.start: float = self.header["start"]
+        width = 1 + len(self.catalog)
+        n_rows = (os.path.getsize(path) - offset) // (4 * width)
+        if n_rows:
+            self.rows = np.memmap(path, dtype=np.float32, mode="r", offset=offset, shape=(n_rows, width))
+        else:
+            self.rows = np.empty((0, width), dtype=np.float32)
+        self.times = self.rows[:, 0]        # 相对 start 的秒数
+        self.values = self.rows[:, 1:]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1] - self.times[0]) if len(self) else 0.0
+
+    def column(self, identifier: str) -> np.ndarray:
+        """单个传感器的时间序列 (内存映射视图)"""
+        for i, info in enumerate(self.catalog):
+            if info.identifier == identifier:
+                return self.values[:, i]
+        raise KeyError(identifier)
+
+
+# --- 回放 ---
+class TracePlayer:
+    """把真实时间映射到轨迹行号; speed > 1 为加速回放, loop 为播完后从头开始"""
+
+    def __init__(self, trace: Trace, speed: float = 1.0, loop: bool = True):
+        if not len(trace):
+            raise ValueError(f"轨迹为空: {trace.path}")
+        self.trace = trace
+        self.speed = speed
+        self.loop = loop
+        self._t0 = time.monotonic()
+
+    def position(self) -> int:
+        times = self.trace.times
+        elapsed = (time.monotonic() - self._t0) * self.speed
+        # 循环周期多算一个平均采样间隔, 避免首尾两行重叠
+        period = self.trace.duration + (self.trace.duration / (len(times) - 1) if len(times) > 1 else 1.0)
+        if self.loop:
+            elapsed %= period
+        return max(0, int(np.searchsorted(times, times[0] + elapsed, side="right")) - 1)
+
+
+class ReplaySensor(FakeSensor):
+    def __init__(self, counter: CallCounter, hardware: "ReplayHardware", info: SensorInfo, column: int):
+        super().__init__(counter, "", info.sensor_type, info.sensor, 0, 0.0)
+        self._identifier = info.identifier
+        self._hardware = hardware
+        self._column = column
+
+    @property
+    def Value(self):
+        self._counter.calls += 1
+        value = self._hardware._row[self._column]
+        return None if np.isnan(value) else float(value)
+
+
+class ReplayHardware(FakeHardware):
+    """读数只在 Update() 时前进到当前回放位置, 与真实硬件一致"""
+
+    def __init__(self, counter: CallCounter, player: TracePlayer, h_type: str, name: str, identifier: str):
+        super().__init__(counter, h_type, name, identifier)
+        self._player = player
+        self._row = player.trace.values[0]
+
+    def Update(self):
+        self._counter.calls += 1
+        self._row = self._player.trace.values[self._player.position()]
+
+
+def open_replay(path: str, speed: float = 1.0, loop: bool = True) -> FakeComputer:
+    """
+    从轨迹构建可注入 HardwareMonitor 的对象树。
+    SubHardware 展开为顶层硬件 (编目中的硬件类型 / 名称保持不变, 字段映射结果相同)。
+    """
+    trace = Trace(path)
+    player = TracePlayer(trace, speed, loop)
+    computer = FakeComputer()
+    hardware: Dict[Tuple[str, str], ReplayHardware] = {}
+    for col, info in enumerate(trace.catalog):
+        key = (info.hardware_type, info.hardware)
+        if key not in hardware:
+            ident = info.identifier.rsplit("/", 2)[0]
+            hardware[key] = ReplayHardware(computer.counter, player, info.hardware_type, info.hardware, ident)
+            computer.add_hardware(hardware[key], notify=False)
+        hw = hardware[key]
+        hw.add_sensor(ReplaySensor(computer.counter, hw, info, col), notify=False)
+    logger.info(f"轨迹回放: {path} ({len(trace)} 行, {trace.duration:.0f}s, {speed}x)")
+    return computer
@@ -0,0 +1,233 @@
+"""
+黑塔之眼 - 基准测试: 界面服务开销 (内置仪表盘 vs Streamlit)
+==========================================
+N 个客户端打开界面 DURATION 秒, 测量服务端进程 (含子进程) 的 CPU 占用与常驻内存:
+- builtin: 后端 (合成传感器树) + GET /dashboard, 每个客户端与页面行为一致:
+  回填 /history, 订阅 /stats/stream?max_rate=1, 每 5 秒拉取 /roast; 渲染在浏览器端, 不计入
+- streamlit: 后端 + streamlit run frontend/app.py, 每个客户端为一个 Streamlit 会话
+  (WebSocket /_stcore/stream 发送 rerun_script, 持续接收增量); 需要安装 streamlit,
+  且后端固定在 8000 端口 (frontend/app.py 的 API_URL)
+
+两种模式都包含后端进程, 差值即为界面本身的开销。
+
+运行:
+    python -m benchmarks.bench_dashboard
+    python -m benchmarks.bench_dashboard --mode streamlit --clients 10 --duration 60
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.suite import _wait_ready
+
+CLIENTS = 10
+DURATION = 30.0
+ROAST_PERIOD = 5.0
+STREAMLIT_PORT = 8501
+
+
+# --- 进程资源 (psutil 可用时跨平台, 否则读 /proc) ---
+def _tree_pids(pid: int) -> List[int]:
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        return [pid] + [c.pid for c in proc.children(recursive=True)]
+    except ImportError:
+        pids = [pid]
+        for p in pids:
+            try:
+                with open(f"/proc/{p}/task/{p}/children") as f:
+                    pids.extend(int(c) for c in f.read().split())
+            except OSError:
+                pass
+        return pids
+
+
+def _cpu_seconds(pid: int) -> float:
+    try:
+        import psutil
+        t = psutil.Process(pid).cpu_times()
+        return t.user + t.system
+    except ImportError:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _rss_mb(pid: int) -> float:
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2**20
+    except ImportError:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def usage(pids: List[int]) -> Dict[str, float]:
+    """进程树的累计 CPU 时间与当前 RSS 之和"""
+    cpu = rss = 0.0
+    for pid in pids:
+        for p in _tree_pids(pid):
+            try:
+                cpu += _cpu_seconds(p)
+                rss += _rss_mb(p)
+            except (OSError, ProcessLookupError):
+                pass    # 测量期间退出的子进程
+    return {"cpu": cpu, "rss": rss}
+
+
+# --- 客户端 ---
+async def builtin_client(base: str, deadline: float, frames: List[int], i: int):
+    """模拟 dashboard.html: 页面 + 历史回填 + SSE 订阅 + 定期拉取吐槽"""
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base, timeout=None) as client:
+        await client.get("/dashboard")
+        now = time.time()
+        await client.get("/history", params={"metrics": "cpu,gpu_usage,ram", "from": now - 60, "to": now})
+
+        async def roast():
+            while time.monotonic() < deadline:
+                await client.get("/roast")
+                await asyncio.sleep(ROAST_PERIOD)
+
+        task = asyncio.create_task(roast())
+        try:
+            async with client.stream("GET", "/stats/stream", params={"max_rate": 1}) as resp:
+                async for line in resp.aiter_lines():
+                    if line.startswith("data:"):
+                        frames[i] += 1
+                    if time.monotonic() >= deadline:
+                        break
+        finally:
+            task.cancel()
+
+
+async def streamlit_client(url: str, deadline: float, frames: List[int], i: int):
+    """一个 Streamlit 会话: 请求运行脚本, 之后持续接收 ForwardMsg"""
+    import websockets
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+
+    async with websockets.connect(url, max_size=None) as ws:
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        await ws.send(msg.SerializeToString())
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                await asyncio.wait_for(ws.recv(), timeout)
+            except asyncio.TimeoutError:
+                break
+            frames[i] += 1
+
+
+async def run_clients(client, target: str, n: int, duration: float) -> List[int]:
+    frames = [0] * n
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(client(target, deadline, frames, i) for i in range(n)))
+    return frames
+
+
+# --- 模式 ---
+def _start_backend(port: int) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.suite", "--serve", str(port)])
+    _wait_ready(f"http://127.0.0.1:{port}", proc)
+    return proc
+
+
+def _stop(procs: List[subprocess.Popen]):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _wait_streamlit(proc: subprocess.Popen, timeout: float = 60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Streamlit 进程启动失败")
+        try:
+            if httpx.get(f"http://127.0.0.1:{STREAMLIT_PORT}/_stcore/health", timeout=0.5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Streamlit 启动超时")
+
+
+def measure(mode: str, clients: int, duration: float, port: int) -> dict:
+    procs: List[subprocess.Popen] = []
+    try:
+        if mode == "builtin":
+            procs.append(_start_backend(port))
+            client, target = builtin_client, f"http://127.0.0.1:{port}"
+        else:
+            procs.append(_start_backend(8000))
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "streamlit", "run", "frontend/app.py",
+                 "--server.headless", "true", "--server.port", str(STREAMLIT_PORT)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            _wait_streamlit(procs[-1])
+            client, target = streamlit_client, f"ws://127.0.0.1:{STREAMLIT_PORT}/_stcore/stream"
+
+        pids = [p.pid for p in procs]
+        idle = usage(pids)
+        t0 = time.monotonic()
+        frames = asyncio.run(run_clients(client, target, clients, duration))
+        elapsed = time.monotonic() - t0
+        loaded = usage(pids)
+        return {
+            "mode": mode,
+            "clients": clients,
+            "cpu_pct": round((loaded["cpu"] - idle["cpu"]) / elapsed * 100, 1),
+            "rss_idle_mb": round(idle["rss"], 1),
+            "rss_mb": round(loaded["rss"], 1),
+            "frames_per_client": round(sum(frames) / clients / elapsed, 2),
+        }
+    finally:
+        _stop(procs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="内置仪表盘与 Streamlit 的服务端开销对比")
+    parser.add_argument("--mode", choices=["builtin", "streamlit", "both"], default="both")
+    parser.add_argument("--clients", type=int, default=CLIENTS)
+    parser.add_argument("--duration", type=float, default=DURATION, help="测量时长 (秒)")
+    parser.add_argument("--port", type=int, default=8766, help="builtin 模式的后端端口")
+    args = parser.parse_args()
+
+    modes = ["builtin", "streamlit"] if args.mode == "both" else [args.mode]
+    results = []
+    for mode in modes:
+        if mode == "streamlit":
+            if importlib.util.find_spec("streamlit") is None:
+                print("⚠️ 未安装 streamlit, 跳过 streamlit 模式")
+                continue
+        results.append(measure(mode, args.clients, args.duration, args.port))
+
+    print(f"\n{'模式':<12}{'客户端':>8}{'CPU %':>10}{'RSS 空闲 MB':>14}{'RSS MB':>10}{'帧/s/客户端':>14}")
+    for r in results:
+        print(f"{r['mode']:<12}{r['clients']:>8}{r['cpu_pct']:>10}{r['rss_idle_mb']:>14}"
+              f"{r['rss_mb']:>10}{r['frames_per_client']:>14}")
+
+
+if __name__ == "__main__":
+    main()
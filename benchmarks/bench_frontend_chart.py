@@ -0,0 +1,103 @@
+"""
+黑塔之眼 - 基准测试: 前端历史曲线
+==========================================
+对比每个渲染周期 (每秒一次) 在服务端准备图表数据的开销:
+- 旧版: pd.concat + tail + melt + 重建 Altair 图表 (to_dict) + 序列化整张表
+- 新版: 环形缓冲区追加 + 单行 add_rows; 每满一个窗口完整重绘一次 (摊销)
+
+Streamlit 会把 DataFrame 转成 Arrow 发给浏览器, 这里用 pyarrow 近似该开销。
+运行: python -m benchmarks.bench_frontend_chart
+"""
+
+import json
+import random
+import time
+import tracemalloc
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+from frontend.history_chart import RingBuffer, build_chart_spec
+
+COLUMNS = ['CPU', 'GPU', 'RAM']
+COLORS = ["#00f3ff", "#ff2a6d", "#ffd700"]
+TICKS = 100
+
+# Streamlit 使用自己的数据转换器, 不受 Altair 默认 5000 行上限约束
+alt.data_transformers.disable_max_rows()
+
+
+def fake_row():
+    return [random.uniform(0, 100) for _ in COLUMNS]
+
+
+def legacy_tick(state, capacity):
+    row = fake_row()
+    new_row = pd.DataFrame({'Time': [time.strftime("%H:%M:%S")], 'CPU': [row[0]], 'GPU': [row[1]], 'RAM': [row[2]]})
+    state["history"] = pd.concat([state["history"], new_row]).tail(capacity)
+    source = state["history"].melt('Time', var_name='Metric', value_name='Usage')
+    chart = alt.Chart(source).mark_line(strokeWidth=2).encode(
+        x=alt.X('Time', axis=None),
+        y=alt.Y('Usage', scale=alt.Scale(domain=[0, 100]), axis=None),
+        color=alt.Color('Metric', legend=alt.Legend(orient='top', title=None),
+                        scale=alt.Scale(domain=COLUMNS, range=COLORS)),
+        tooltip=['Time', 'Metric', 'Usage']
+    ).properties(height=120, background='transparent').configure_view(stroke=None)
+    spec = chart.to_dict()
+    pa.Table.from_pandas(source)
+    json.dumps({k: v for k, v in spec.items() if k != "datasets"})
+
+
+def ring_tick(state, capacity):
+    ring = state["ring"]
+    row = fake_row()
+    t_ms = int(time.time() * 1000)
+    ring.append(t_ms, row)
+    if state["appended"] >= capacity:
+        pa.Table.from_pandas(ring.to_frame())
+        json.dumps(state["spec"])
+        state["appended"] = 0
+    else:
+        pa.Table.from_pandas(RingBuffer.row_frame(t_ms, COLUMNS, row))
+        state["appended"] += 1
+
+
+def run(tick, state, capacity):
+    t0 = time.perf_counter()
+    for _ in range(TICKS):
+        tick(state, capacity)
+    elapsed = time.perf_counter() - t0
+
+    # 内存单独测量 (tracemalloc 会显著拖慢计时)
+    tracemalloc.start()
+    for _ in range(10):
+        tick(state, capacity)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / TICKS * 1000, peak / 1024
+
+
+def main():
+    print(f"{'窗口':>8}  {'方式':<8}{'每周期(ms)':>12}{'峰值分配(KB)':>16}{'历史占用(KB)':>16}")
+    for capacity in (60, 600, 3600):
+        # 预先填满窗口, 测量稳态开销
+        rows = [fake_row() for _ in range(capacity)]
+        history = pd.DataFrame(rows, columns=COLUMNS)
+        history.insert(0, 'Time', [time.strftime("%H:%M:%S")] * capacity)
+        state = {"history": history}
+        ms, peak = run(legacy_tick, state, capacity)
+        held = state["history"].memory_usage(deep=True).sum() / 1024
+        print(f"{capacity:>8}  {'旧版':<8}{ms:>12.2f}{peak:>16.0f}{held:>16.1f}")
+
+        ring = RingBuffer(COLUMNS, capacity)
+        for row in rows:
+            ring.append(int(time.time() * 1000), row)
+        state = {"ring": ring, "appended": capacity, "spec": build_chart_spec(COLUMNS, COLORS)}
+        ms, peak = run(ring_tick, state, capacity)
+        held = (ring._times.nbytes + ring._values.nbytes) / 1024
+        print(f"{capacity:>8}  {'环形缓冲':<8}{ms:>12.2f}{peak:>16.0f}{held:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
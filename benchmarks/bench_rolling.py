@@ -0,0 +1,74 @@
+"""
+黑塔之眼 - 基准测试: 按设备滚动窗口统计
+==========================================
+用合成传感器树 (backend.synthetic) 填满 10 分钟 × 4 Hz 的窗口, 测量:
+- offer: 采样线程每个快照的写入开销
+- compute: 所有传感器 (合并字段 + 逐设备) 的 min / max / mean / p95 / std (纯 NumPy 部分)
+- query: compute + 组装响应字典 (/stats/rolling 的处理函数开销, 不含 JSON 序列化; 跳过同一样本的结果缓存)
+
+运行: python -m benchmarks.bench_rolling
+"""
+
+import time
+
+from backend.hardware import HardwareMonitor
+from backend.history import METRICS
+from backend.rolling import RollingStats
+from backend.sampler import Snapshot
+from backend.synthetic import build_computer
+from benchmarks.bench_sensor_index import EVERY_TICK
+from benchmarks.suite import _percentiles
+
+MINUTES = 10
+PERIOD = 0.25
+TREE_SIZES = [(1, 8), (2, 16), (4, 32)]     # (GPU 数, CPU 核数)
+WINDOWS = [60, 600]
+ROUNDS = 200
+
+
+def fill(n_gpus: int, n_cores: int):
+    monitor = HardwareMonitor(build_computer(n_gpus=n_gpus, n_cores=n_cores), cadences=EVERY_TICK)
+    rolling = RollingStats(MINUTES, PERIOD)
+    offers = []
+    # 时间戳回填为过去 10 分钟, 每 PERIOD 一个样本
+    start = time.monotonic() - MINUTES * 60
+    for i in range(rolling.capacity):
+        stats = monitor.get_status()
+        snap = Snapshot(i + 1, time.time(), start + i * PERIOD, stats)
+        devices = monitor.device_readings()
+        t0 = time.perf_counter()
+        rolling.offer(snap, devices)
+        offers.append(time.perf_counter() - t0)
+    return rolling, offers
+
+
+def uncache(rolling: RollingStats):
+    rolling._cache = (None, None)
+
+
+def measure(fn, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return _percentiles(samples, 1e6)
+
+
+def main():
+    print(f"窗口容量 {MINUTES} 分钟 × {1 / PERIOD:.0f} Hz (单位 µs)")
+    print(f"{'GPU/核':<8}{'传感器':>8}{'项目':>16}{'mean':>10}{'p50':>10}{'p99':>10}")
+    for n_gpus, n_cores in TREE_SIZES:
+        rolling, offers = fill(n_gpus, n_cores)
+        label = f"{n_gpus}/{n_cores}"
+        sensors = len(rolling.catalog) + len(METRICS)
+        rows = [("offer", _percentiles(offers, 1e6))]
+        for window in WINDOWS:
+            rows.append((f"compute {window}s", measure(lambda: rolling.compute(window), ROUNDS)))
+            rows.append((f"query {window}s", measure(lambda: (rolling.query(window), uncache(rolling)), ROUNDS)))
+        for name, us in rows:
+            print(f"{label:<8}{sensors:>8}{name:>16}{us['mean']:>10}{us['p50']:>10}{us['p99']:>10}")
+
+
+if __name__ == "__main__":
+    main()
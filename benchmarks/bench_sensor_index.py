@@ -0,0 +1,113 @@
+"""
+黑塔之眼 - 基准测试: 传感器句柄索引
+==========================================
+对比旧版全树遍历 (每次采样遍历所有硬件/传感器并做字符串判断)
+与 SensorIndex (只读取已索引传感器的 Value) 的单次采样开销。
+
+运行: python -m benchmarks.bench_sensor_index
+"""
+
+import time
+
+from backend.hardware import HardwareMonitor, SystemStats
+from backend.scheduler import Cadence
+from backend.synthetic import build_computer
+
+TICKS = 200
+# 与旧版一致: 每次采样都 Update() 所有硬件
+EVERY_TICK = {name: Cadence(0.0, False) for name in ("cpu", "gpu", "memory", "motherboard")}
+
+
+def legacy_get_status(computer) -> SystemStats:
+    """v5.2 的 get_status() 全树遍历实现 (仅作对比基线)"""
+    cpu_usage = cpu_temp = ram_usage = None
+    gpu_usage = gpu_temp = gpu_vram_used = gpu_vram_total = gpu_power = gpu_clock = None
+    fan_speeds = []
+
+    for hardware in computer.Hardware:
+        hardware.Update()
+        h_type = str(hardware.HardwareType)
+
+        for sensor in hardware.Sensors:
+            s_type = str(sensor.SensorType)
+            s_name = sensor.Name
+            s_val = sensor.Value
+
+            if s_val is None:
+                continue
+
+            if h_type == "Cpu":
+                if s_type == "Load" and s_name == "CPU Total":
+                    cpu_usage = round(s_val, 1)
+                if s_type == "Temperature":
+                    if "Core" in s_name or "Package" in s_name:
+                        if s_val > 0:
+                            cpu_temp = round(max(cpu_temp or 0, s_val), 1)
+
+            if h_type == "Memory" and "Total" in hardware.Name:
+                if s_type == "Load" and s_name == "Memory":
+                    ram_usage = round(s_val, 1)
+
+            if "Gpu" in h_type:
+                if s_type == "Load" and s_name == "GPU Core":
+                    gpu_usage = round(max(gpu_usage or 0, s_val), 1)
+                if s_type == "Temperature":
+                    if "Core" in s_name or "Hot Spot" in s_name:
+                        if s_val > 0:
+                            gpu_temp = round(max(gpu_temp or 0, s_val), 1)
+                if s_type == "SmallData":
+                    if s_name == "GPU Memory Used":
+                        if s_val > (gpu_vram_used or 0):
+                            gpu_vram_used = round(s_val, 0)
+                    if s_name == "GPU Memory Total":
+                        if s_val > (gpu_vram_total or 0):
+                            gpu_vram_total = round(s_val, 0)
+                if s_type == "Power" and "Package" in s_name:
+                    gpu_power = round(s_val, 1)
+                if s_type == "Clock" and s_name == "GPU Core":
+                    if s_val > (gpu_clock or 0):
+                        gpu_clock = round(s_val, 0)
+                if s_type == "Fan":
+                    fan_speeds.append(f"{int(s_val)} RPM")
+
+    return SystemStats(
+        cpu=cpu_usage, cpu_temp=cpu_temp, ram=ram_usage,
+        gpu_usage=gpu_usage, gpu_temp=gpu_temp,
+        gpu_vram_used=gpu_vram_used, gpu_vram_total=gpu_vram_total,
+        gpu_power=gpu_power, gpu_clock=gpu_clock,
+        fan_speed=", ".join(fan_speeds) if fan_speeds else None
+    )
+
+
+def measure(fn, counter):
+    fn()  # 预热 (索引在首次采样时建立)
+    calls_before = counter.calls
+    t0 = time.perf_counter()
+    for _ in range(TICKS):
+        fn()
+    elapsed = time.perf_counter() - t0
+    return (counter.calls - calls_before) / TICKS, elapsed / TICKS * 1e6
+
+
+def main():
+    print(f"{'树规模':<16}{'方式':<10}{'调用/次':>10}{'耗时(us)':>12}")
+    for n_gpus, n_cores in [(1, 8), (2, 16), (4, 64)]:
+        label = f"{n_gpus} GPU/{n_cores} 核"
+
+        computer = build_computer(n_gpus=n_gpus, n_cores=n_cores)
+        legacy = legacy_get_status(computer)
+        calls, us = measure(lambda: legacy_get_status(computer), computer.counter)
+        print(f"{label:<16}{'全树遍历':<10}{calls:>10.0f}{us:>12.1f}")
+
+        computer = build_computer(n_gpus=n_gpus, n_cores=n_cores)
+        monitor = HardwareMonitor(computer, cadences=EVERY_TICK)
+        indexed = monitor.get_status()
+        calls, us = measure(monitor.get_status, computer.counter)
+        print(f"{label:<16}{'索引':<10}{calls:>10.0f}{us:>12.1f}")
+
+        # 两种实现在相同的树上应得到相同的结果
+        assert legacy == indexed, (legacy, indexed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+黑塔之眼 - 基准测试: 共享内存快照读取延迟
+==========================================
+测量悬浮窗读者 (backend.shm.SnapshotReader) 单次读取的耗时:
+- 空闲: 写入端不活动
+- 竞争: 另一进程以最高速率持续写入 (seqlock 重试的最坏情况), 并校验读到的快照是否一致
+可选对比同一数据经 HTTP /stats 轮询的延迟 (需要运行中的后端)。
+
+运行:
+    python -m benchmarks.bench_shm
+    python -m benchmarks.bench_shm --http http://127.0.0.1:8000/stats
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.history import METRICS
+from backend.shm import SnapshotPublisher, SnapshotReader
+
+NAME = "herta_bench_shm"
+READS = 200_000
+HTTP_READS = 2_000
+
+
+def _fake_snapshot(seq: int) -> SimpleNamespace:
+    # 所有字段写同一个值, 读者据此检查是否读到了撕裂的快照
+    stats = SimpleNamespace(**{m: float(seq) for m in METRICS})
+    return SimpleNamespace(seq=seq, timestamp=time.time(), stats=stats)
+
+
+def write(name: str, continuous: bool):
+    """子进程: 写入端 (continuous 时以最高速率持续发布, 否则只发布一次); 标准输入关闭时退出"""
+    publisher = SnapshotPublisher(name, METRICS)
+    stop = threading.Event()
+    threading.Thread(target=lambda: (sys.stdin.read(), stop.set()), daemon=True).start()
+    seq = 1
+    publisher.offer(_fake_snapshot(seq))
+    print("ready", flush=True)
+    while continuous and not stop.is_set():
+        seq += 1
+        publisher.offer(_fake_snapshot(seq))
+    stop.wait()
+    publisher.close()
+
+
+def _measure(fn, n: int) -> np.ndarray:
+    samples = np.empty(n)
+    clock = time.perf_counter_ns
+    for i in range(n):
+        t0 = clock()
+        fn()
+        samples[i] = clock() - t0
+    return samples
+
+
+def _report(label: str, ns: np.ndarray):
+    us = ns / 1000
+    print(f"{label:<24}{np.mean(us):>10.2f}{np.percentile(us, 50):>10.2f}"
+          f"{np.percentile(us, 99):>10.2f}{np.max(us):>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享内存快照读取延迟")
+    parser.add_argument("--reads", type=int, default=READS)
+    parser.add_argument("--http", metavar="URL", help="同时测量 HTTP 轮询 (如 http://127.0.0.1:8000/stats)")
+    parser.add_argument("--write", metavar="NAME", help=argparse.SUPPRESS)
+    parser.add_argument("--continuous", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.write:
+        write(args.write, args.continuous)
+        return
+
+
+    print(f"{len(METRICS)} 个字段, {args.reads} 次读取 (单位 µs)")
+    print(f"{'场景':<24}{'mean':>10}{'p50':>10}{'p99':>10}{'max':>12}")
+    # 写入端总在独立进程中 (与后端 / 悬浮窗的实际部署一致)
+    for continuous in (False, True):
+        proc = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_shm", "--write", NAME]
+                                + (["--continuous"] if continuous else []),
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        if proc.stdout.readline().strip() != "ready":
+            raise RuntimeError("写入进程启动失败")
+        reader = SnapshotReader(NAME)
+        torn = none = 0
+
+        def checked_read():
+            nonlocal torn, none
+            data = reader.read_values()
+            if data is None:
+                none += 1
+            elif min(data[2:]) != max(data[2:]):
+                torn += 1
+
+        try:
+            if continuous:
+                _report("read_values (写入竞争)", _measure(checked_read, args.reads))
+                print(f"竞争期间: 撕裂快照 {torn} 次, 超过重试上限 {none} 次")
+            else:
+                _report("read_values (空闲)", _measure(reader.read_values, args.reads))
+                _report("read (空闲)", _measure(reader.read, args.reads))
+        finally:
+            reader.close()
+            proc.stdin.close()
+            proc.wait()
+
+    if args.http:
+        import httpx
+        with httpx.Client() as client:
+            client.get(args.http)
+            _report("HTTP GET", _measure(lambda: client.get(args.http).json(), HTTP_READS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+黑塔之眼 - 基准测试: /stats 预编码响应与 ETag
+==========================================
+1. 单次请求的服务端开销 (进程内): 构建 StatsResponse + 序列化, 与预编码后的表示形式选择 + ETag 比较
+2. 吞吐: 100 个并发轮询客户端 (后端在独立进程中运行, 合成传感器树):
+   - full:        每次完整拉取 JSON
+   - gzip:        Accept-Encoding: gzip
+   - msgpack:     Accept: application/msgpack (需要安装 msgpack)
+   - conditional: 携带上次的 ETag (If-None-Match), 样本未变化时为 304
+
+运行:
+    python -m benchmarks.bench_stats_cache
+    python -m benchmarks.bench_stats_cache --clients 100 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+from backend.encoding import EncodedSnapshot, etag_matches, msgpack, select_variant
+from backend.sampler import Snapshot
+from benchmarks.suite import _percentiles, _wait_ready
+
+CLIENTS = 100
+DURATION = 5.0
+ENCODE_ROUNDS = 20_000
+MODES = {
+    "full": {},
+    "gzip": {"Accept-Encoding": "gzip"},
+    "msgpack": {"Accept": "application/msgpack"},
+    "conditional": {},
+}
+
+
+# --- 进程内: 单次请求开销 ---
+def bench_encode(rounds: int) -> List[dict]:
+    # 只需要响应模型: 导入 backend.main 前关闭其持久化 / 共享内存副作用 (同 suite.serve)
+    for env in ("HERTA_HISTORY_DB", "HERTA_SESSIONS_FILE", "HERTA_SHM"):
+        os.environ[env] = ""
+    from backend.hardware import SystemStats
+    from backend.main import StatsResponse
+
+    stats = SystemStats(cpu=41.2, cpu_temp=66.0, ram=48.1, gpu_usage=97.0, gpu_temp=71.5,
+                        gpu_vram_used=7012.0, gpu_vram_total=12282.0, gpu_power=182.3,
+                        gpu_clock=2715.0, fan_speed="1620 RPM, 1598 RPM")
+    snap = Snapshot(1, time.time(), time.monotonic(), stats)
+
+    def rebuild():
+        # 预编码之前每次请求的路径
+        StatsResponse(**snap.stats.model_dump(), sample_seq=snap.seq,
+                      sampled_at=round(snap.timestamp, 3)).model_dump_json()
+
+    def build():
+        return StatsResponse(**snap.stats.model_dump(), sample_seq=snap.seq, sampled_at=snap.timestamp)
+
+    encoded = EncodedSnapshot(snap, build())
+    etag = encoded.variants["json"][3]
+    headers = SimpleNamespace(accept="*/*", accept_encoding="gzip, deflate", if_none_match=etag)
+
+    def cached():
+        variant = encoded.variants[select_variant(headers.accept, headers.accept_encoding)]
+        etag_matches(headers.if_none_match, variant[3])
+
+    results = []
+    for name, fn in (("rebuild + serialize", rebuild), ("encode snapshot (每个快照一次)",
+                     lambda: EncodedSnapshot(snap, build())), ("cached lookup + ETag", cached)):
+        samples = []
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        results.append({"name": name, "us": _percentiles(samples, 1e6)})
+    return results
+
+
+# --- 吞吐 ---
+async def _request(reader, writer, request: bytes):
+    """最简 HTTP/1.1 keep-alive 客户端 (httpx 在单核上的客户端开销会掩盖服务端差异)"""
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {k.lower(): v for k, _, v in (line.partition(": ") for line in lines[1:] if line)}
+    length = int(headers.get("content-length", 0))
+    if length:
+        await reader.readexactly(length)
+    return status, headers.get("etag"), length
+
+
+async def _poll(host: str, port: int, mode: str, clients: int, duration: float) -> dict:
+    extra = "".join(f"{k}: {v}\r\n" for k, v in MODES[mode].items())
+    latencies: List[float] = []
+    counts: Dict[int, int] = {}
+    nbytes = 0
+
+    async def worker(deadline: float, record: bool):
+        nonlocal nbytes
+        reader, writer = await asyncio.open_connection(host, port)
+        etag = None
+        try:
+            while time.perf_counter() < deadline:
+                conditional = f"If-None-Match: {etag}\r\n" if mode == "conditional" and etag else ""
+                request = f"GET /stats HTTP/1.1\r\nHost: {host}\r\n{extra}{conditional}\r\n".encode()
+                t0 = time.perf_counter()
+                status, tag, length = await _request(reader, writer, request)
+                etag = tag or etag
+                if record:
+                    latencies.append(time.perf_counter() - t0)
+                    counts[status] = counts.get(status, 0) + 1
+                    nbytes += length
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(worker(time.perf_counter() + 0.3, False) for _ in range(clients)))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(t0 + duration, True) for _ in range(clients)))
+    elapsed = time.perf_counter() - t0
+
+    total = sum(counts.values())
+    return {
+        "name": mode,
+        "rps": round(total / elapsed, 1),
+        "not_modified": round(counts.get(304, 0) / max(total, 1) * 100, 1),
+        "errors": total - counts.get(200, 0) - counts.get(304, 0),
+        "bytes_per_req": round(nbytes / max(total, 1)),
+        "ms": _percentiles(latencies, 1e3),
+    }
+
+
+def bench_throughput(clients: int, duration: float, port: int) -> List[dict]:
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.suite", "--serve", str(port)])
+    try:
+        _wait_ready(base, proc)
+        results = []
+        for mode in MODES:
+            if mode == "msgpack" and msgpack is None:
+                print("⚠️ 未安装 msgpack, 跳过 msgpack 模式")
+                continue
+            results.append(asyncio.run(_poll("127.0.0.1", port, mode, clients, duration)))
+        return results
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/stats 预编码响应与 ETag 基准")
+    parser.add_argument("--clients", type=int, default=CLIENTS)
+    parser.add_argument("--duration", type=float, default=DURATION, help="每种模式的测量时长 (秒)")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    print(f"单次请求的服务端开销 ({ENCODE_ROUNDS} 次, µs)")
+    for r in bench_encode(ENCODE_ROUNDS):
+        print(f"  {r['name']:<32}mean {r['us']['mean']:>8}  p50 {r['us']['p50']:>8}  p99 {r['us']['p99']:>8}")
+
+    print(f"\n{args.clients} 个并发轮询客户端, 每种模式 {args.duration:.0f}s")
+    print(f"  {'模式':<14}{'req/s':>10}{'304 %':>8}{'字节/请求':>10}{'p50 ms':>10}{'p99 ms':>10}{'错误':>6}")
+    for r in bench_throughput(args.clients, args.duration, args.port):
+        print(f"  {r['name']:<14}{r['rps']:>10}{r['not_modified']:>8}{r['bytes_per_req']:>10}"
+              f"{r['ms']['p50']:>10}{r['ms']['p99']:>10}{r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+黑塔之眼 - 基准测试套件
+==========================================
+在 Linux 上基于合成传感器树 (backend.synthetic) 测量热路径, 结果保存为 JSON 便于跨版本对比:
+- get_status: HardwareMonitor.get_status() 单次采样耗时与 CLR 调用数 (1~4 GPU, 8~64 核)
+- http: /stats 与 /roast 在并发客户端下的吞吐与 p50/p99 延迟 (后端在独立进程中运行)
+- frontend: frontend/app.py 每个渲染周期在服务端的开销 (卡片 + 环形缓冲 + 增量行序列化)
+
+运行:
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --out new.json --compare bench.json
+    python -m benchmarks.suite --only http --quick
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.hardware import HardwareMonitor
+from backend.synthetic import build_computer
+from benchmarks.bench_sensor_index import EVERY_TICK
+
+TREE_SIZES = [(1, 8), (2, 16), (4, 32), (4, 64)]   # (GPU 数, CPU 核数)
+HTTP_ENDPOINTS = ["/stats", "/roast"]
+HTTP_CONCURRENCY = [1, 8, 32]
+CHART_WINDOWS = [60, 3600]
+
+
+def _percentiles(samples: List[float], scale: float) -> Dict[str, float]:
+    arr = np.asarray(samples) * scale
+    return {
+        "mean": round(float(arr.mean()), 2),
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p99": round(float(np.percentile(arr, 99)), 2),
+    }
+
+
+# --- get_status ---
+def bench_get_status(ticks: int) -> List[dict]:
+    results = []
+    for n_gpus, n_cores in TREE_SIZES:
+        computer = build_computer(n_gpus=n_gpus, n_cores=n_cores)
+        # 每次采样 Update() 所有硬件: 单次采样的最坏开销
+        monitor = HardwareMonitor(computer, cadences=EVERY_TICK)
+        monitor.get_status()    # 预热 (建立索引)
+        calls_before = computer.counter.calls
+        samples = []
+        for _ in range(ticks):
+            t0 = time.perf_counter()
+            monitor.get_status()
+            samples.append(time.perf_counter() - t0)
+        calls = (computer.counter.calls - calls_before) / ticks
+        monitor.close()
+        results.append({
+            "name": f"get_status/{n_gpus}gpu-{n_cores}core",
+            "sensors": len(monitor.index.catalog),
+            "clr_calls": calls,
+            "us": _percentiles(samples, 1e6),
+        })
+    return results
+
+
+# --- HTTP ---
+def serve(port: int, n_gpus: int, n_cores: int):
+    """子进程: 以合成传感器树运行完整后端 (backend.main)"""
+    import uvicorn
+    import backend.hardware
+
+    os.environ["HERTA_HISTORY_DB"] = ""
+    os.environ["HERTA_SHM"] = ""
+    backend.hardware.open_computer = lambda: build_computer(n_gpus=n_gpus, n_cores=n_cores)
+    from backend.main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def _load(url: str, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=5.0) as client:
+        async def worker(deadline: float, record: bool):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(url)
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if record:
+                    if ok:
+                        latencies.append(time.perf_counter() - t0)
+                    else:
+                        errors += 1
+
+        # 预热 (建立连接)
+        await asyncio.gather(*(worker(time.perf_counter() + 0.3, False) for _ in range(concurrency)))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(t0 + duration, True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return {"rps": round(len(latencies) / elapsed, 1), "errors": errors, "ms": _percentiles(latencies, 1e3)}
+
+
+def _wait_ready(base: str, proc: subprocess.Popen, timeout: float = 15.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("后端进程启动失败")
+        try:
+            if httpx.get(f"{base}/stats", timeout=0.5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("后端启动超时")
+
+
+def bench_http(duration: float, port: int = 8765, n_gpus: int = 2, n_cores: int = 16) -> List[dict]:
+    base = f"http://127.0.0.1:{port}"
+    # 后端在独立进程中运行, 避免与压测客户端争用 GIL
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.suite", "--serve", str(port),
+                             "--gpus", str(n_gpus), "--cores", str(n_cores)])
+    try:
+        _wait_ready(base, proc)
+        results = []
+        for endpoint in HTTP_ENDPOINTS:
+            for concurrency in HTTP_CONCURRENCY:
+                result = asyncio.run(_load(base + endpoint, concurrency, duration))
+                results.append({"name": f"http{endpoint}/c{concurrency}", **result})
+        return results
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+# --- 前端渲染周期 ---
+def bench_frontend(ticks: int) -> List[dict]:
+    import pyarrow as pa
+    from frontend.cards import build_cards
+    from frontend.history_chart import RingBuffer, build_chart_spec
+
+    columns = ["CPU", "GPU", "RAM"]
+    spec = build_chart_spec(columns, ["#00f3ff", "#ff2a6d", "#ffd700"])
+    rng = np.random.default_rng(0)
+    results = []
+    for capacity in CHART_WINDOWS:
+        ring = RingBuffer(columns, capacity)
+        for _ in range(capacity):
+            ring.append(int(time.time() * 1000), rng.uniform(0, 100, 3).tolist())
+        appended = 0
+        samples = []
+        for _ in range(ticks):
+            stats = {"cpu": 41.2, "cpu_temp": 66.0, "ram": 48.1, "gpu_usage": float(rng.uniform(0, 100)),
+                     "gpu_temp": 71.5, "gpu_vram_used": 7012.0, "gpu_vram_total": 12282.0,
+                     "gpu_power": 182.3, "gpu_clock": 2715.0, "fan_speed": "1620 RPM, 1598 RPM"}
+            t0 = time.perf_counter()
+            # 与 app.py 的循环体一致: 卡片 -> 环形缓冲 -> 增量追加 (满窗口时完整重绘)
+            build_cards(stats)
+            t_ms = int(time.time() * 1000)
+            row = [stats["cpu"], stats["gpu_usage"], stats["ram"]]
+            ring.append(t_ms, row)
+            if appended >= capacity:
+                # Streamlit 以 Arrow 发送 DataFrame, 用 pyarrow 近似该开销
+                pa.Table.from_pandas(ring.to_frame())
+                json.dumps(spec)
+                appended = 0
+            else:
+                pa.Table.from_pandas(RingBuffer.row_frame(t_ms, columns, row))
+                appended += 1
+            samples.append(time.perf_counter() - t0)
+        results.append({"name": f"frontend/window{capacity}", "us": _percentiles(samples, 1e6)})
+    return results
+
+
+# --- 结果 ---
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(entry: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in entry.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and key != "sensors":
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old: dict, new: dict):
+    """逐项打印新旧结果 (新/旧 比值)"""
+    old_entries = {e["name"]: e for group in old["results"].values() for e in group}
+    print(f"\n对比 {old['meta'].get('revision')} -> {new['meta'].get('revision')}")
+    print(f"{'项目':<36}{'指标':<12}{'旧':>12}{'新':>12}{'新/旧':>8}")
+    for group in new["results"].values():
+        for entry in group:
+            base = old_entries.get(entry["name"])
+            if base is None:
+                continue
+            old_flat = _flatten(base)
+            for metric, value in _flatten(entry).items():
+                before = old_flat.get(metric)
+                if before:
+                    print(f"{entry['name']:<36}{metric:<12}{before:>12g}{value:>12g}{value / before:>8.2f}")
+
+
+def _print(results: Dict[str, List[dict]]):
+    for group, entries in results.items():
+        print(f"\n[{group}]")
+        for entry in entries:
+            fields = ", ".join(f"{k}={v}" for k, v in _flatten(entry).items())
+            print(f"  {entry['name']:<34}{fields}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="黑塔之眼基准测试套件")
+    parser.add_argument("--out", default="bench_results.json", help="结果 JSON 路径")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="与之前的结果对比")
+    parser.add_argument("--only", choices=["get_status", "http", "frontend"], action="append")
+    parser.add_argument("--quick", action="store_true", help="缩短测量时长 (冒烟测试)")
+    parser.add_argument("--port", type=int, default=8765, help="HTTP 测试的后端端口")
+    # 内部: HTTP 测试的后端子进程
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--gpus", type=int, default=2, help=argparse.SUPPRESS)
+    parser.add_argument("--cores", type=int, default=16, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.gpus, args.cores)
+        return
+
+    groups = args.only or ["get_status", "http", "frontend"]
+    ticks = 200 if args.quick else 2000
+    results: Dict[str, List[dict]] = {}
+    if "get_status" in groups:
+        results["get_status"] = bench_get_status(ticks)
+    if "http" in groups:
+        results["http"] = bench_http(1.0 if args.quick else 5.0, args.port)
+    if "frontend" in groups:
+        results["frontend"] = bench_frontend(ticks)
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    _print(results)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
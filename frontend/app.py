@@ -3,13 +3,18 @@
 ==========================================
 - 条件显示: 如果数据为 None/0, 则隐藏对应卡片
 - 新增: GPU VRAM / 功耗 / 频率 卡片
+- 历史曲线: NumPy 环形缓冲区 + 增量追加 (add_rows), 图表规格只构建一次
+- 所有浏览器会话共享一个上游轮询器, 后端流量与观看人数无关
+- GPU 降频徽章: 标题栏显示进行中的温度墙 / 功耗墙降频 (来自 /throttle)
 """
 
 import streamlit as st
-import requests
 import time
-import pandas as pd
-import altair as alt
+import os
+
+from cards import build_cards
+from history_chart import RingBuffer, build_chart_spec
+from upstream import UpstreamPoller
 
 st.set_page_config(
     page_title="黑塔系统 // 监控终端",
@@ -97,24 +102,39 @@ st.markdown(f"""
         padding: 15px; border-radius: 0 15px 0 15px;
     }}
     .herta-avatar {{ font-size: 1.8rem; margin-right: 15px; }}
+
+    .throttle-badge {{
+        margin-right: 1rem; padding: 2px 10px; border-radius: 3px;
+        font-weight: bold; font-size: 0.85rem; color: #fff; background: {WARNING_RED};
+    }}
+    .throttle-badge.power {{ background: {HERTA_PURPLE}; }}
     .herta-text {{ font-size: 1rem; font-style: italic; color: #ddd; font-family: 'Noto Sans SC', sans-serif; }}
 </style>
 """, unsafe_allow_html=True)
 
 API_URL = "http://127.0.0.1:8000"
+THROTTLE_REASONS = {"thermal": "温度墙", "power": "功耗墙"}
+
+@st.cache_resource
+def get_poller() -> UpstreamPoller:
+    """进程级单例: 所有会话共享同一个轮询线程与 keep-alive 连接"""
+    poller = UpstreamPoller(API_URL, period=1.0)
+    poller.start()
+    return poller
+
+poller = get_poller()
 
-def get_data():
-    try:
-        r1 = requests.get(f"{API_URL}/stats", timeout=0.3)
-        r2 = requests.get(f"{API_URL}/roast", timeout=0.3)
-        if r1.ok and r2.ok:
-            return r1.json(), r2.json()
-    except:
-        pass
-    return None, None
+# --- 历史曲线 ---
+# 保留的点数 (每秒 1 点), 可通过环境变量 HERTA_CHART_POINTS 调整 (60 ~ 14400)
+CHART_POINTS = min(max(int(os.environ.get("HERTA_CHART_POINTS", "60")), 60), 14400)
+CHART_COLUMNS = ['CPU', 'GPU', 'RAM']
 
-if "history" not in st.session_state:
-    st.session_state.history = pd.DataFrame(columns=['Time', 'CPU', 'GPU', 'RAM'])
+# Vega-Lite 规格 (常量): 由 fold 在浏览器端完成宽表 -> 长表, 服务端无需 melt
+CHART_SPEC = build_chart_spec(CHART_COLUMNS, [HOLOGRAM_BLUE, WARNING_RED, HERTA_GOLD])
+
+if "history" not in st.session_state or st.session_state.history.capacity != CHART_POINTS:
+    st.session_state.history = RingBuffer(CHART_COLUMNS, CHART_POINTS)
+history = st.session_state.history
 
 # --- Header ---
 col_head, col_status = st.columns([3, 1])
@@ -122,88 +142,41 @@ with col_head:
     st.markdown("<h1>黑塔系统 <span style='font-size:0.9rem;color:#888'>// 游戏监控</span></h1>", unsafe_allow_html=True)
 
 status_ph = col_status.empty()
-main_ph = st.empty()
+cards_ph = st.empty()
+col_roast, col_chart = st.columns([1, 2])
+roast_ph = col_roast.empty()
+chart_ph = col_chart.empty()
 
-# --- Helper: 渲染卡片 (条件显示) ---
-def render_card(label, value, unit, sub="", warn_thresh=85, show_bar=True):
-    """如果 value 为 None 或 0, 返回空字符串 (不显示)"""
-    if value is None or value == 0:
-        return ""
-    
-    is_warn = value > warn_thresh if warn_thresh else False
-    warn_class = "warning" if is_warn else ""
-    bar_html = f'<div class="prog-bg"><div class="prog-fill" style="width:{min(value, 100)}%"></div></div>' if show_bar else ''
-    
-    return f"""
-    <div class="metric-card {warn_class}">
-        <div class="metric-label">{label}</div>
-        <div class="metric-value">{value}<span class="metric-unit">{unit}</span></div>
-        <div class="metric-sub">{sub}</div>
-        {bar_html}
-    </div>
-    """
+chart = None        # 当前图表元素 (支持 add_rows)
+appended = 0        # 自上次完整重绘以来追加的行数
+version = 0         # 已渲染的共享数据版本
 
 while True:
-    stats, roast = get_data()
+    # 阻塞等待共享轮询器的新数据 (代替 time.sleep), 会话本身不访问后端
+    version, stats, roast = poller.wait(version)
     
     if stats:
-        # Status Indicator
+        # Status Indicator (+ 降频徽章: 显示亏损最大的事件, 其余放在提示中)
+        badge = ""
+        events = poller.throttle()
+        if events:
+            describe = lambda e: f"{THROTTLE_REASONS[e['reason']]} -{e['max_deficit_mhz']:.0f} MHz"
+            tip = "&#10;".join(f"{e['hardware']}: {describe(e)} ({e['duration']:.0f}s)" for e in events)
+            badge = f"<span class='throttle-badge {events[0]['reason']}' title='{tip}'>⚠️ 降频: {describe(events[0])}</span>"
         with status_ph.container():
             if stats.get('is_mock', False):
-                st.markdown(f"<div style='text-align:right; color:{WARNING_RED}; font-weight:bold;'>⚠️ 模拟信号</div>", unsafe_allow_html=True)
+                st.markdown(f"<div style='text-align:right; color:{WARNING_RED}; font-weight:bold;'>{badge}⚠️ 模拟信号</div>", unsafe_allow_html=True)
             else:
-                st.markdown(f"<div style='text-align:right; color:{HOLOGRAM_BLUE}; font-weight:bold;'>✅ 硬件直连</div>", unsafe_allow_html=True)
-
-        with main_ph.container():
-            # Update History
-            curr_time = time.strftime("%H:%M:%S")
-            new_row = pd.DataFrame({
-                'Time': [curr_time],
-                'CPU': [stats.get('cpu') or 0],
-                'GPU': [stats.get('gpu_usage') or 0],
-                'RAM': [stats.get('ram') or 0]
-            })
-            st.session_state.history = pd.concat([st.session_state.history, new_row]).tail(60)
+                st.markdown(f"<div style='text-align:right; color:{HOLOGRAM_BLUE}; font-weight:bold;'>{badge}✅ 硬件直连</div>", unsafe_allow_html=True)
 
+        # Update History (O(1), 无内存分配)
+        t_ms = int(time.time() * 1000)
+        row = [stats.get('cpu') or 0, stats.get('gpu_usage') or 0, stats.get('ram') or 0]
+        history.append(t_ms, row)
+
+        with cards_ph.container():
             # === 动态卡片布局 ===
-            cards_html = []
-            
-            # CPU
-            cpu_sub = f"{stats.get('cpu_temp') or '--'}°C" if stats.get('cpu_temp') else ""
-            cards_html.append(render_card("CPU 占用", stats.get('cpu'), "%", cpu_sub, warn_thresh=85))
-            
-            # GPU
-            gpu_sub = f"{stats.get('gpu_temp') or '--'}°C" if stats.get('gpu_temp') else ""
-            cards_html.append(render_card("GPU 占用", stats.get('gpu_usage'), "%", gpu_sub, warn_thresh=90))
-            
-            # RAM
-            cards_html.append(render_card("内存占用", stats.get('ram'), "%", "", warn_thresh=90))
-            
-            # VRAM
-            vram_used = stats.get('gpu_vram_used')
-            vram_total = stats.get('gpu_vram_total')
-            if vram_used and vram_total:
-                vram_pct = round((vram_used / vram_total) * 100, 1)
-                cards_html.append(render_card("显存占用", vram_pct, "%", f"{int(vram_used)}/{int(vram_total)} MB", warn_thresh=90))
-            
-            # GPU Power
-            cards_html.append(render_card("GPU 功耗", stats.get('gpu_power'), "W", "", warn_thresh=None, show_bar=False))
-            
-            # GPU Clock
-            cards_html.append(render_card("GPU 频率", stats.get('gpu_clock'), "MHz", "", warn_thresh=None, show_bar=False))
-            
-            # Fan
-            fan = stats.get('fan_speed')
-            if fan:
-                cards_html.append(f"""
-                <div class="metric-card">
-                    <div class="metric-label">风扇转速</div>
-                    <div class="metric-value" style="font-size:1.4rem">{fan}</div>
-                </div>
-                """)
-            
-            # 过滤空卡片并渲染
-            valid_cards = [c for c in cards_html if c.strip()]
+            valid_cards = build_cards(stats)
             
             # 动态列数 (最多4列)
             num_cols = min(len(valid_cards), 4)
@@ -220,29 +193,23 @@ while True:
                         with cols2[i]:
                             st.markdown(card, unsafe_allow_html=True)
 
-            # === Row 2: Chart + Herta ===
-            c1, c2 = st.columns([1, 2])
-            
-            with c1:
-                st.markdown(f"""
-                <div class="herta-bubble">
-                    <div class="herta-avatar">👾</div>
-                    <div class="herta-text">"{roast['message']}"</div>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with c2:
-                source = st.session_state.history.melt('Time', var_name='Metric', value_name='Usage')
-                chart = alt.Chart(source).mark_line(strokeWidth=2).encode(
-                    x=alt.X('Time', axis=None),
-                    y=alt.Y('Usage', scale=alt.Scale(domain=[0, 100]), axis=None),
-                    color=alt.Color('Metric', legend=alt.Legend(orient='top', title=None),
-                        scale=alt.Scale(domain=['CPU','GPU','RAM'], range=[HOLOGRAM_BLUE, WARNING_RED, HERTA_GOLD])),
-                    tooltip=['Time', 'Metric', 'Usage']
-                ).properties(height=120, background='transparent').configure_view(stroke=None)
-                st.altair_chart(chart, use_container_width=True)
+        # === Row 2: Chart + Herta ===
+        roast_ph.markdown(f"""
+        <div class="herta-bubble">
+            <div class="herta-avatar">👾</div>
+            <div class="herta-text">"{roast['message']}"</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # 图表: 每秒只追加一行; 追加满一个窗口后从环形缓冲区完整重绘一次, 丢弃滚出窗口的旧点
+        if chart is None or appended >= history.capacity:
+            chart = chart_ph.vega_lite_chart(history.to_frame(), CHART_SPEC, use_container_width=True)
+            appended = 0
+        else:
+            chart.add_rows(RingBuffer.row_frame(t_ms, CHART_COLUMNS, row))
+            appended += 1
     else:
-        with main_ph.container():
-             st.error("等待连接...")
-             
-    time.sleep(1)
+        cards_ph.error("等待连接...")
+        roast_ph.empty()
+        chart_ph.empty()
+        chart = None
@@ -0,0 +1,75 @@
+"""
+黑塔之眼 - 前端指标卡片
+==========================================
+- 条件显示: 数据为 None/0 的卡片不生成
+- 纯函数, 只依赖 stats 字典 (便于基准测试, 不需要 Streamlit 运行时)
+"""
+
+from typing import List, Optional
+
+
+def render_card(label, value, unit, sub="", warn_thresh: Optional[float] = 85, show_bar=True) -> str:
+    """如果 value 为 None 或 0, 返回空字符串 (不显示)"""
+    if value is None or value == 0:
+        return ""
+
+    is_warn = value > warn_thresh if warn_thresh else False
+    warn_class = "warning" if is_warn else ""
+    bar_html = f'<div class="prog-bg"><div class="prog-fill" style="width:{min(value, 100)}%"></div></div>' if show_bar else ''
+
+    return f"""
+    <div class="metric-card {warn_class}">
+        <div class="metric-label">{label}</div>
+        <div class="metric-value">{value}<span class="metric-unit">{unit}</span></div>
+        <div class="metric-sub">{sub}</div>
+        {bar_html}
+    </div>
+    """
+
+
+def build_cards(stats: dict) -> List[str]:
+    """按 /stats 数据生成要显示的卡片 HTML (已过滤空卡片)"""
+    cards_html = []
+
+    # CPU
+    cpu_sub = f"{stats.get('cpu_temp') or '--'}°C" if stats.get('cpu_temp') else ""
+    cards_html.append(render_card("CPU 占用", stats.get('cpu'), "%", cpu_sub, warn_thresh=85))
+
+    # GPU
+    gpu_sub = f"{stats.get('gpu_temp') or '--'}°C" if stats.get('gpu_temp') else ""
+    cards_html.append(render_card("GPU 占用", stats.get('gpu_usage'), "%", gpu_sub, warn_thresh=90))
+
+    # FPS (帧时间日志, 未启用时为 None)
+    fps = stats.get('fps')
+    if fps:
+        low_sub = f"1% low {stats['fps_1pct_low']}" if stats.get('fps_1pct_low') else ""
+        cards_html.append(render_card("帧率", fps, "FPS", low_sub, warn_thresh=None, show_bar=False))
+
+    # RAM
+    cards_html.append(render_card("内存占用", stats.get('ram'), "%", "", warn_thresh=90))
+
+    # VRAM
+    vram_used = stats.get('gpu_vram_used')
+    vram_total = stats.get('gpu_vram_total')
+    if vram_used and vram_total:
+        vram_pct = round((vram_used / vram_total) * 100, 1)
+        cards_html.append(render_card("显存占用", vram_pct, "%", f"{int(vram_used)}/{int(vram_total)} MB", warn_thresh=90))
+
+    # GPU Power
+    cards_html.append(render_card("GPU 功耗", stats.get('gpu_power'), "W", "", warn_thresh=None, show_bar=False))
+
+    # GPU Clock
+    cards_html.append(render_card("GPU 频率", stats.get('gpu_clock'), "MHz", "", warn_thresh=None, show_bar=False))
+
+    # Fan
+    fan = stats.get('fan_speed')
+    if fan:
+        cards_html.append(f"""
+        <div class="metric-card">
+            <div class="metric-label">风扇转速</div>
+            <div class="metric-value" style="font-size:1.4rem">{fan}</div>
+        </div>
+        """)
+
+    # 过滤空卡片
+    return [c for c in cards_html if c.strip()]
@@ -0,0 +1,76 @@
+"""
+黑塔之眼 - 前端历史曲线
+==========================================
+- 预分配的 NumPy 定长环形缓冲区, 追加为 O(1), 无任何内存分配
+- 仅在需要完整重绘时才按时间顺序导出为 DataFrame
+- Vega-Lite 图表规格只构建一次 (fold 在浏览器端完成宽表 -> 长表)
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer:
+    def __init__(self, columns: Sequence[str], capacity: int):
+        self.columns: List[str] = list(columns)
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.int64)                         # 毫秒时间戳
+        self._values = np.zeros((capacity, len(self.columns)), dtype=np.float32)
+        self._head = 0      # 下一个写入位置
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, t_ms: int, values: Sequence[float]):
+        self._times[self._head] = t_ms
+        self._values[self._head] = values
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _order(self) -> np.ndarray:
+        """按时间先后排列的下标"""
+        start = (self._head - self._size) % self.capacity
+        return (start + np.arange(self._size)) % self.capacity
+
+    def to_frame(self) -> pd.DataFrame:
+        """导出全部数据 (按时间顺序), 用于完整重绘"""
+        idx = self._order()
+        frame = pd.DataFrame(self._values[idx], columns=self.columns)
+        frame.insert(0, "Time", self._times[idx])
+        return frame
+
+    @staticmethod
+    def row_frame(t_ms: int, columns: Sequence[str], values: Sequence[float]) -> pd.DataFrame:
+        """单行 DataFrame, 用于增量追加 (add_rows)"""
+        frame = pd.DataFrame([values], columns=list(columns), dtype=np.float32)
+        frame.insert(0, "Time", [t_ms])
+        return frame
+
+
+def build_chart_spec(columns: Sequence[str], colors: Sequence[str], height: int = 120) -> Dict:
+    """历史曲线的 Vega-Lite 规格 (常量, 每个会话只构建一次)"""
+    columns = list(columns)
+    return {
+        "height": height,
+        "background": "transparent",
+        "transform": [{"fold": columns, "as": ["Metric", "Usage"]}],
+        "mark": {"type": "line", "strokeWidth": 2},
+        "encoding": {
+            "x": {"field": "Time", "type": "temporal", "axis": None},
+            "y": {"field": "Usage", "type": "quantitative", "scale": {"domain": [0, 100]}, "axis": None},
+            "color": {
+                "field": "Metric", "type": "nominal",
+                "legend": {"orient": "top", "title": None},
+                "scale": {"domain": columns, "range": list(colors)},
+            },
+            "tooltip": [
+                {"field": "Time", "type": "temporal", "format": "%H:%M:%S"},
+                {"field": "Metric", "type": "nominal"},
+                {"field": "Usage", "type": "quantitative"},
+            ],
+        },
+        "config": {"view": {"stroke": None}},
+    }
@@ -0,0 +1,99 @@
+"""
+黑塔之眼 - 前端共享上游轮询器
+==========================================
+- 整个 Streamlit 进程只有一个轮询线程 (由 st.cache_resource 保证单例)
+- 通过一个 keep-alive 连接 (requests.Session) 拉取 /stats 与 /roast
+- 所有浏览器会话只读取共享的最新数据, 后端流量与观看人数无关
+- 一段时间无会话读取时暂停轮询
+- 每 THROTTLE_EVERY 秒拉取一次 /throttle (降频徽章); 检测未启用 (404) 时停止拉取
+"""
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import requests
+
+STALE_AFTER = 3.0       # 超过该时长 (秒) 未成功拉取, 视为断开
+IDLE_AFTER = 10.0       # 超过该时长 (秒) 无会话读取, 暂停轮询
+THROTTLE_EVERY = 2.0    # /throttle 拉取间隔 (秒)
+THROTTLE_REASONS = ("thermal", "power")     # 徽章只显示温度墙 / 功耗墙 (空闲降频属正常现象)
+
+
+class UpstreamPoller:
+    def __init__(self, api_url: str, period: float = 1.0, timeout: float = 0.5):
+        self.api_url = api_url
+        self.period = period
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._cond = threading.Condition()
+        self._version = 0
+        self._stats: Optional[dict] = None
+        self._roast: Optional[dict] = None
+        self._throttle: List[dict] = []         # 进行中的温度墙 / 功耗墙事件, 亏损大的在前
+        self._throttle_enabled = True
+        self._throttle_at = 0.0                 # 最近一次拉取 /throttle (time.monotonic)
+        self._updated = 0.0                     # 最近一次成功拉取 (time.monotonic)
+        self._last_read = time.monotonic()      # 最近一次会话读取
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="HertaUpstream", daemon=True)
+        self._thread.start()
+
+    def _fetch(self) -> Tuple[Optional[dict], Optional[dict]]:
+        try:
+            r1 = self._session.get(f"{self.api_url}/stats", timeout=self.timeout)
+            r2 = self._session.get(f"{self.api_url}/roast", timeout=self.timeout)
+            if r1.ok and r2.ok:
+                return r1.json(), r2.json()
+        except (requests.RequestException, ValueError):
+            pass
+        return None, None
+
+    def _fetch_throttle(self):
+        self._throttle_at = time.monotonic()
+        try:
+            r = self._session.get(f"{self.api_url}/throttle", timeout=self.timeout)
+            if r.status_code == 404:
+                self._throttle_enabled = False
+                return
+            if r.ok:
+                events = [e for e in r.json()["active"] if e["reason"] in THROTTLE_REASONS]
+                events.sort(key=lambda e: e["max_deficit_mhz"], reverse=True)
+                self._throttle = events
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+
+    def _run(self):
+        while True:
+            t0 = time.monotonic()
+            if t0 - self._last_read < IDLE_AFTER:
+                stats, roast = self._fetch()
+                if stats and self._throttle_enabled and t0 - self._throttle_at >= THROTTLE_EVERY:
+                    self._fetch_throttle()
+                if stats:
+                    with self._cond:
+                        self._version += 1
+                        self._stats, self._roast = stats, roast
+                        self._updated = time.monotonic()
+                        self._cond.notify_all()
+            time.sleep(max(0.0, self.period - (time.monotonic() - t0)))
+
+    def wait(self, version: int, timeout: float = 2.0) -> Tuple[int, Optional[dict], Optional[dict]]:
+        """
+        等待比 version 更新的数据。
+        返回 (version, stats, roast); 数据过期时 stats / roast 为 None。
+        """
+        self._last_read = time.monotonic()
+        with self._cond:
+            self._cond.wait_for(lambda: self._version != version, timeout)
+            if time.monotonic() - self._updated > STALE_AFTER:
+                return self._version, None, None
+            return self._version, self._stats, self._roast
+
+    def throttle(self) -> List[dict]:
+        """最近拉取到的进行中降频事件 (温度墙 / 功耗墙, 亏损大的在前)"""
+        return self._throttle
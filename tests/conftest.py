@@ -0,0 +1,23 @@
+"""
+黑塔之眼 - 测试公共工具
+==========================================
+- 全部测试基于合成传感器树 (backend.synthetic) 与虚拟时间, 不需要 DLL / 真实硬件
+"""
+
+import itertools
+
+import pytest
+
+from backend.hardware import SystemStats
+from backend.sampler import Snapshot
+
+
+@pytest.fixture
+def make_snapshot():
+    """按虚拟时间构造快照: make_snapshot(t, gpu_temp=85.0, ...)"""
+    seq = itertools.count(1)
+
+    def make(t: float, **stats) -> Snapshot:
+        return Snapshot(next(seq), 1_700_000_000.0 + t, t, SystemStats(**stats))
+
+    return make
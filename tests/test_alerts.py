@@ -0,0 +1,56 @@
+import pytest
+
+from backend.alerts import AlertEngine, Rule, load_rules
+
+
+def test_rule_parsing():
+    rule = Rule("gpu_temp >= 83.5 for 500ms", "热")
+    assert (rule.field, rule.op, rule.threshold, rule.duration) == ("gpu_temp", ">=", 83.5, 0.5)
+    assert Rule("cpu > 90 for 2m", "").duration == 120.0
+    with pytest.raises(ValueError):
+        Rule("gpu_temp >> 83", "")
+    with pytest.raises(ValueError):
+        Rule("fan_speed > 1000", "")      # 文本字段不可用于规则
+
+
+def test_duration_and_hysteresis(make_snapshot):
+    rule = Rule("gpu_temp > 83 for 10s", "GPU {value:.0f}°C", hysteresis=5)
+    assert rule.evaluate(make_snapshot(0, gpu_temp=85.0)) is None
+    assert rule.evaluate(make_snapshot(9, gpu_temp=86.0)) is None
+    fired = rule.evaluate(make_snapshot(10, gpu_temp=87.0))
+    assert fired.state == "firing" and fired.message == "GPU 87°C"
+
+    # 低于触发阈值但未低于解除阈值 (83 - 5): 保持触发
+    assert rule.evaluate(make_snapshot(11, gpu_temp=80.0)) is None
+    assert rule.active is fired
+    # 数据缺失: 保持当前状态
+    assert rule.evaluate(make_snapshot(12)) is None
+    assert rule.active is fired
+    resolved = rule.evaluate(make_snapshot(13, gpu_temp=77.0))
+    assert resolved.state == "resolved" and rule.active is None
+
+
+def test_pending_resets_when_condition_breaks(make_snapshot):
+    rule = Rule("cpu > 90 for 10s", "")
+    rule.evaluate(make_snapshot(0, cpu=95.0))
+    rule.evaluate(make_snapshot(8, cpu=50.0))       # 中断: 重新计时
+    assert rule.evaluate(make_snapshot(12, cpu=95.0)) is None
+    assert rule.evaluate(make_snapshot(21, cpu=95.0)) is None
+    assert rule.evaluate(make_snapshot(22, cpu=95.0)).state == "firing"
+
+
+def test_downward_rule_hysteresis(make_snapshot):
+    rule = Rule("ram < 10", "", hysteresis=5)
+    assert rule.evaluate(make_snapshot(0, ram=8.0)).state == "firing"
+    assert rule.evaluate(make_snapshot(1, ram=14.0)) is None
+    assert rule.evaluate(make_snapshot(2, ram=16.0)).state == "resolved"
+
+
+def test_engine_roast_prefers_most_severe(make_snapshot):
+    engine = AlertEngine(load_rules())
+    assert engine.fields == ["cpu", "cpu_temp", "gpu_power", "gpu_temp", "ram"]
+    for t in range(31):
+        engine.evaluate(make_snapshot(t, cpu=95.0, gpu_temp=90.0))
+    assert [e.field for e in engine.active()] == ["gpu_temp", "cpu"]
+    assert engine.roast() == engine.active()[0].message
+    assert [e.state for e in engine.recent()] == ["firing", "firing"]
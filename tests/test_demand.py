@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from backend.demand import DemandTracker
+from backend.hardware import HardwareMonitor
+from backend.sampler import Sampler
+from backend.synthetic import build_computer
+
+BASE = 0.25
+HEARTBEAT = 5.0
+
+
+@pytest.fixture
+def demand():
+    monitor = HardwareMonitor(build_computer(n_gpus=1))
+    sampler = Sampler(monitor.sample, period=BASE)     # 不启动: 只检查计划
+    tracker = DemandTracker(monitor, sampler, BASE, HEARTBEAT)
+    monitor.sample()        # 建立索引并应用一次需求
+    yield tracker
+    monitor.close()
+
+
+def test_no_consumers_is_idle(demand):
+    assert demand.plan["idle"] is True
+    assert demand.sampler.period == HEARTBEAT
+    assert demand.monitor.tree_enabled is False
+
+
+def test_default_background_consumers_stay_idle(demand):
+    # 默认配置: 历史记录、告警 (后台), 会话识别 / 降频检测的空闲探测 (心跳周期)
+    demand.hold("history", fields=["cpu", "gpu_usage"], period=1.0, background=True)
+    demand.hold("alerts", fields=["gpu_temp"], period=1.0, background=True)
+    demand.hold("sessions idle", fields=["gpu_usage"], period=HEARTBEAT)
+    demand.apply()
+    assert demand.plan["idle"] is True
+    assert demand.plan["sample_period"] == HEARTBEAT
+
+
+def test_foreground_consumer_wakes_sampling(demand):
+    demand.hold("history", fields=["cpu"], period=1.0, background=True)
+    demand.touch("http stats", fields=["gpu_temp"], period=0.5, ttl=0.05)
+    demand.apply()
+    assert demand.plan["idle"] is False
+    assert demand.plan["sample_period"] == 0.5
+    classes = demand.plan["classes"]
+    assert classes["gpu"] == 0.5 and classes["cpu"] == 1.0     # 后台消费者仍按自身周期
+    assert "motherboard" not in classes
+
+    time.sleep(0.1)         # TTL 过期后回到空闲心跳
+    demand.apply()
+    assert demand.plan["idle"] is True
+
+
+def test_tree_consumer_is_never_idle(demand):
+    demand.hold("recorder", tree=True, period=HEARTBEAT)
+    demand.apply()
+    assert demand.plan["idle"] is False
+    assert demand.plan["tree"] is True
+    assert demand.monitor.tree_enabled is True
+    demand.release("recorder")
+    demand.apply()
+    assert demand.plan["idle"] is True
+
+
+def test_base_period_is_a_floor(demand):
+    demand.hold("stream", period=0.01)
+    demand.apply()
+    assert demand.plan["sample_period"] == BASE
@@ -0,0 +1,31 @@
+import numpy as np
+
+from backend.downsample import lttb_indices
+
+
+def test_short_series_is_returned_whole():
+    x = np.arange(10.0)
+    assert lttb_indices(x, x, 10).tolist() == list(range(10))
+    assert lttb_indices(x, x, 50).tolist() == list(range(10))
+    assert lttb_indices(x, x, 2).tolist() == [0, 9]
+
+
+def test_keeps_endpoints_and_spikes():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50)
+    y[437] = 25.0
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == 999
+    assert np.all(np.diff(idx) > 0)
+    assert 437 in idx
+
+
+def test_metrics_are_normalized_and_nan_tolerant():
+    x = np.arange(500.0)
+    clock = np.full(500, 2700.0)            # 大数值但无变化的指标不应主导选点
+    usage = np.zeros(500)
+    usage[123] = 100.0
+    missing = np.full(500, np.nan)          # 硬件不支持的指标
+    idx = lttb_indices(x, np.column_stack([clock, usage, missing]), 50)
+    assert len(idx) == 50 and 123 in idx
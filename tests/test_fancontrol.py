@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from backend.fancontrol import DEFAULT_LOOPS, FanController, FanCurve, FanLoop, load_fan_config
+from backend.hardware import HardwareMonitor
+from backend.sampler import Sampler
+from backend.synthetic import ThermalPlant, build_plant_computer
+
+CURVE = [[40, 30], [60, 45], [70, 65], [80, 100]]
+
+
+def test_curve_interpolation_and_validation():
+    curve = FanCurve(CURVE)
+    assert curve(20) == 30 and curve(95) == 100
+    assert curve(75) == pytest.approx(82.5)
+    with pytest.raises(ValueError):
+        FanCurve([[40, 50], [60, 40]])      # 必须单调不减
+    with pytest.raises(ValueError):
+        FanCurve([[40, 120]])
+    with pytest.raises(ValueError):
+        FanLoop("x", "fan_speed", [], CURVE)
+
+
+def test_default_config_controls_gpu_fans_only():
+    loops, options = load_fan_config()
+    assert [loop.patterns for loop in loops] == [["/gpu*/control/*"]]
+    assert options == {}
+    assert len(DEFAULT_LOOPS) == 1
+
+
+def test_loop_hysteresis_ramp_and_fallback(make_snapshot):
+    loop = FanLoop("gpu", "gpu_temp", [], CURVE, hysteresis=3, ramp_up=50, ramp_down=10, min_duty=20)
+    assert loop.step(None, 0.0, 0.5, 3.0) is None       # 尚无样本: 不接管
+    assert loop.step(make_snapshot(0, gpu_temp=60.0), 0.0, 0.5, 3.0) == 45    # 首个样本直接采用曲线值
+
+    # 升温: 每 0.5 s 最多 +25%
+    assert loop.step(make_snapshot(1, gpu_temp=80.0), 1.0, 0.5, 3.0) == 70
+    assert loop.step(make_snapshot(1.5, gpu_temp=80.0), 1.5, 0.5, 3.0) == 95
+    assert loop.step(make_snapshot(2, gpu_temp=80.0), 2.0, 0.5, 3.0) == 100
+
+    # 降温 2 度 (小于迟滞): 有效温度不变
+    loop.step(make_snapshot(3, gpu_temp=78.0), 3.0, 0.5, 3.0)
+    assert loop.effective == 80 and loop.duty == 100
+    # 降到 70: 有效温度 73, 占空比每 0.5 s 最多 -5%
+    assert loop.step(make_snapshot(4, gpu_temp=70.0), 4.0, 0.5, 3.0) == 95
+    assert loop.effective == 73
+
+    # 快照过旧: 立即切到安全占空比, 恢复后重新按曲线
+    assert loop.step(make_snapshot(5, gpu_temp=70.0), 9.0, 0.5, 3.0) == 100
+    assert loop.mode == "fallback"
+    assert loop.step(make_snapshot(10, gpu_temp=50.0), 10.0, 0.5, 3.0) == 95
+    assert loop.mode == "curve"
+    # 温度缺失同样视为失效
+    assert loop.step(make_snapshot(11), 11.0, 0.5, 3.0) == 100
+
+
+def _wait_for(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_closed_loop_on_thermal_plant():
+    # 满载, 起始 76°C: 风扇从驱动默认的 30% 接管到曲线值; 采样线程卡死时切到安全占空比
+    plant = ThermalPlant(lambda t: 100.0, temp=76.0)
+    monitor = HardwareMonitor(build_plant_computer(plant))
+    sampler = Sampler(monitor.sample, period=0.1)
+    loops, _ = load_fan_config()
+    [loop] = loops
+    controller = FanController(loops, sampler.latest, monitor.index, period=0.1, stale_after=0.5)
+    sampler.start()
+    controller.start()
+    try:
+        assert _wait_for(lambda: loop.mode == "curve" and plant.duty >= 80.0, 5.0)
+        assert loop.fans and all(i.startswith("/gpu") for i in loop.fans)
+        assert plant.duty == pytest.approx(loop.duty, abs=1.0)     # 指令经 Control 写回热模型
+
+        plant.hang(1.5)
+        assert _wait_for(lambda: loop.mode == "fallback", 2.0)
+        assert plant.duty == 100.0
+        assert _wait_for(lambda: loop.mode == "curve", 3.0)
+    finally:
+        controller.stop()
+        sampler.stop()
+    status = controller.status()
+    assert status.ticks > 0 and status.write_errors == 0
+    # 停止后恢复驱动默认控制
+    controls = monitor.index.controls
+    assert all(controls[i].Control.ControlMode == "Default" for i in loop.fans)
+    assert plant.duty == ThermalPlant.AUTO_DUTY
+    monitor.close()
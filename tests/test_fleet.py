@@ -0,0 +1,68 @@
+import asyncio
+import socket
+
+import pytest
+import uvicorn
+
+from backend.fleet import FleetCollector, parse_rigs
+from backend.standin import build_app
+
+
+def test_parse_rigs():
+    assert parse_rigs("pc1=192.168.1.11, pc2=host:9000,https://x.example/ ,localhost") == {
+        "pc1": "http://192.168.1.11:8000",
+        "pc2": "http://host:9000",
+        "x.example": "https://x.example",
+        "localhost:8000": "http://localhost:8000",
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _fleet(hang: int, seconds: float):
+    """启动 3 台替身后端 (第 hang 台 /stats 永不返回), 汇总采集 seconds 秒"""
+    servers, rigs = [], {}
+    for i in range(3):
+        port = _free_port()
+        config = uvicorn.Config(build_app(i, hang=i == hang, period=0.05), host="127.0.0.1", port=port,
+                                log_level="warning", timeout_graceful_shutdown=1)
+        servers.append(uvicorn.Server(config))
+        rigs[f"rig{i}"] = f"127.0.0.1:{port}"
+    tasks = [asyncio.create_task(s.serve()) for s in servers]
+    while not all(s.started for s in servers):
+        await asyncio.sleep(0.02)
+
+    collector = FleetCollector(parse_rigs(",".join(f"{n}={t}" for n, t in rigs.items())),
+                               period=0.1, timeout=0.3)
+    await collector.start()
+    try:
+        await asyncio.sleep(seconds)
+        return collector.snapshot()
+    finally:
+        await collector.stop()
+        for s in servers:
+            s.should_exit = True
+        await asyncio.gather(*tasks)
+
+
+def test_aggregate_against_standins():
+    fleet = asyncio.run(_fleet(hang=2, seconds=1.5))
+    rigs = {r.name: r for r in fleet.rigs}
+    assert [rigs[n].state for n in ("rig0", "rig1", "rig2")] == ["online", "online", "offline"]
+
+    # 挂起的机器只影响自己: 超时计数, 其它机器正常
+    hung = rigs["rig2"]
+    assert hung.stats is None and hung.errors >= 1 and "Timeout" in hung.last_error
+    online = [rigs["rig0"], rigs["rig1"]]
+    assert all(r.errors == 0 and r.sample_seq and r.latency_ms < 300 for r in online)
+
+    agg = fleet.aggregate
+    assert (agg.rigs, agg.online) == (3, 2)
+    assert agg.avg_cpu == pytest.approx(round(sum(r.stats.cpu for r in online) / 2, 1))
+    assert agg.total_gpu_power == pytest.approx(round(sum(r.stats.gpu_power for r in online), 1))
+    hottest = max(online, key=lambda r: r.stats.gpu_temp)
+    assert (agg.hottest_gpu.rig, agg.hottest_gpu.value) == (hottest.name, hottest.stats.gpu_temp)
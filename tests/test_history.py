@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from backend.hardware import SystemStats
+from backend.history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / "history.db"))
+
+
+def _minutes(base: int, minutes: int):
+    """每秒一个样本; 第 k 分钟的 cpu 为 10k + 秒数 / 59 (即 10k ~ 10k+1)"""
+    return [(base + 60 * k + s, SystemStats(cpu=10 * k + s / 59, ram=50.0))
+            for k in range(minutes) for s in range(60)]
+
+
+def test_rollups_and_tier_selection(store):
+    base = (int(time.time()) // 3600 - 3) * 3600
+    conn = store.connect()
+    store._flush(conn, _minutes(base, 3))
+    store._maintain(conn, base + 7200)
+    rows = conn.execute("SELECT ts, n, cpu_min, cpu_max, cpu_avg FROM rollup_1m ORDER BY ts").fetchall()
+    assert [r[0] for r in rows] == [(base + 60 * k) * 1000 for k in range(3)]
+    for k, (_, n, lo, hi, avg) in enumerate(rows):
+        assert n == 60
+        assert (lo, hi, avg) == pytest.approx((10 * k, 10 * k + 1, 10 * k + 0.5))
+    hour = conn.execute("SELECT n, cpu_avg FROM rollup_1h").fetchall()
+    assert hour == [(180, pytest.approx(10.5))]
+    conn.close()
+
+    # 原始行数超出预算 (max_points × 20) 时改用 1 分钟层级
+    coarse = store.query(["cpu"], base, base + 180, max_points=5)
+    assert coarse["tier"] == "rollup_1m"
+    assert coarse["timestamps"] == [base, base + 60, base + 120]
+    assert coarse["metrics"]["cpu"] == [0.5, 10.5, 20.5]
+    coarse_max = store.query(["cpu"], base, base + 180, max_points=5, agg="max")
+    assert coarse_max["metrics"]["cpu"] == [1.0, 11.0, 21.0]
+
+    # 原始层级: 超过 max_points 时 LTTB 降采样
+    fine = store.query(["cpu", "gpu_temp"], base, base + 180, max_points=50)
+    assert fine["tier"] == "samples" and fine["source_points"] == 180
+    assert len(fine["timestamps"]) == 50
+    assert fine["timestamps"][0] == base and fine["timestamps"][-1] == base + 179
+    assert set(fine["metrics"]["gpu_temp"]) == {None}
+
+
+def test_watermark_survives_restart(store):
+    base = (int(time.time()) // 3600 - 3) * 3600
+    conn = store.connect()
+    store._flush(conn, _minutes(base, 2))
+    store._maintain(conn, base + 120)
+    conn.close()
+    reopened = HistoryStore(store.path)
+    assert reopened._watermarks["rollup_1m"] == (base + 120) * 1000
+
+
+def test_offer_throttles_to_raw_interval(store, make_snapshot):
+    for i in range(8):
+        store.offer(make_snapshot(i * 0.25, cpu=1.0))
+    assert store._queue.qsize() == 2
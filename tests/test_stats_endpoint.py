@@ -0,0 +1,102 @@
+import importlib
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.hardware
+from backend.encoding import etag_matches, msgpack, parse_qlist, select_variant
+from backend.synthetic import build_computer
+
+
+def test_parse_qlist():
+    assert parse_qlist("gzip;q=0.5, identity, BR;level=4;q=0") == {"gzip": 0.5, "identity": 1.0, "br": 0.0}
+    assert parse_qlist("gzip;q=abc") == {"gzip": 0.0}
+
+
+@pytest.mark.parametrize("accept, encoding, variant", [
+    (None, None, "json"),
+    ("application/json", "gzip, deflate", "gzip"),
+    ("*/*", "gzip;q=0", "json"),
+    ("*/*", "*", "gzip"),
+    ("*/*", "*;q=0, identity", "json"),
+    ("application/msgpack", "gzip", "msgpack"),
+    ("application/x-msgpack", None, "msgpack"),
+    ("application/msgpack;q=0.5, application/json", None, "json"),
+    ("application/json;q=0.5, application/msgpack", None, "msgpack"),
+    ("application/msgpack;q=0, */*", "gzip", "gzip"),
+    ("application/msgpack, application/*;q=0.9", None, "msgpack"),
+])
+def test_select_variant(accept, encoding, variant):
+    if variant == "msgpack" and msgpack is None:
+        pytest.skip("未安装 msgpack (可选依赖)")
+    assert select_variant(accept, encoding) == variant
+
+
+def test_etag_matches():
+    assert etag_matches('"a-1"', '"a-1"')
+    assert etag_matches('"a-0", W/"a-1"', '"a-1"')
+    assert etag_matches("*", '"a-1"')
+    assert not etag_matches('"a-1.gz"', '"a-1"')
+    assert not etag_matches(None, '"a-1"')
+
+
+@pytest.fixture(scope="module")
+def client():
+    """以合成传感器树运行完整后端 (同 benchmarks.suite --serve), 不写任何文件"""
+    with pytest.MonkeyPatch.context() as mp:
+        for name in ("HERTA_HISTORY_DB", "HERTA_SHM", "HERTA_SESSIONS_FILE"):
+            mp.setenv(name, "")
+        mp.setattr(backend.hardware, "open_computer", lambda: build_computer(n_gpus=1))
+        sys.modules.pop("backend.main", None)
+        main = importlib.import_module("backend.main")
+        with TestClient(main.app) as client:
+            deadline = time.monotonic() + 10
+            while client.get("/ready").status_code != 200:
+                assert time.monotonic() < deadline, "后端未就绪"
+                time.sleep(0.05)
+            yield client
+        sys.modules.pop("backend.main", None)
+
+
+def test_stats_etag_and_negotiation(client):
+    plain = client.get("/stats", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert plain.headers["content-type"] == "application/json"
+    assert "content-encoding" not in plain.headers
+    assert {"Accept", "Accept-Encoding"} <= {v.strip() for v in plain.headers["vary"].split(",")}
+    assert float(plain.headers["x-sample-age"]) >= 0
+    body = plain.json()
+    assert "sample_age" not in body
+    assert body["sample_seq"] >= 1 and abs(time.time() - body["sampled_at"]) < 10
+
+    etag = plain.headers["etag"]
+    cached = client.get("/stats", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    if cached.status_code == 304:
+        assert cached.content == b"" and cached.headers["etag"] == etag
+    else:
+        # 两次请求之间来了新快照: ETag 必须随序号变化
+        assert cached.status_code == 200 and cached.headers["etag"] != etag
+
+    gz = client.get("/stats", headers={"Accept-Encoding": "gzip"})
+    assert gz.headers["content-encoding"] == "gzip" and gz.headers["etag"].endswith('.gz"')
+    assert "cpu" in gz.json()
+
+    refused = client.get("/stats", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+    if msgpack is not None:
+        packed = client.get("/stats", headers={"Accept": "application/msgpack", "Accept-Encoding": "gzip"})
+        assert packed.headers["content-type"] == "application/msgpack"
+        assert "content-encoding" not in packed.headers
+        assert "sampled_at" in msgpack.unpackb(packed.content)
+
+    preferred = client.get("/stats", headers={"Accept": "application/msgpack;q=0.5, application/json",
+                                              "Accept-Encoding": "identity"})
+    assert preferred.headers["content-type"] == "application/json"
+
+
+def test_roast_reports_request_time_age(client):
+    roast = client.get("/roast").json()
+    assert roast["message"] and roast["sample_age"] >= 0
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.hardware import SensorInfo, SensorReadings
+from backend.throttle import ThrottleDetector
+
+GPU = "/gpu-nvidia/0"
+CATALOG = (
+    SensorInfo(f"{GPU}/load/0", "GpuNvidia", "Test GPU", "Load", "GPU Core"),
+    SensorInfo(f"{GPU}/temperature/0", "GpuNvidia", "Test GPU", "Temperature", "GPU Core"),
+    SensorInfo(f"{GPU}/power/0", "GpuNvidia", "Test GPU", "Power", "GPU Package"),
+    SensorInfo(f"{GPU}/clock/0", "GpuNvidia", "Test GPU", "Clock", "GPU Core"),
+)
+PERIOD = 1.0
+
+
+class Rig:
+    """按虚拟时间 (每秒一个样本) 向检测器投喂单块 GPU 的读数"""
+
+    def __init__(self):
+        self.detector = ThrottleDetector()
+        self.t = 0.0
+        self.seq = 0
+
+    def run(self, seconds: float, load: float, temp: float, power: float, clock: float):
+        for _ in range(int(seconds / PERIOD)):
+            self.seq += 1
+            self.t += PERIOD
+            snap = SimpleNamespace(seq=self.seq, monotonic=self.t, timestamp=1_700_000_000.0 + self.t)
+            self.detector.offer(snap, SensorReadings(CATALOG, 1, snap.timestamp, [load, temp, power, clock]))
+
+    def device(self):
+        return self.detector.status().devices[0]
+
+
+@pytest.fixture
+def rig():
+    rig = Rig()
+    rig.run(120, load=99, temp=72, power=240, clock=2750)
+    assert rig.device().baseline_mhz == pytest.approx(2750)
+    return rig
+
+
+def test_learning_until_high_load():
+    rig = Rig()
+    rig.run(30, load=5, temp=40, power=30, clock=210)
+    assert rig.device().state == "learning"
+    assert not rig.detector.engaged
+
+
+def test_thermal_episode(rig):
+    rig.run(20, load=99, temp=82, power=235, clock=2520)
+    assert rig.device().state == "thermal"
+    [active] = rig.detector.active()
+    assert active.reason == "thermal" and active.end is None
+    assert active.max_deficit_mhz == pytest.approx(230)
+
+    rig.run(10, load=99, temp=72, power=240, clock=2750)
+    assert rig.device().state == "ok"
+    assert rig.detector.active() == []
+    [event] = rig.detector.recent()
+    assert event.reason == "thermal" and event.end is not None
+    assert event.duration == pytest.approx(20, abs=1)
+
+
+def test_power_episode(rig):
+    rig.run(20, load=99, temp=74, power=285, clock=2580)
+    assert rig.device().state == "power"
+    assert rig.detector.engaged
+
+
+def test_brief_dip_is_ignored(rig):
+    rig.run(1, load=99, temp=82, power=235, clock=2520)     # 短于 ENTER
+    rig.run(5, load=99, temp=72, power=240, clock=2750)
+    assert rig.detector.recent() == []
+
+
+def test_long_idle_is_not_a_power_throttle(rig):
+    # 空闲功耗稳定: 若功耗峰值随空闲样本衰减, 约 50 分钟后会被误判为功耗墙
+    rig.run(3 * 3600, load=3, temp=45, power=20, clock=210)
+    device = rig.device()
+    assert device.state == "idle"
+    assert device.power_peak == pytest.approx(240)
+    assert [e.reason for e in rig.detector.active()] == ["idle"]
+    # 空闲事件不进入最近事件, 也不需要 1 Hz 采样
+    assert rig.detector.recent() == []
+    assert not rig.detector.engaged
+
+
+def test_hot_idle_gpu_is_idle(rig):
+    rig.run(30, load=10, temp=84, power=40, clock=600)
+    assert rig.device().state == "idle"
+    assert rig.detector.recent() == []
+
+
+def test_catalog_rebuild_keeps_baseline(rig):
+    detector = rig.detector
+    shuffled = tuple(reversed(CATALOG))
+    snap = SimpleNamespace(seq=rig.seq + 1, monotonic=rig.t + 1, timestamp=1_700_000_000.0 + rig.t + 1)
+    detector.offer(snap, SensorReadings(shuffled, 2, snap.timestamp, [2750, 240, 72, 99]))
+    device = detector.status().devices[0]
+    assert device.baseline_mhz == pytest.approx(2750)
+    assert (device.clock_mhz, device.load) == (2750, 99)
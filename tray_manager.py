@@ -5,6 +5,7 @@
 - 右下角系统托盘图标
 - 右键菜单: 打开界面 / 退出
 - 自动启动后端和前端服务
+- HERTA_UI=builtin (或 --builtin): 不启动 Streamlit, 使用后端内置仪表盘 (/dashboard)
 - 完善的错误处理和日志
 
 依赖: pip install pystray pillow
@@ -15,6 +16,8 @@ import sys
 import os
 import time
 import logging
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 # --- 日志配置 ---
@@ -51,6 +54,19 @@ def check_dependencies():
     
     return True
 
+# --- 界面 ---
+# streamlit: 启动 Streamlit 前端 (默认); builtin: 只启动后端, 打开后端内置仪表盘
+BUILTIN_UI = os.environ.get("HERTA_UI", "streamlit") == "builtin" or "--builtin" in sys.argv[1:]
+STREAMLIT_URL = "http://localhost:8501"
+DASHBOARD_URL = "http://localhost:8000/dashboard"
+UI_URL = DASHBOARD_URL if BUILTIN_UI else STREAMLIT_URL
+
+# --- 就绪检查 ---
+BACKEND_READY_URL = "http://127.0.0.1:8000/ready"              # 硬件已打开且有首个快照
+FRONTEND_READY_URL = "http://127.0.0.1:8501/_stcore/health"    # Streamlit 健康检查
+READY_TIMEOUT = 30.0    # 等待就绪的最长时间 (秒)
+POLL_INTERVAL = 0.1
+
 # --- 全局变量 ---
 backend_proc = None
 frontend_proc = None
@@ -86,50 +102,87 @@ def start_services():
         startupinfo.wShowWindow = subprocess.SW_HIDE
         creationflags = subprocess.CREATE_NO_WINDOW
     
-    # 启动后端
+    # 启动时刻传给后端, 用于统计从启动到首个数据的耗时
+    launched = time.time()
+    env = dict(os.environ, HERTA_LAUNCH_TS=str(launched))
+
+    # 同时启动后端和前端 (前端在后端就绪前显示连接中)
     try:
         backend_cmd = [sys.executable, "-m", "backend.main"]
         backend_proc = subprocess.Popen(
             backend_cmd,
             startupinfo=startupinfo,
             creationflags=creationflags,
-            cwd=script_dir
+            cwd=script_dir,
+            env=env
         )
         logger.info(f"后端已启动 (PID: {backend_proc.pid})")
     except Exception as e:
         logger.error(f"后端启动失败: {e}")
         return False
-    
-    # 等待后端初始化
-    time.sleep(3)
-    
-    # 检查后端是否仍在运行
-    if backend_proc.poll() is not None:
-        logger.error("后端进程已退出，启动失败")
-        return False
-    
-    # 启动前端
-    try:
-        frontend_cmd = [
-            "streamlit", "run", "frontend/app.py",
-            "--server.address", "0.0.0.0",
-            "--server.headless", "true"
-        ]
-        frontend_proc = subprocess.Popen(
-            frontend_cmd,
-            startupinfo=startupinfo,
-            creationflags=creationflags,
-            cwd=script_dir
-        )
-        logger.info(f"前端已启动 (PID: {frontend_proc.pid})")
-    except Exception as e:
-        logger.error(f"前端启动失败: {e}")
+
+    if BUILTIN_UI:
+        logger.info(f"使用内置仪表盘: {DASHBOARD_URL}")
+    else:
+        try:
+            frontend_cmd = [
+                "streamlit", "run", "frontend/app.py",
+                "--server.address", "0.0.0.0",
+                "--server.headless", "true"
+            ]
+            frontend_proc = subprocess.Popen(
+                frontend_cmd,
+                startupinfo=startupinfo,
+                creationflags=creationflags,
+                cwd=script_dir
+            )
+            logger.info(f"前端已启动 (PID: {frontend_proc.pid})")
+        except Exception as e:
+            logger.error(f"前端启动失败: {e}")
+            stop_services()
+            return False
+
+    if not wait_ready(launched):
         stop_services()
         return False
-    
+
     logger.info("所有服务启动成功")
     return True
 
+# 本机就绪检查不走系统代理
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+def _is_ready(url):
+    """就绪检查 (HTTP 200), 连接失败 / 503 均视为未就绪"""
+    try:
+        with _opener.open(url, timeout=0.5) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+def wait_ready(launched, timeout=READY_TIMEOUT):
+    """
+    轮询两个服务的就绪检查, 代替固定等待。
+    进程退出则启动失败; 超时仍未就绪只记录警告 (例如硬件初始化较慢), 托盘照常运行。
+    """
+    pending = {"后端": (backend_proc, BACKEND_READY_URL)}
+    if frontend_proc:
+        pending["前端"] = (frontend_proc, FRONTEND_READY_URL)
+    deadline = launched + timeout
+    while pending:
+        for name, (proc, url) in list(pending.items()):
+            if proc.poll() is not None:
+                logger.error(f"{name}进程已退出 (退出码 {proc.returncode})，启动失败")
+                return False
+            if _is_ready(url):
+                logger.info(f"{name}就绪 (启动后 {time.time() - launched:.2f}s)")
+                del pending[name]
+        if pending and time.time() > deadline:
+            logger.warning(f"等待{'、'.join(pending)}就绪超时 ({timeout:.0f}s)，继续运行")
+            break
+        time.sleep(POLL_INTERVAL)
+    return True
+
 def stop_services(icon=None, item=None):
     """停止所有服务并退出"""
     global backend_proc, frontend_proc
@@ -159,14 +212,14 @@ def stop_services(icon=None, item=None):
 def open_browser(icon, item):
     """打开浏览器"""
     import webbrowser
-    url = "http://localhost:8501"
-    logger.info(f"打开浏览器: {url}")
-    webbrowser.open(url)
+    logger.info(f"打开浏览器: {UI_URL}")
+    webbrowser.open(UI_URL)
 
 def get_status_text():
     """获取服务状态"""
     backend_ok = backend_proc and backend_proc.poll() is None
-    frontend_ok = frontend_proc and frontend_proc.poll() is None
+    # 内置仪表盘由后端提供, 没有前端进程
+    frontend_ok = BUILTIN_UI or (frontend_proc and frontend_proc.poll() is None)
     
     if backend_ok and frontend_ok:
         return "黑塔之眼 - 运行中 ✅"
@@ -198,7 +251,7 @@ def main():
     
     # 创建托盘菜单
     menu = Menu(
-        MenuItem("打开界面 (localhost:8501)", open_browser, default=True),
+        MenuItem(f"打开界面 ({UI_URL.removeprefix('http://')})", open_browser, default=True),
         MenuItem("退出", stop_services)
     )
     